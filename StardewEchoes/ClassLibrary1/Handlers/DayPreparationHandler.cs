@@ -0,0 +1,123 @@
+using StardewModdingAPI;
+using StardewModdingAPI.Events;
+using StardewValley;
+using System;
+using System.Collections.Generic;
+using System.Net.Http;
+using System.Text;
+using System.Text.Json;
+using System.Threading.Tasks;
+using StardewEchoes.Models;
+
+namespace StardewEchoes.Handlers
+{
+  // Tells the API which villagers are around at the start of each day, so it
+  // can prepare their opening lines before the player talks to them
+  public class DayPreparationHandler
+  {
+    private readonly IMonitor Monitor;
+    private readonly HttpClient httpClient;
+    private readonly GameContextHandler gameContextHandler;
+    private readonly GameChannelClient gameChannel;
+
+    private const string API_URL = "http://127.0.0.1:8000/prepare_day";
+
+    public DayPreparationHandler(
+        IMonitor monitor,
+        IModHelper helper,
+        HttpClient httpClient,
+        GameContextHandler gameContextHandler,
+        GameChannelClient gameChannel)
+    {
+      this.Monitor = monitor;
+      this.httpClient = httpClient;
+      this.gameContextHandler = gameContextHandler;
+      this.gameChannel = gameChannel;
+
+      helper.Events.GameLoop.DayStarted += OnDayStarted;
+      gameChannel.Pushed += OnPushed;
+    }
+
+    // The API pushes "opening_ready" over the game channel as each line is prepared
+    private void OnPushed(string type, string message)
+    {
+      if (type == "opening_ready")
+        Monitor.Log($"Opening line prepared by the API: {message}", LogLevel.Trace);
+    }
+
+    private void OnDayStarted(object? sender, DayStartedEventArgs e)
+    {
+      var request = new PrepareDayRequest
+      {
+        player_name = Game1.player.Name,
+        season = Game1.currentSeason,
+        day_of_month = Game1.dayOfMonth,
+        day_of_week = (int)Game1.Date.DayOfWeek,
+        time_of_day = Game1.timeOfDay,
+        year = Game1.year,
+        weather = gameContextHandler.GetCurrentWeather(),
+        player_location = Game1.currentLocation?.Name ?? "Unknown",
+        language = gameContextHandler.GetGameLanguage(),
+        npcs = GetVillagers()
+      };
+
+      _ = Task.Run(async () =>
+      {
+        try
+        {
+          bool accepted;
+          string status;
+          var reply = await gameChannel.RequestAsync("prepare_day", request);
+          if (reply != null)
+          {
+            accepted = reply.Succeeded;
+            status = reply.Status.ToString();
+          }
+          else
+          {
+            string jsonContent = JsonSerializer.Serialize(request);
+            var content = new StringContent(jsonContent, Encoding.UTF8, "application/json");
+            var response = await httpClient.PostAsync(API_URL, content);
+            accepted = response.IsSuccessStatusCode;
+            status = response.StatusCode.ToString();
+          }
+
+          if (accepted)
+          {
+            Monitor.Log($"Asked the API to prepare {request.npcs.Count} NPCs for the day.", LogLevel.Debug);
+          }
+          else
+          {
+            Monitor.Log($"Warning: Failed to prepare the day with the API: {status}", LogLevel.Warn);
+          }
+        }
+        catch (Exception ex)
+        {
+          Monitor.Log($"Error preparing the day with the API: {ex.Message}", LogLevel.Error);
+        }
+      });
+    }
+
+    private List<DayNpc> GetVillagers()
+    {
+      var npcs = new List<DayNpc>();
+      var seen = new HashSet<string>();
+      foreach (var location in Game1.locations)
+      {
+        foreach (var npc in location.characters)
+        {
+          if (!npc.IsVillager || !seen.Add(npc.Name))
+            continue;
+
+          npcs.Add(new DayNpc
+          {
+            npc_name = npc.Name,
+            npc_location = location.Name,
+            friendship_hearts = gameContextHandler.GetFriendshipHearts(npc.Name)
+          });
+        }
+      }
+      return npcs;
+    }
+  }
+}
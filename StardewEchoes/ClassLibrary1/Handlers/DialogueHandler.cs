@@ -18,7 +18,10 @@ namespace StardewEchoes.Handlers
     private readonly IModHelper Helper;
     private readonly HttpClient httpClient;
     private readonly Dictionary<string, List<ConversationEntry>> conversationHistories;
+    // Server-side handle per NPC; while we have one the server keeps the history
+    private readonly Dictionary<string, string> conversationHandles = new Dictionary<string, string>();
     private readonly GameContextHandler gameContextHandler;
+    private readonly GameChannelClient gameChannel;
     private NPC? npcWithPendingOptions;
     private DialogueResponse? pendingOptionsResponse;
 
@@ -29,13 +32,15 @@ namespace StardewEchoes.Handlers
         IModHelper helper,
         HttpClient httpClient,
         Dictionary<string, List<ConversationEntry>> conversationHistories,
-        GameContextHandler gameContextHandler)
+        GameContextHandler gameContextHandler,
+        GameChannelClient gameChannel)
     {
       this.Monitor = monitor;
       this.Helper = helper;
       this.httpClient = httpClient;
       this.conversationHistories = conversationHistories;
       this.gameContextHandler = gameContextHandler;
+      this.gameChannel = gameChannel;
     }
 
     // Main method that accepts GiftInfo directly (for GiftHandler)
@@ -265,18 +270,31 @@ namespace StardewEchoes.Handlers
                       npc_name = npc.Name
                     };
 
-                    string jsonContent = JsonSerializer.Serialize(endRequest);
-                    var content = new StringContent(jsonContent, Encoding.UTF8, "application/json");
+                    bool ended;
+                    string status;
+                    var reply = await gameChannel.RequestAsync("end_conversation", endRequest);
+                    if (reply != null)
+                    {
+                      ended = reply.Succeeded;
+                      status = reply.Status.ToString();
+                    }
+                    else
+                    {
+                      string jsonContent = JsonSerializer.Serialize(endRequest);
+                      var content = new StringContent(jsonContent, Encoding.UTF8, "application/json");
 
-                    var response = await httpClient.PostAsync("http://127.0.0.1:8000/end_conversation", content);
+                      var response = await httpClient.PostAsync("http://127.0.0.1:8000/end_conversation", content);
+                      ended = response.IsSuccessStatusCode;
+                      status = response.StatusCode.ToString();
+                    }
                     
-                    if (response.IsSuccessStatusCode)
+                    if (ended)
                     {
                       Monitor.Log($"Successfully ended conversation with {npc.Name} - background analysis will be performed by the API.", LogLevel.Debug);
                     }
                     else
                     {
-                      Monitor.Log($"Warning: Failed to notify API about conversation end with {npc.Name}: {response.StatusCode}", LogLevel.Warn);
+                      Monitor.Log($"Warning: Failed to notify API about conversation end with {npc.Name}: {status}", LogLevel.Warn);
                     }
                   }
                   catch (Exception ex)
@@ -294,7 +312,8 @@ namespace StardewEchoes.Handlers
 
     private async Task<DialogueResponse> GetDialogueFromAPI(NPC npc, string? playerResponse = null, GiftInfo? giftInfo = null)
     {
-      var history = GetConversationHistory(npc.Name);
+      conversationHandles.TryGetValue(npc.Name, out string? handle);
+      var history = handle != null ? new List<ConversationEntry>() : GetConversationHistory(npc.Name);
       var request = new DialogueRequest
       {
         npc_name = npc.Name,
@@ -311,23 +330,50 @@ namespace StardewEchoes.Handlers
         language = gameContextHandler.GetGameLanguage(),
         conversation_history = history,
         player_response = playerResponse,
-        gift_given = giftInfo
+        gift_given = giftInfo,
+        conversation_handle = handle
       };
 
       string jsonContent = JsonSerializer.Serialize(request);
       var content = new StringContent(jsonContent, Encoding.UTF8, "application/json");
+      // One key per turn, shared by both transports: a turn retried over HTTP
+      // after the game channel dropped is not generated twice, and a new turn
+      // is never answered with an earlier reply
+      string idempotencyKey = Guid.NewGuid().ToString();
+      content.Headers.Add("Idempotency-Key", idempotencyKey);
 
       Monitor.Log($"Enviando petición a la API para {npc.Name}", LogLevel.Debug);
       Monitor.Log($"Datos del contexto: {jsonContent}", LogLevel.Debug);
 
-      var response = await httpClient.PostAsync(API_URL, content);
+      // Over the game channel while it is connected, over HTTP otherwise
+      bool succeeded;
+      string status;
+      string responseText = "";
+      var reply = await gameChannel.RequestAsync("dialogue", request, idempotencyKey);
+      if (reply != null)
+      {
+        succeeded = reply.Succeeded;
+        status = reply.Status.ToString();
+        responseText = reply.Result;
+      }
+      else
+      {
+        var response = await httpClient.PostAsync(API_URL, content);
+        succeeded = response.IsSuccessStatusCode;
+        status = response.StatusCode.ToString();
+        if (succeeded)
+          responseText = await response.Content.ReadAsStringAsync();
+      }
 
-      if (response.IsSuccessStatusCode)
+      if (succeeded)
       {
-        string responseText = await response.Content.ReadAsStringAsync();
         Monitor.Log($"Respuesta recibida: {responseText}", LogLevel.Debug);
 
         var dialogueResponse = JsonSerializer.Deserialize<DialogueResponse>(responseText);
+        if (dialogueResponse?.conversation_handle != null)
+        {
+          conversationHandles[npc.Name] = dialogueResponse.conversation_handle;
+        }
         return dialogueResponse ?? new DialogueResponse
         {
           npc_message = gameContextHandler.GetLocalizedText("Hello, how are you?"),
@@ -340,7 +386,7 @@ namespace StardewEchoes.Handlers
       }
       else
       {
-        Monitor.Log($"Error en la API: {response.StatusCode}", LogLevel.Error);
+        Monitor.Log($"Error en la API: {status}", LogLevel.Error);
         return new DialogueResponse
         {
           npc_message = gameContextHandler.GetLocalizedText("Hello, how are you? (Connection error)"),
@@ -381,6 +427,7 @@ namespace StardewEchoes.Handlers
 
     private void ClearConversationHistory(string npcName)
     {
+      conversationHandles.Remove(npcName);
       if (conversationHistories.ContainsKey(npcName))
       {
         conversationHistories[npcName].Clear();
@@ -0,0 +1,231 @@
+using StardewModdingAPI;
+using System;
+using System.Collections.Concurrent;
+using System.IO;
+using System.Net.WebSockets;
+using System.Text;
+using System.Text.Json;
+using System.Threading;
+using System.Threading.Tasks;
+
+namespace StardewEchoes.Handlers
+{
+  // Reply to one request sent over the game channel
+  public class GameChannelReply
+  {
+    public bool Succeeded { get; init; }
+    public int Status { get; init; }
+    public string Result { get; init; } = "";
+  }
+
+  // Keeps one WebSocket open to the API's /ws/game channel for the loaded
+  // player. Requests are matched to their replies by id, so several can be in
+  // flight at once; while the socket is down RequestAsync returns null and the
+  // handlers use HTTP instead.
+  public class GameChannelClient : IDisposable
+  {
+    private const string CHANNEL_URL = "ws://127.0.0.1:8000/ws/game";
+    private static readonly TimeSpan RequestTimeout = TimeSpan.FromSeconds(30);
+    private static readonly TimeSpan ReconnectDelay = TimeSpan.FromSeconds(5);
+
+    private readonly IMonitor Monitor;
+    private readonly ConcurrentDictionary<int, TaskCompletionSource<GameChannelReply?>> pending =
+        new ConcurrentDictionary<int, TaskCompletionSource<GameChannelReply?>>();
+    private readonly SemaphoreSlim sendLock = new SemaphoreSlim(1, 1);
+    private CancellationTokenSource? session;
+    private ClientWebSocket? socket;
+    private int nextId;
+
+    // Messages the API sends on its own (e.g. "opening_ready"), as raw JSON
+    public event Action<string, string>? Pushed;
+
+    public GameChannelClient(IMonitor monitor)
+    {
+      this.Monitor = monitor;
+    }
+
+    public bool IsConnected => socket?.State == WebSocketState.Open;
+
+    // Connects for the player in the background and reconnects when dropped
+    public void Start(string playerName)
+    {
+      Stop();
+      session = new CancellationTokenSource();
+      var token = session.Token;
+      _ = Task.Run(() => RunAsync(playerName, token));
+    }
+
+    public void Stop()
+    {
+      session?.Cancel();
+      session = null;
+    }
+
+    // Sends a request; null if the channel is not available, so the caller
+    // can fall back to HTTP
+    public async Task<GameChannelReply?> RequestAsync(string type, object payload, string? idempotencyKey = null)
+    {
+      var current = socket;
+      if (current == null || current.State != WebSocketState.Open)
+        return null;
+
+      int id = Interlocked.Increment(ref nextId);
+      var completion = new TaskCompletionSource<GameChannelReply?>(TaskCreationOptions.RunContinuationsAsynchronously);
+      pending[id] = completion;
+      try
+      {
+        string frame = idempotencyKey == null
+            ? JsonSerializer.Serialize(new { id, type, payload })
+            : JsonSerializer.Serialize(new { id, type, payload, idempotency_key = idempotencyKey });
+        await SendAsync(current, frame);
+
+        var finished = await Task.WhenAny(completion.Task, Task.Delay(RequestTimeout));
+        if (finished != completion.Task)
+        {
+          Monitor.Log($"No reply to {type} request {id} on the game channel.", LogLevel.Warn);
+          return null;
+        }
+        return await completion.Task;
+      }
+      catch (Exception ex)
+      {
+        Monitor.Log($"Game channel request {type} failed: {ex.Message}", LogLevel.Debug);
+        return null;
+      }
+      finally
+      {
+        pending.TryRemove(id, out _);
+      }
+    }
+
+    private async Task SendAsync(ClientWebSocket current, string text)
+    {
+      await sendLock.WaitAsync();
+      try
+      {
+        var bytes = Encoding.UTF8.GetBytes(text);
+        await current.SendAsync(new ArraySegment<byte>(bytes), WebSocketMessageType.Text, true, CancellationToken.None);
+      }
+      finally
+      {
+        sendLock.Release();
+      }
+    }
+
+    private async Task RunAsync(string playerName, CancellationToken token)
+    {
+      var uri = new Uri($"{CHANNEL_URL}?player_name={Uri.EscapeDataString(playerName)}");
+      while (!token.IsCancellationRequested)
+      {
+        var current = new ClientWebSocket();
+        try
+        {
+          await current.ConnectAsync(uri, token);
+          socket = current;
+          Monitor.Log("Connected to the API game channel.", LogLevel.Debug);
+          await ReceiveAsync(current, token);
+        }
+        catch (Exception ex) when (!token.IsCancellationRequested)
+        {
+          Monitor.Log($"Game channel unavailable, using HTTP: {ex.Message}", LogLevel.Trace);
+        }
+        catch (OperationCanceledException)
+        {
+        }
+        finally
+        {
+          if (socket == current)
+            socket = null;
+          current.Dispose();
+          // Requests waiting on this connection go over HTTP instead
+          foreach (var waiting in pending.Values)
+            waiting.TrySetResult(null);
+        }
+
+        try
+        {
+          await Task.Delay(ReconnectDelay, token);
+        }
+        catch (OperationCanceledException)
+        {
+        }
+      }
+    }
+
+    private async Task ReceiveAsync(ClientWebSocket current, CancellationToken token)
+    {
+      var buffer = new byte[8192];
+      while (current.State == WebSocketState.Open)
+      {
+        using var message = new MemoryStream();
+        WebSocketReceiveResult received;
+        do
+        {
+          received = await current.ReceiveAsync(new ArraySegment<byte>(buffer), token);
+          if (received.MessageType == WebSocketMessageType.Close)
+            return;
+          message.Write(buffer, 0, received.Count);
+        }
+        while (!received.EndOfMessage);
+
+        HandleFrame(Encoding.UTF8.GetString(message.ToArray()));
+      }
+    }
+
+    private void HandleFrame(string text)
+    {
+      try
+      {
+        using var document = JsonDocument.Parse(text);
+        var root = document.RootElement;
+        string type = root.TryGetProperty("type", out var typeElement) ? typeElement.GetString() ?? "" : "";
+
+        if (!root.TryGetProperty("id", out var idElement) || idElement.ValueKind == JsonValueKind.Null)
+        {
+          if (type == "error")
+            Monitor.Log($"Game channel error: {text}", LogLevel.Warn);
+          else if (type != "connection_confirmed")
+            Pushed?.Invoke(type, text);
+          return;
+        }
+
+        // Multi-frame replies (greeting batches) are not requested by the mod
+        bool done = root.TryGetProperty("done", out var doneElement) && doneElement.ValueKind == JsonValueKind.True;
+        if (!done || idElement.ValueKind != JsonValueKind.Number || !idElement.TryGetInt32(out int id))
+          return;
+        if (!pending.TryGetValue(id, out var completion))
+          return;
+
+        if (root.TryGetProperty("error", out var error))
+        {
+          completion.TrySetResult(new GameChannelReply
+          {
+            Succeeded = false,
+            Status = error.GetProperty("status").GetInt32(),
+            Result = error.GetRawText()
+          });
+        }
+        else
+        {
+          completion.TrySetResult(new GameChannelReply
+          {
+            Succeeded = true,
+            Status = 200,
+            Result = root.GetProperty("result").GetRawText()
+          });
+        }
+      }
+      catch (JsonException)
+      {
+        // Keep-alive replies such as "pong" are plain text
+      }
+    }
+
+    public void Dispose()
+    {
+      Stop();
+      socket?.Dispose();
+      sendLock.Dispose();
+    }
+  }
+}
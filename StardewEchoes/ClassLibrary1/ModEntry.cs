@@ -12,9 +12,11 @@ namespace StardewEchoes
     public class ModEntry : Mod
     {
         private HttpClient? httpClient;
+        private GameChannelClient? gameChannel;
         private DialogueHandler? dialogueHandler;
         private GameContextHandler? gameContextHandler;
         private GiftHandler? giftHandler;
+        private DayPreparationHandler? dayPreparationHandler;
         private readonly Dictionary<string, List<ConversationEntry>> conversationHistories = new Dictionary<string, List<ConversationEntry>>();
 
         public override void Entry(IModHelper helper)
@@ -26,12 +28,17 @@ namespace StardewEchoes
 
             gameContextHandler = new GameContextHandler();
 
+            // Dialogue traffic goes over the API's /ws/game channel while a save
+            // is loaded, falling back to HTTP when it is not connected
+            gameChannel = new GameChannelClient(this.Monitor);
+
             dialogueHandler = new DialogueHandler(
                 this.Monitor,
                 this.Helper,
                 httpClient,
                 conversationHistories,
-                gameContextHandler
+                gameContextHandler,
+                gameChannel
             );
 
             // GiftHandler now handles ALL NPC interactions (with and without gifts)
@@ -39,9 +46,20 @@ namespace StardewEchoes
             // both ModEntry.OnButtonPressed and GiftHandler.OnButtonPressed were active
             giftHandler = new GiftHandler(this.Monitor, this.Helper, dialogueHandler);
 
+            // Lets the API prepare opening lines for the day's villagers
+            dayPreparationHandler = new DayPreparationHandler(
+                this.Monitor,
+                this.Helper,
+                httpClient,
+                gameContextHandler,
+                gameChannel
+            );
+
             // Only keep MenuChanged event for dialogue flow management
             // NOTE: ButtonPressed event removed to avoid conflicts with GiftHandler
             helper.Events.Display.MenuChanged += OnMenuChanged;
+            helper.Events.GameLoop.SaveLoaded += OnSaveLoaded;
+            helper.Events.GameLoop.ReturnedToTitle += OnReturnedToTitle;
         }
 
         protected override void Dispose(bool disposing)
@@ -49,10 +67,21 @@ namespace StardewEchoes
             if (disposing)
             {
                 httpClient?.Dispose();
+                gameChannel?.Dispose();
             }
             base.Dispose(disposing);
         }
 
+        private void OnSaveLoaded(object? sender, SaveLoadedEventArgs e)
+        {
+            gameChannel?.Start(Game1.player.Name);
+        }
+
+        private void OnReturnedToTitle(object? sender, ReturnedToTitleEventArgs e)
+        {
+            gameChannel?.Stop();
+        }
+
         private void OnMenuChanged(object? sender, MenuChangedEventArgs e)
         {
             dialogueHandler?.OnMenuChanged(sender, e);
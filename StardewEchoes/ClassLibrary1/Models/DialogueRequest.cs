@@ -19,6 +19,7 @@ namespace StardewEchoes.Models
     public List<ConversationEntry> conversation_history { get; set; } = new List<ConversationEntry>();
     public string? player_response { get; set; }
     public GiftInfo? gift_given { get; set; }
+    public string? conversation_handle { get; set; }
   }
 
   public class GiftInfo
@@ -1,10 +1,10 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Optional, Dict, List, Any
 
 
 class Settings(BaseSettings):
     # LLM Provider settings
-    LLM_PROVIDER: str # 'google', 'openai', or 'ollama'
+    LLM_PROVIDER: str # 'google', 'openai', 'ollama', or 'fake' (offline load tests)
 
     # API Keys
     gemini_api_key: Optional[str] = None
@@ -29,6 +29,190 @@ class Settings(BaseSettings):
         5  # Tiempo sin actividad para considerar conversación terminada
     )
 
+    # Load player, NPC, profile, emotional state and active conversation with
+    # the relationship_context SQL function (one round trip per dialogue turn)
+    relationship_context_sql_enabled: bool = True
+
+    # Post-response side effects (dialogue persistence, notifications) run in
+    # the background, ordered per player/NPC pair
+    conversation_pipeline_enabled: bool = True
+    conversation_pipeline_wait_timeout_seconds: float = 5.0  # Readers waiting on earlier writes
+    conversation_pipeline_drain_timeout_seconds: float = 15.0  # On shutdown
+
+    # Write-behind buffer for DialogueEntry rows: lines are journaled to a local
+    # file and inserted together, by batch size or after the flush interval
+    dialogue_write_behind_enabled: bool = True
+    dialogue_write_flush_interval_ms: float = 200.0
+    dialogue_write_max_batch_rows: int = 200
+    dialogue_write_wait_timeout_seconds: float = 5.0  # Writers waiting on a flush
+    # Lines held in memory; beyond this (database down) they are only journaled
+    dialogue_write_buffer_max_lines: int = 5000
+    dialogue_journal_path: str = "dialogue_journal.jsonl"
+    dialogue_journal_fsync: bool = False  # fsync every append (survives power loss)
+
+    # Token budgets for the variable sections of the dialogue prompt
+    prompt_budget_history_tokens: int = 600
+    prompt_budget_memories_tokens: int = 300
+    prompt_budget_personality_tokens: int = 450
+
+    # Compiled dialogue templates per NPC/language and cached prompt fragments
+    # (personality perception, mood) per relationship, invalidated by analysis
+    prompt_template_cache_size: int = 256
+    prompt_fragment_cache_enabled: bool = True
+    prompt_fragment_cache_size: int = 4096
+    prompt_version_max_relationships: int = 10000
+
+    # Duplicate /generate_dialogue requests (client retries, double triggers)
+    # within the TTL replay the first response instead of running again. Keyed
+    # by the Idempotency-Key header, or by a hash of the request body.
+    idempotency_enabled: bool = True
+    idempotency_ttl_seconds: float = 15.0
+    idempotency_max_entries: int = 1024
+
+    # In-process registry of active conversations per player/NPC pair; turns
+    # and /end_conversation read it instead of looking the conversation up
+    session_store_enabled: bool = True
+    session_store_max_sessions: int = 10000
+    session_history_max_lines: int = 10  # Lines kept for conversation_handle clients
+
+    # Batch greetings (/generate_greetings): NPCs per request and how many of
+    # their dialogue pipelines run at once
+    greeting_batch_max_npcs: int = 12
+    greeting_batch_concurrency: int = 4
+
+    # Day-start precompute (/prepare_day): opening lines generated in the
+    # background for the NPCs the player is likely to talk to that day
+    prepare_day_enabled: bool = True
+    prepare_day_concurrency: int = 2
+    prepare_day_max_entries: int = 2000
+    prepare_day_max_time_gap: int = 600  # Game time (hhmm); 600 = six hours
+
+    # Pool of pre-generated opening lines shared between players, per NPC,
+    # season, weather, friendship band, mood bucket and language (opt-in:
+    # pooled lines know nothing of the relationship with the player)
+    opening_pool_enabled: bool = False
+    opening_pool_target_size: int = 3  # Lines kept ready per bucket
+    opening_pool_max_uses: int = 3  # Players a line is served to
+    opening_pool_no_repeat_window: int = 50  # Recent openings not repeated to a player
+    opening_pool_max_age_seconds: float = 3600.0
+    opening_pool_max_buckets: int = 2000
+    opening_pool_max_players: int = 10000
+
+    # Semantic response cache (opt-in): a later turn whose player line is
+    # close to one already answered, by the same NPC in the same coarse
+    # context, is answered with the cached reply
+    semantic_cache_enabled: bool = False
+    semantic_cache_similarity_threshold: float = 0.92  # Cosine similarity
+    semantic_cache_max_history_lines: int = 2  # Only early turns of a conversation
+    semantic_cache_max_uses: int = 5  # Turns a reply is served to
+    semantic_cache_no_repeat_window: int = 20  # Recent replies not repeated to a player
+    semantic_cache_max_age_seconds: float = 1800.0
+    semantic_cache_entries_per_bucket: int = 50
+    semantic_cache_max_buckets: int = 2000
+    semantic_cache_max_players: int = 10000
+
+    # Persistent /ws/game channel for the mod's dialogue traffic
+    game_channel_enabled: bool = True
+    game_channel_max_in_flight: int = 8  # Concurrent requests per connection
+
+    # Per-player request limits (requests/second and burst) for each endpoint
+    # kind; over the limit the API answers 429 with Retry-After. 0 = unlimited
+    player_rate_limit_enabled: bool = True
+    player_rate_limits: Dict[str, float] = {
+        "dialogue": 1.0,
+        "gift": 0.5,
+        "end_conversation": 1.0,
+        "greeting_batch": 0.2,
+        "prepare_day": 0.05,
+    }
+    player_rate_limit_burst: Dict[str, float] = {
+        "dialogue": 5.0,
+        "gift": 3.0,
+        "end_conversation": 5.0,
+        "greeting_batch": 2.0,
+        "prepare_day": 2.0,
+    }
+    player_rate_limit_max_players: int = 10000
+
+    # Load shedding: under LLM queue or latency pressure dialogue steps down
+    # one rung at a time (1 skip memory search, 2 shrink context budgets,
+    # 3 fast model, 4 canned lines) and steps back up when load recedes
+    degradation_enabled: bool = True
+    degradation_queue_depth_high: int = 16
+    degradation_queue_depth_low: int = 4
+    degradation_latency_slo_ms: float = 8000.0  # p95 of dialogue LLM calls
+    degradation_latency_window_seconds: float = 60.0
+    degradation_min_samples: int = 5
+    degradation_recover_ratio: float = 0.6  # Step up below this share of the SLO
+    degradation_eval_interval_seconds: float = 1.0
+    degradation_hold_seconds: float = 15.0
+    degradation_budget_scale: float = 0.5
+    degradation_fast_model: Optional[str] = None
+    degradation_forced_level: Optional[int] = None  # Pin a level (testing/incidents)
+
+    # LLM scheduling: concurrency and request-rate limits per provider
+    llm_default_concurrency: int = 4
+    llm_provider_concurrency: Dict[str, int] = {"google": 8, "openai": 8, "ollama": 2}
+    llm_provider_rate_limits: Dict[str, float] = {}  # Requests/second, 0 = unlimited
+    llm_rate_limit_burst: float = 5.0
+
+    # Model routing: call sites listed in llm_call_site_routes try their tiers
+    # in order and fall back to the caller's model on errors or invalid output.
+    # e.g. LLM_MODEL_TIERS='{"small": {"provider": "ollama", "model": "llama3.2:1b", "concurrency": 2}}'
+    #      LLM_CALL_SITE_ROUTES='{"gift_inference": ["small"]}'
+    llm_model_tiers: Dict[str, Dict[str, Any]] = {}
+    llm_call_site_routes: Dict[str, List[str]] = {}
+
+    # Hedged requests: race a second call when the primary is slower than
+    # the given latency percentile (only for calls that pass a latency budget).
+    # Off by default: a hedge doubles the tokens of every slow call
+    llm_hedging_enabled: bool = False
+    llm_hedge_model: Optional[str] = None  # Secondary model, defaults to the same model
+    llm_hedge_percentile: float = 90.0
+    llm_hedge_default_delay_seconds: float = 3.0
+    llm_hedge_budget_fraction: float = 0.5
+    llm_hedge_min_samples: int = 20
+    llm_hedge_sample_size: int = 200
+    dialogue_latency_budget_seconds: float = 8.0
+
+    # LLM call metrics (rolling window and dashboard push interval)
+    llm_metrics_window_seconds: float = 900.0
+    llm_metrics_push_interval_seconds: float = 5.0
+
+    # Shared pooled HTTP client for LLM provider calls
+    llm_http_max_connections: int = 100
+    llm_http_max_keepalive_connections: int = 20
+    llm_http_keepalive_expiry_seconds: float = 30.0
+    llm_http_per_host_limit: int = 16
+    llm_http_timeout_seconds: float = 60.0
+    llm_http_connect_timeout_seconds: float = 5.0
+
+    # Circuit breaker per provider/model: fail fast while a provider is
+    # erroring or hanging, probing with half-open trial calls to recover
+    llm_circuit_enabled: bool = True
+    llm_call_timeout_seconds: Optional[float] = 20.0  # Per provider call; None = HTTP timeout only
+    llm_circuit_window_size: int = 20
+    llm_circuit_min_calls: int = 5
+    llm_circuit_failure_rate: float = 0.5
+    llm_circuit_consecutive_timeouts: int = 3
+    llm_circuit_open_seconds: float = 30.0
+    llm_circuit_half_open_max_calls: int = 1
+
+    # Fake provider (LLM_PROVIDER=fake) for offline, reproducible load tests
+    fake_llm_seed: int = 42
+    fake_llm_latency_distribution: str = "lognormal"  # fixed, uniform, normal, lognormal
+    fake_llm_latency_ms_mean: float = 800.0
+    fake_llm_latency_ms_stddev: float = 300.0
+    fake_llm_tokens_per_second: float = 60.0  # Adds completion_tokens / rate
+    fake_llm_error_rate: float = 0.0  # Probability of an injected failure
+
+    # Batched post-conversation analysis: conversations ended within the window
+    # are analyzed together in one LLM call, up to the prompt token budget
+    analysis_batching_enabled: bool = False
+    analysis_batch_window_seconds: float = 5.0
+    analysis_batch_max_conversations: int = 8
+    analysis_batch_max_prompt_tokens: int = 12000
+
     class Config:
         env_file = ".env"
 
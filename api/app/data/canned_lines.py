@@ -0,0 +1,147 @@
+"""
+Canned NPC lines and player options.
+
+Served without an LLM call when the dialogue pipeline is shedding load (see
+DegradationController) or the model is unavailable. Lines are short,
+in-character and neutral enough to fit any context.
+"""
+
+import random
+from typing import Dict, List
+
+# Per-NPC lines by language; NPCs without an entry use "default"
+CANNED_LINES: Dict[str, Dict[str, List[str]]] = {
+    "default": {
+        "en": [
+            "Oh, hey. Sorry, I've got a lot on my mind right now.",
+            "Hi there. Busy day, huh?",
+            "Hello! Let's talk more later, okay?",
+        ],
+        "es": [
+            "Ah, hola. Perdona, tengo muchas cosas en la cabeza ahora mismo.",
+            "Hola. Día ajetreado, ¿eh?",
+            "¡Hola! Hablamos más tarde, ¿vale?",
+        ],
+    },
+    "Abigail": {
+        "en": [
+            "Hey! I was just thinking about exploring the mines again.",
+            "Oh, it's you. Want to hear about the game I'm playing?",
+            "Ugh, my mom wants me to help at the shop again...",
+        ],
+        "es": [
+            "¡Hey! Justo pensaba en volver a explorar las minas.",
+            "Ah, eres tú. ¿Quieres que te cuente del juego al que estoy jugando?",
+            "Uf, mi madre quiere que ayude en la tienda otra vez...",
+        ],
+    },
+    "Sebastian": {
+        "en": [
+            "Hey. I'm kind of in the middle of something.",
+            "Oh... hi. The rain would be nice right now.",
+            "Working on some code. It's not going great.",
+        ],
+        "es": [
+            "Hey. Estoy un poco ocupado con algo.",
+            "Oh... hola. Ahora mismo me vendría bien la lluvia.",
+            "Estoy programando algo. No va muy bien.",
+        ],
+    },
+    "Penny": {
+        "en": [
+            "Oh! Hello. I was just planning tomorrow's lessons.",
+            "Hi... It's a nice day for reading, isn't it?",
+            "The children have been a handful today.",
+        ],
+        "es": [
+            "¡Oh! Hola. Estaba preparando las clases de mañana.",
+            "Hola... Hace un buen día para leer, ¿verdad?",
+            "Los niños han dado mucha guerra hoy.",
+        ],
+    },
+    "Haley": {
+        "en": [
+            "Oh, it's you. I'm looking for the perfect light for a photo.",
+            "Hi. Don't mind me, I'm just enjoying the day.",
+            "Do you ever get tired of being covered in dirt?",
+        ],
+        "es": [
+            "Ah, eres tú. Estoy buscando la luz perfecta para una foto.",
+            "Hola. No me hagas caso, solo disfruto del día.",
+            "¿No te cansas de ir siempre lleno de tierra?",
+        ],
+    },
+    "Alex": {
+        "en": [
+            "Hey! Just finished my workout. Feeling great!",
+            "What's up? Want to toss the gridball around later?",
+            "Grandma made breakfast again. Best in the valley.",
+        ],
+        "es": [
+            "¡Hey! Acabo de terminar de entrenar. ¡Me siento genial!",
+            "¿Qué tal? ¿Lanzamos el balón luego?",
+            "La abuela ha vuelto a hacer el desayuno. El mejor del valle.",
+        ],
+    },
+    "Emily": {
+        "en": [
+            "Hello! Your aura looks lovely today.",
+            "I'm working on a new dress. The colors came to me in a dream!",
+            "Hi! Have you been taking care of yourself?",
+        ],
+        "es": [
+            "¡Hola! Tu aura se ve preciosa hoy.",
+            "Estoy haciendo un vestido nuevo. ¡Los colores me llegaron en un sueño!",
+            "¡Hola! ¿Te estás cuidando?",
+        ],
+    },
+    "Leah": {
+        "en": [
+            "Hi! I was just sketching by the river.",
+            "The forest is so peaceful this time of day.",
+            "Oh, hello. I found some great driftwood earlier.",
+        ],
+        "es": [
+            "¡Hola! Estaba dibujando junto al río.",
+            "El bosque está tan tranquilo a esta hora.",
+            "Oh, hola. Antes encontré una madera de deriva estupenda.",
+        ],
+    },
+    "Shane": {
+        "en": [
+            "...What do you want?",
+            "Yeah, hi. I'm not really in the mood to talk.",
+            "The chickens are doing fine, if that's what you're asking.",
+        ],
+        "es": [
+            "...¿Qué quieres?",
+            "Sí, hola. No tengo muchas ganas de hablar.",
+            "Las gallinas están bien, si es lo que preguntas.",
+        ],
+    },
+}
+
+# Friendly, neutral and provocative options, in that order
+FALLBACK_OPTIONS: Dict[str, List[str]] = {
+    "en": [
+        "It's great to see you! How have you been?",  # Friendly
+        "Is there anything important I should know?",  # Neutral
+        "Do you always look like that or is it just today?",  # Provocative
+    ],
+    "es": [
+        "¡Me alegra verte! ¿Cómo has estado?",  # Friendly
+        "¿Hay algo importante que necesite saber?",  # Neutral
+        "¿Siempre tienes esa cara o es solo hoy?",  # Provocative
+    ],
+}
+
+
+def get_fallback_options(language: str) -> List[str]:
+    """Player options in the request's language (English if not available)."""
+    return list(FALLBACK_OPTIONS.get(language, FALLBACK_OPTIONS["en"]))
+
+
+def get_canned_line(npc_name: str, language: str) -> str:
+    """A random canned line for the NPC in the request's language."""
+    lines = CANNED_LINES.get(npc_name, CANNED_LINES["default"])
+    return random.choice(lines.get(language) or lines["en"])
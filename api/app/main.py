@@ -4,6 +4,12 @@ from contextlib import asynccontextmanager
 import logging
 from .routers import dialogue, monitoring, websocket_router
 from .db import db
+from .services.llm_service import llm_service
+from .services.memory.analysis_batcher import analysis_batcher
+from .services.conversation_pipeline import conversation_pipeline
+from .services.memory.dialogue_writer import dialogue_writer
+from .services.opening_pool import opening_pool
+from .services.background_work import background_work
 
 # Configurar logging
 logging.basicConfig(
@@ -24,10 +30,21 @@ async def lifespan(app: FastAPI):
     logger.info("🔗 Connecting to database...")
     await db.connect()
     logger.info("✅ Database connected successfully!")
+    await dialogue_writer.replay_journal()
+    await llm_service.startup()
+    opening_pool.start(dialogue.generate_pool_opening)
 
     yield
 
     # Shutdown
+    await opening_pool.stop()
+    # Analysis and day preparation started by requests, before the batcher
+    # flush so their submissions are included
+    await background_work.drain()
+    await conversation_pipeline.drain()
+    await dialogue_writer.flush()
+    await analysis_batcher.flush()
+    await llm_service.shutdown()
     logger.info("🔌 Disconnecting from database...")
     await db.disconnect()
     logger.info("👋 Database disconnected!")
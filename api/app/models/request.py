@@ -31,6 +31,46 @@ class DialogueRequest(BaseModel):
     conversation_history: List[ConversationEntry] = []
     player_response: Optional[str] = None  # The player's chosen response
     gift_given: Optional[GiftInfo] = None  # Gift information if a gift was given
+    # Handle from the previous DialogueResponse. When set, conversation_history
+    # can be left empty and the server rebuilds it from its own session.
+    conversation_handle: Optional[str] = None
+
+
+class GreetingTarget(BaseModel):
+    npc_name: str
+    npc_location: str
+    friendship_hearts: int
+
+
+class GreetingBatchRequest(BaseModel):
+    """One game context and the NPCs to greet the player in it."""
+
+    player_name: str
+    season: str
+    day_of_month: int
+    day_of_week: int
+    time_of_day: int
+    year: int
+    weather: str
+    player_location: str
+    language: str = "en"
+    npcs: List[GreetingTarget]
+
+    def dialogue_request(self, target: GreetingTarget) -> DialogueRequest:
+        """The first-turn DialogueRequest for one of the NPCs."""
+        return DialogueRequest(
+            **self.model_dump(exclude={"npcs"}), **target.model_dump()
+        )
+
+
+class PrepareDayRequest(GreetingBatchRequest):
+    """The start of an in-game day and the NPCs in the loaded locations."""
+
+    def dialogue_request(self, target: GreetingTarget) -> DialogueRequest:
+        """The first turn the player would have with the NPC, where the NPC is."""
+        request = super().dialogue_request(target)
+        request.player_location = target.npc_location
+        return request
 
 
 class EndConversationRequest(BaseModel):
@@ -42,3 +82,12 @@ class DialogueResponse(BaseModel):
     npc_message: str
     response_options: List[str]
     friendship_change: int = 0
+    conversation_handle: Optional[str] = None  # Send back to continue the conversation
+
+
+class GreetingResult(BaseModel):
+    """One NDJSON line of /generate_greetings: a response or an error."""
+
+    npc_name: str
+    response: Optional[DialogueResponse] = None
+    error: Optional[str] = None
@@ -1,19 +1,47 @@
+import asyncio
 import logging
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+import math
+from typing import Optional, Dict, Any, List, Tuple, AsyncIterator
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Header, Request
+from fastapi.responses import StreamingResponse
 from ..models.request import (
     DialogueRequest,
     DialogueResponse,
     EndConversationRequest,
     GiftInfo,
+    GreetingBatchRequest,
+    GreetingResult,
+    PrepareDayRequest,
 )
 from ..config import settings
 from ..services.memory_service import memory_service
 from ..services.memory.emotional_state_service import emotional_state_service
-from ..services.memory.analysis_service import analysis_service
+from ..services.memory.analysis_batcher import analysis_batcher
 from ..services.llm_service import llm_service
+from ..services.llm_circuit import CircuitOpenError
+from ..services.llm_scheduler import LLMPriority
+from ..services.prompt_context import ContextBuilder
+from ..services.prompt_templates import prompt_templates, PERSONALITY_TEMPLATE
+from ..services.dialogue_context import (
+    build_context_graph,
+    dialogue_stage_metrics,
+    log_relationship_insight,
+    prefetch_relationship_contexts,
+)
+from ..services.request_context import RequestContext
+from ..services.conversation_pipeline import conversation_pipeline
+from ..services.idempotency import dialogue_replay_cache, dialogue_idempotency_key
+from ..services.session_store import session_store
+from ..services.rate_limiter import player_rate_limiter
+from ..services.degradation import degradation_controller, DegradationLevel
+from ..services.day_cache import day_cache, is_opening_turn, PreparedOpening
+from ..services.opening_pool import opening_pool
+from ..services.semantic_cache import semantic_cache
+from ..services.background_work import background_work
 from ..websockets.realtime import realtime_monitor
-from ..db import db
+from ..websockets.game_channel import game_channel
 from app.data.gift_preferences import get_gift_preference, get_gift_context_for_ai
+from app.data.canned_lines import get_canned_line, get_fallback_options
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -362,16 +390,19 @@ INSTRUCTIONS:
 
 Respond with ONLY one word: loved, liked, neutral, disliked, or hated"""
 
-        # Call LLM to determine preference
+        # Call LLM to determine preference (routed to a cheaper tier when configured)
+        valid_preferences = ["loved", "liked", "neutral", "disliked", "hated"]
         messages = [{"role": "user", "content": preference_prompt}]
         response = await llm_service.acompletion(
-            model=settings.dialogue_model, messages=messages
+            model=settings.dialogue_model,
+            messages=messages,
+            call_site="gift_inference",
+            validator=lambda text: text.strip().lower() in valid_preferences,
         )
 
         preference = response.choices[0].message.content.strip().lower()
 
         # Validate the response
-        valid_preferences = ["loved", "liked", "neutral", "disliked", "hated"]
         if preference in valid_preferences:
             logger.info(
                 f"AI determined preference for {item_name} to {npc_name}: {preference}"
@@ -423,142 +454,178 @@ def apply_npc_specific_adjustments(
         return points
 
 
+def format_memory_line(memory: dict, npc_name: str, player_name: str) -> str:
+    """Render one recalled memory for the dialogue prompt."""
+    speaker = "You" if memory["speaker"] == npc_name else player_name
+
+    # Include emotional and importance scores for context
+    memory_details = f"- {speaker} once said: '{memory['message']}'"
+    if memory.get("emotional_score", 0) > 7:
+        memory_details += " (This memory feels emotionally significant)"
+    if memory.get("location"):
+        memory_details += f" [at {memory['location']}]"
+    if memory.get("season"):
+        memory_details += f" [during {memory['season']}]"
+    return memory_details
+
+
+def enforce_rate_limit(player_name: str, kind: str):
+    """Raises 429 with Retry-After when the player's `kind` bucket is empty."""
+    retry_after = player_rate_limiter.check(player_name, kind)
+    if retry_after > 0:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Too many {kind} requests, retry in {retry_after:.1f}s",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+
+
 @router.post("/generate_dialogue", response_model=DialogueResponse)
 async def generate_dialogue(
-    request: DialogueRequest, background_tasks: BackgroundTasks
+    request: DialogueRequest,
+    background_tasks: BackgroundTasks,
+    idempotency_key: Optional[str] = Header(default=None),
 ):
+    """
+    Generates the NPC's reply and the player's options. Retries and double
+    triggers of the same request (same Idempotency-Key header, or the same
+    body of a non-opening turn if no key is sent) share one run; see
+    `dialogue_replay_cache`.
+    """
+    return await answer_dialogue(request, idempotency_key)
+
+
+async def answer_dialogue(
+    request: DialogueRequest, idempotency_key: Optional[str] = None
+) -> DialogueResponse:
+    """
+    Replay cache, rate limit and pipeline for one turn (HTTP or /ws/game).
+    Only turns that actually run are charged to the player's bucket; a
+    retried duplicate is replayed without spending a token.
+    """
+    kind = "gift" if request.gift_given else "dialogue"
+
+    async def run_turn() -> DialogueResponse:
+        enforce_rate_limit(request.player_name, kind)
+        return await run_dialogue_pipeline(request)
+
+    if not settings.idempotency_enabled:
+        return await run_turn()
+
+    # Keyed before running: gift inference fills in request.gift_given
+    key = dialogue_idempotency_key(request, idempotency_key)
+    if key is None:
+        return await run_turn()
+    return await dialogue_replay_cache.run(
+        key, run_turn, scope=(request.player_name, request.npc_name)
+    )
+
+
+def canned_dialogue_response(request: DialogueRequest) -> DialogueResponse:
+    """An in-character canned line, without context lookups or an LLM call."""
+    return DialogueResponse(
+        npc_message=get_canned_line(request.npc_name, request.language),
+        response_options=get_fallback_options(request.language),
+        friendship_change=0,
+        conversation_handle=request.conversation_handle,
+    )
+
+
+async def run_dialogue_pipeline(
+    request: DialogueRequest, ctx: Optional[RequestContext] = None
+) -> DialogueResponse:
+    """
+    Context lookups, prompt, LLM call and background persistence for one turn.
+    `ctx` may come primed with reads done in bulk for several turns.
+    """
     try:
         logger.info("Generating dialogue for: %s", request.player_name)
         logger.debug("Request details: %s", request)
 
+        # === LOAD SHEDDING ===
+        # Under LLM queue/latency pressure the turn is made cheaper, rung by
+        # rung, down to canned lines (see DegradationController)
+        level = degradation_controller.evaluate()
+        degradation_controller.record_served(level)
+
+        # The first turn of the day may have been prepared by /prepare_day; it
+        # needs no LLM call, so it is served even when shedding load
+        prepared = day_cache.take(request) if is_opening_turn(request) else None
+
+        if prepared is None and level >= DegradationLevel.CANNED:
+            logger.warning(
+                "Serving canned dialogue for %s (load shedding)", request.npc_name
+            )
+            return canned_dialogue_response(request)
+        dialogue_model = degradation_controller.dialogue_model(level)
+        if prepared is None and llm_service.is_unavailable("dialogue", dialogue_model):
+            logger.warning(
+                "Serving canned dialogue for %s (LLM circuit open)", request.npc_name
+            )
+            return canned_dialogue_response(request)
+
         # === ENHANCED MEMORY & EMOTIONAL SYSTEM ===
 
-        # 1. Obtener o crear jugador y NPC
-        logger.debug("Creating/retrieving player: %s", request.player_name)
-        player_id = await memory_service.get_or_create_player(request.player_name)
-        logger.debug("Player ID: %s", player_id)
+        # 1. Context lookups run as a dependency graph: player and NPC first,
+        # then everything keyed on their ids concurrently. Gift inference only
+        # needs the request, so it runs alongside.
+        if ctx is None:
+            ctx = RequestContext()
+        context_graph = build_context_graph(
+            request,
+            ctx,
+            search_memories=level < DegradationLevel.NO_MEMORY_SEARCH,
+        )
+        if request.gift_given:
+
+            async def gift_friendship():
+                return await calculate_gift_friendship_change(
+                    request.gift_given, request.npc_name
+                )
+
+            context_graph.add("gift_friendship", gift_friendship)
 
-        logger.debug("Creating/retrieving NPC: %s", request.npc_name)
-        npc_id = await memory_service.get_or_create_npc(
-            request.npc_name, request.npc_location
+        context = await context_graph.run()
+        dialogue_stage_metrics.record(context_graph)
+        logger.debug(
+            "Context stages: %s (critical path: %s, reads: %s)",
+            context_graph.timings,
+            " -> ".join(context_graph.critical_path()),
+            ctx.get_stats(),
         )
-        logger.debug("NPC ID: %s", npc_id)
+        await log_relationship_insight(request, context, ctx)
+
+        player_id = context["player_id"]
+        npc_id = context["npc_id"]
+        personality_profile = context["personality_profile"]
+        conversation_id = context["conversation_id"]
+
+        # Later turns and /end_conversation read the conversation from here
+        session = None
+        if settings.session_store_enabled and conversation_id:
+            session = session_store.record_turn(
+                request.player_name, request.npc_name, context
+            )
 
         if not player_id or not npc_id:
             logger.warning(
                 "Error creating player or NPC, falling back to basic dialogue"
             )
-            personality_context = ""
-            relevant_memories_str = ""
-            emotional_context = ""
-            conversation_id = ""
-            personality_profile = {}
-        else:
-            # 2. Get NPC's current emotional state towards this player
-            logger.debug(
-                "Retrieving emotional state for NPC %s towards player %s",
-                npc_id,
-                player_id,
-            )
-            emotional_state = await emotional_state_service.get_emotional_state(
-                npc_id, player_id
-            )
-            emotional_context = (
-                emotional_state_service.generate_mood_context_for_dialogue(
-                    emotional_state
-                )
-            )
 
-            # 3. Obtener perfil de personalidad
-            logger.debug(
-                "Retrieving personality profile for player %s and NPC %s",
-                player_id,
-                npc_id,
-            )
-            personality_profile = await memory_service.get_personality_profile(
-                player_id, npc_id
+        # First turns without a prepared line may be served from the shared pool
+        if prepared is None and is_opening_turn(request):
+            prepared = opening_pool.take(request, context["emotional_state"])
+
+        # Early turns may reuse the reply to a near-identical player line
+        player_embedding: List[float] = []
+        if prepared is None and semantic_cache.accepts(
+            request, context["conversation_history"]
+        ):
+            player_embedding = await memory_service.embed_text(
+                request.player_response, ctx=ctx
             )
-            logger.debug("Personality profile: %s", personality_profile)
-
-            # 🎭 GENERAR INSIGHT DE RELACIÓN
-            relationship_insight = await memory_service.generate_relationship_insight(
-                personality_profile,
-                request.player_name,
-                request.npc_name,
-                npc_id,
-                player_id,
-            )
-            logger.info("=== RELATIONSHIP INSIGHT ===")
-            for line in relationship_insight.strip().split("\n"):
-                logger.info(line)
-            logger.info("==============================")
-
-            personality_context = f"""
-**Your current perception of {request.player_name}:**
-{personality_profile["summary"]}
-
-**Basic Personality Metrics:**
-- Friendliness: {personality_profile["friendliness"]:.1f}/10
-- Extroversion: {personality_profile["extroversion"]:.1f}/10  
-- Sincerity: {personality_profile["sincerity"]:.1f}/10
-- Curiosity: {personality_profile["curiosity"]:.1f}/10
-
-**Emotional Relationship Metrics:**
-- Trust: {personality_profile["trust"]:.1f}/10 (How much you trust them)
-- Respect: {personality_profile["respect"]:.1f}/10 (How much you respect them)
-- Affection: {personality_profile["affection"]:.1f}/10 (How much you care about them)
-- Annoyance: {personality_profile["annoyance"]:.1f}/10 (How much they irritate you)
-- Admiration: {personality_profile["admiration"]:.1f}/10 (How much you admire them)
-- Romantic Interest: {personality_profile["romantic_interest"]:.1f}/10 (Any romantic feelings)
-- Humor Compatibility: {personality_profile["humor_compatibility"]:.1f}/10 (How funny you find them)
-
-IMPORTANT: Adjust your tone, dialogue, and responses based on these metrics. High affection = warmer, low trust = more guarded, high annoyance = more irritated or short responses, high romantic interest = flirtier (if appropriate for the character), etc."""
-
-            # 4. Enhanced memory search with human-like weighting
-            relevant_memories_str = ""
-            if request.player_response:
-                # Search for relevant memories with enhanced weighting
-                relevant_memories = await memory_service.search_relevant_memories(
-                    player_id, npc_id, request.player_response
-                )
-
-                if relevant_memories:
-                    memory_context = "\n**Relevant memories you recall:**\n"
-                    for memory in relevant_memories:
-                        speaker = (
-                            "You"
-                            if memory["speaker"] == request.npc_name
-                            else request.player_name
-                        )
-
-                        # Include emotional and importance scores for context
-                        memory_details = f"- {speaker} once said: '{memory['message']}'"
-                        if memory.get("emotional_score", 0) > 7:
-                            memory_details += (
-                                " (This memory feels emotionally significant)"
-                            )
-                        if memory.get("location"):
-                            memory_details += f" [at {memory['location']}]"
-                        if memory.get("season"):
-                            memory_details += f" [during {memory['season']}]"
-
-                        memory_context += memory_details + "\n"
-                    relevant_memories_str = memory_context
-
-            # 5. Obtener o crear conversación activa
-            context_data = {
-                "season": request.season,
-                "day_of_month": request.day_of_month,
-                "day_of_week": request.day_of_week,
-                "time_of_day": request.time_of_day,
-                "year": request.year,
-                "weather": request.weather,
-                "player_location": request.player_location,
-                "friendship_hearts": request.friendship_hearts,
-            }
-
-            conversation_id = await memory_service.get_or_create_active_conversation(
-                player_id, npc_id, context_data
+            prepared = semantic_cache.find(
+                request, context["emotional_state"], player_embedding
             )
 
         # === CALCULATE IMMEDIATE FRIENDSHIP CHANGE ===
@@ -566,9 +633,7 @@ IMPORTANT: Adjust your tone, dialogue, and responses based on these metrics. Hig
 
         # Handle gift-giving first
         if request.gift_given:
-            friendship_points_change = await calculate_gift_friendship_change(
-                request.gift_given, request.npc_name
-            )
+            friendship_points_change = context["gift_friendship"]
             logger.info(
                 f"Gift given - {request.gift_given.item_name} to {request.npc_name}: {friendship_points_change} friendship points"
             )
@@ -580,188 +645,52 @@ IMPORTANT: Adjust your tone, dialogue, and responses based on these metrics. Hig
                 f"Calculated friendship change: {friendship_points_change} points for {request.npc_name}"
             )
 
-        # === ENHANCED DIALOGUE PROMPT WITH EMOTIONAL STATE ===
-
-        # Build conversation history string
-        conversation_context = ""
-        if request.conversation_history:
-            conversation_context = "\n\n**Recent conversation in this interaction:**\n"
-            for entry in request.conversation_history:
-                speaker = "Player" if entry.speaker == "player" else request.npc_name
-                conversation_context += f"{speaker}: {entry.message}\n"
-
-        # Add player response if provided
-        if request.player_response:
-            conversation_context += f"Player: {request.player_response}\n"
-
-        # Add gift context if a gift was given
-        gift_context = ""
-        if request.gift_given:
-            quality_names = {0: "normal", 1: "silver", 2: "gold", 3: "iridium"}
-            quality_name = quality_names.get(request.gift_given.item_quality, "normal")
-
-            gift_context = f"\n\n**GIFT RECEIVED:**\n{request.player_name} just gave you a {quality_name} quality {request.gift_given.item_name}"
-
-            if request.gift_given.is_birthday:
-                gift_context += (
-                    " (IT'S YOUR BIRTHDAY! This gift means extra much to you!)"
+        if prepared is not None:
+            npc_message = prepared.npc_message
+            options = list(prepared.response_options)
+        else:
+            try:
+                npc_message, options = await compose_npc_turn(
+                    request,
+                    context,
+                    dialogue_model,
+                    budget_scale=degradation_controller.budget_scale(level),
                 )
-
-            if request.gift_given.gift_preference == "loved":
-                gift_context += (
-                    "\nYou LOVE this gift! It's one of your absolute favorites!"
+            except CircuitOpenError as e:
+                logger.warning(
+                    "Serving canned dialogue for %s (%s)", request.npc_name, e
                 )
-            elif request.gift_given.gift_preference == "liked":
-                gift_context += "\nYou like this gift. It's quite nice!"
-            elif request.gift_given.gift_preference == "disliked":
-                gift_context += (
-                    "\nYou don't really like this gift. It's not your taste."
+                return canned_dialogue_response(request)
+            if player_embedding:
+                semantic_cache.store(
+                    request,
+                    context["emotional_state"],
+                    player_embedding,
+                    npc_message,
+                    options,
                 )
-            elif request.gift_given.gift_preference == "hated":
-                gift_context += "\nYou HATE this gift! It's awful and offensive to you!"
-            else:
-                gift_context += (
-                    "\nThis is an okay gift. Nothing special, but the thought counts."
-                )
-
-        # Language instruction
-        language_instruction = ""
-        if request.language == "es":
-            language_instruction = "Respond in Spanish."
-        elif request.language == "en":
-            language_instruction = "Respond in English."
-        else:
-            language_instruction = f"Respond in {request.language}."
-
-        prompt = f"""You are {request.npc_name}, a character from Stardew Valley. Generate a dialogue response and conversation options based on the following context.
-
-IMPORTANT INSTRUCTIONS:
-- Do NOT use markdown formatting or special characters like *, **, [], etc.
-- Do NOT use placeholder text like [Player Name] - use the actual player name: {request.player_name}
-- Write everything in plain text
-- Be natural and conversational
-- Stay in character as {request.npc_name}
-- {language_instruction}
-- VERY IMPORTANT: The NPC message and each player response option must be no longer than 30 words. Keep them concise and short so they fit on the game screen but sometimes some can be longer, depends of the context.
-
-**YOUR CURRENT EMOTIONAL STATE:**
-{emotional_context}
-
-{personality_context}
-{relevant_memories_str}
-
-**Current Context:**
-Player: {request.player_name}
-NPC: {request.npc_name}
-Friendship Hearts: {request.friendship_hearts}
-Season: {request.season}
-Day: {request.day_of_week}, {request.day_of_month}
-Time: {request.time_of_day}
-Weather: {request.weather}
-Location: {request.player_location}
-{conversation_context}
-{gift_context}
-
-Generate a response as {request.npc_name} that:
-1. Responds naturally to the conversation{" and especially to any gift received" if request.gift_given else ""}
-2. Reflects {request.npc_name}'s personality and role in Stardew Valley
-3. Considers the friendship level and your perception of {request.player_name}
-4. References relevant memories if appropriate and meaningful
-5. Shows your current emotional state through tone and word choice
-6. Is suitable for in-game dialogue{"" if not request.gift_given else f"\n7. IMPORTANT: React appropriately to the {request.gift_given.gift_preference} gift you just received. Show genuine emotion!"}
-
-Then provide exactly 3 response options for the player with these specific tones:
-OPTION_1: A FRIENDLY/CORDIAL response - Be warm, kind, humorous, and cheerful. Show genuine interest and positivity.
-OPTION_2: A NEUTRAL/INFORMATIVE response - Be polite but direct, focused on getting important information or business matters. Professional and to-the-point.
-OPTION_3: A PROVOCATIVE/TEASING response - Be playfully mocking, sarcastic, or slightly rude. This should annoy or challenge the NPC (but not be truly offensive).
-
-Each option should lead the conversation in a different emotional direction and potentially affect the NPC's reaction based on their personality.
-
-Format your response exactly like this:
-NPC_MESSAGE: [Your response as {request.npc_name}]
-OPTION_1: [Friendly/cordial player response]
-OPTION_2: [Neutral/informative player response]  
-OPTION_3: [Provocative/teasing player response]"""
-
-        messages = [{"role": "user", "content": prompt}]
-
-        response = await llm_service.acompletion(
-            model=settings.dialogue_model, messages=messages
-        )
 
-        # Parse the response
-        response_text = response.choices[0].message.content
-        lines = response_text.split("\n")
-
-        npc_message = ""
-        options = []
-
-        for line in lines:
-            line = line.strip()
-            if line.startswith("NPC_MESSAGE:"):
-                npc_message = line.replace("NPC_MESSAGE:", "").strip()
-            elif line.startswith("OPTION_1:"):
-                options.append(line.replace("OPTION_1:", "").strip())
-            elif line.startswith("OPTION_2:"):
-                options.append(line.replace("OPTION_2:", "").strip())
-            elif line.startswith("OPTION_3:"):
-                options.append(line.replace("OPTION_3:", "").strip())
-
-        # Fallback if parsing fails
-        if not npc_message:
-            npc_message = response_text
-        if len(options) < 3:
-            if request.language == "es":
-                options = [
-                    "¡Me alegra verte! ¿Cómo has estado?",  # Friendly
-                    "¿Hay algo importante que necesite saber?",  # Neutral
-                    "¿Siempre tienes esa cara o es solo hoy?",  # Provocative
-                ]
-            else:
-                options = [
-                    "It's great to see you! How have you been?",  # Friendly
-                    "Is there anything important I should know?",  # Neutral
-                    "Do you always look like that or is it just today?",  # Provocative
-                ]
+        if session is not None:
+            session.add_lines(request.player_response, npc_message)
 
         # === ENHANCED MEMORY SAVING WITH EMBEDDINGS ===
+        # Persistence and notifications run after the response is returned, in
+        # order per player/NPC pair (see ConversationPipeline).
         if conversation_id:
-            logger.debug("Saving dialogue to conversation: %s", conversation_id)
-
-            # Guardar el mensaje del NPC con embedding
-            await memory_service.add_dialogue_entry(
-                conversation_id,
-                request.npc_name,
-                npc_message,
-                generate_embedding=True,  # Enable embeddings
-            )
-            logger.debug("Saved NPC message: %s", npc_message[:50] + "...")
-
-            # Si hay respuesta del jugador, también guardarla con embedding
-            if request.player_response:
-                await memory_service.add_dialogue_entry(
-                    conversation_id,
-                    "player",
-                    request.player_response,
-                    generate_embedding=True,  # Enable embeddings
-                )
-                logger.debug(
-                    "Saved player response: %s", request.player_response[:50] + "..."
+
+            async def persist_turn():
+                await persist_dialogue_turn(
+                    request, conversation_id, npc_message, friendship_points_change
                 )
 
-                # Send real-time notification for new dialogue
-                await realtime_monitor.notify_new_dialogue(
-                    {
-                        "conversation_id": conversation_id,
-                        "player_name": request.player_name,
-                        "npc_name": request.npc_name,
-                        "player_message": request.player_response,
-                        "npc_message": npc_message,
-                        "location": request.player_location,
-                        "friendship_hearts": request.friendship_hearts,
-                        "friendship_change": friendship_points_change,
-                    }
+            if settings.conversation_pipeline_enabled:
+                conversation_pipeline.submit(
+                    (request.player_name, request.npc_name),
+                    persist_turn,
+                    label=f"persist_turn:{conversation_id}",
                 )
+            else:
+                await persist_turn()
 
         else:
             logger.warning("No conversation ID available, not saving to memory")
@@ -770,6 +699,7 @@ OPTION_3: [Provocative/teasing player response]"""
             npc_message=npc_message,
             response_options=options[:3],  # Ensure exactly 3 options
             friendship_change=friendship_points_change,  # Return the calculated friendship change
+            conversation_handle=conversation_id or None,
         )
 
     except Exception as e:
@@ -777,57 +707,470 @@ OPTION_3: [Provocative/teasing player response]"""
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/end_conversation")
-async def end_conversation(
-    request: EndConversationRequest, background_tasks: BackgroundTasks
+async def persist_dialogue_turn(
+    request: DialogueRequest,
+    conversation_id: str,
+    npc_message: str,
+    friendship_change: int,
 ):
-    """Triggers the new unified post-conversation analysis service."""
-    try:
-        player_name = request.player_name
-        npc_name = request.npc_name
-
-        player_id = await memory_service.get_or_create_player(player_name)
-        npc_id = await memory_service.get_or_create_npc(npc_name)
-
-        if not player_id or not npc_id:
-            raise HTTPException(status_code=404, detail="Player or NPC not found")
+    """
+    Saves a turn's lines, with embeddings, and notifies the monitor. The
+    player's line is written before the NPC reply it prompted, so history
+    rebuilt in timestamp order reads as it was spoken; both are buffered
+    together and share one write-behind flush.
+    """
+    logger.debug("Saving dialogue to conversation: %s", conversation_id)
+
+    lines = []
+    if request.player_response:
+        lines.append(("player", request.player_response))
+    lines.append((request.npc_name, npc_message))
+    # Guardar las líneas del turno juntas, con embeddings
+    await memory_service.add_dialogue_entries(
+        conversation_id, lines, generate_embedding=True
+    )
+    logger.debug("Saved NPC message: %s", npc_message[:50] + "...")
+
+    if request.player_response:
+        # Send real-time notification for new dialogue
+        await realtime_monitor.notify_new_dialogue(
+            {
+                "conversation_id": conversation_id,
+                "player_name": request.player_name,
+                "npc_name": request.npc_name,
+                "player_message": request.player_response,
+                "npc_message": npc_message,
+                "location": request.player_location,
+                "friendship_hearts": request.friendship_hearts,
+                "friendship_change": friendship_change,
+            }
+        )
 
-        # Buscar conversación activa
-        from datetime import datetime, timedelta
 
-        cutoff_time = datetime.now() - timedelta(
-            minutes=settings.conversation_timeout_minutes
+async def compose_npc_turn(
+    request: DialogueRequest,
+    context: Dict[str, Any],
+    dialogue_model: str,
+    budget_scale: float = 1.0,
+    priority: LLMPriority = LLMPriority.INTERACTIVE,
+) -> Tuple[str, List[str]]:
+    """
+    Builds the dialogue prompt from a turn's resolved context (player_id,
+    npc_id, personality_profile, emotional_state, relevant_memories,
+    conversation_history and templates_version) and asks the LLM for the NPC's line and the
+    player's three options. Raises CircuitOpenError when no dialogue model
+    is available.
+    """
+    player_id = context["player_id"]
+    npc_id = context["npc_id"]
+    personality_profile = context["personality_profile"]
+    relevant_memories = context["relevant_memories"]
+    conversation_history = context["conversation_history"]
+
+    if not player_id or not npc_id:
+        # No relationship: the lookup failed, or the line is for the opening pool
+        personality_context = ""
+        emotional_context = (
+            emotional_state_service.generate_mood_context_for_dialogue(
+                context["emotional_state"]
+            )
+            if context["emotional_state"]
+            else ""
         )
-
-        result = await db.query_raw(
-            """SELECT id FROM "Conversation" 
-               WHERE "playerId" = $1 AND "npcId" = $2 
-               AND "endTime" IS NULL 
-               AND "startTime" >= $3::timestamp
-               ORDER BY "startTime" DESC LIMIT 1""",
+    else:
+        # Rendered once per profile/state version (see PromptTemplateCache)
+        emotional_context = prompt_templates.fragment(
+            "mood",
             player_id,
             npc_id,
-            cutoff_time.isoformat(),
+            lambda: emotional_state_service.generate_mood_context_for_dialogue(
+                context["emotional_state"]
+            ),
+            context["templates_version"],
+        )
+        personality_context = prompt_templates.fragment(
+            "personality",
+            player_id,
+            npc_id,
+            lambda: PERSONALITY_TEMPLATE.render(
+                player_name=request.player_name, **personality_profile
+            ),
+            context["templates_version"],
         )
 
-        if not result:
-            logger.warning(
-                f"No active conversation found for {player_name} and {npc_name}"
+    # === ENHANCED DIALOGUE PROMPT WITH EMOTIONAL STATE ===
+
+    # === TOKEN-BUDGETED CONTEXT SECTIONS ===
+    context_builder = ContextBuilder(dialogue_model, budget_scale=budget_scale)
+
+    personality_context = context_builder.fit_personality(personality_context)
+
+    relevant_memories_str = context_builder.fit_memories(
+        [
+            (
+                memory.get("relevance_score", 0.0),
+                format_memory_line(memory, request.npc_name, request.player_name),
             )
-            return {"message": "No active conversation found - nothing to end."}
+            for memory in relevant_memories
+        ],
+        header="\n**Relevant memories you recall:**\n",
+    )
+
+    # Build conversation history, including the player response if provided
+    history_turns = [
+        ("Player" if entry.speaker == "player" else request.npc_name, entry.message)
+        for entry in conversation_history
+    ]
+    if request.player_response:
+        history_turns.append(("Player", request.player_response))
+
+    conversation_context = context_builder.fit_history(
+        history_turns,
+        header="\n\n**Recent conversation in this interaction:**\n"
+        if conversation_history
+        else "",
+    )
+
+    # Add gift context if a gift was given
+    gift_context = ""
+    if request.gift_given:
+        quality_names = {0: "normal", 1: "silver", 2: "gold", 3: "iridium"}
+        quality_name = quality_names.get(request.gift_given.item_quality, "normal")
+
+        gift_context = f"\n\n**GIFT RECEIVED:**\n{request.player_name} just gave you a {quality_name} quality {request.gift_given.item_name}"
+
+        if request.gift_given.is_birthday:
+            gift_context += (
+                " (IT'S YOUR BIRTHDAY! This gift means extra much to you!)"
+            )
+
+        if request.gift_given.gift_preference == "loved":
+            gift_context += (
+                "\nYou LOVE this gift! It's one of your absolute favorites!"
+            )
+        elif request.gift_given.gift_preference == "liked":
+            gift_context += "\nYou like this gift. It's quite nice!"
+        elif request.gift_given.gift_preference == "disliked":
+            gift_context += (
+                "\nYou don't really like this gift. It's not your taste."
+            )
+        elif request.gift_given.gift_preference == "hated":
+            gift_context += "\nYou HATE this gift! It's awful and offensive to you!"
+        else:
+            gift_context += (
+                "\nThis is an okay gift. Nothing special, but the thought counts."
+            )
+
+    gift_reaction_instruction = ""
+    if request.gift_given:
+        gift_reaction_instruction = f"\n7. IMPORTANT: React appropriately to the {request.gift_given.gift_preference} gift you just received. Show genuine emotion!"
+
+    # Static text, NPC name and language instruction are compiled once per
+    # NPC/language; only the per-turn fields are rendered here
+    prompt = prompt_templates.dialogue_template(
+        request.npc_name, request.language
+    ).render(
+        player_name=request.player_name,
+        emotional_context=emotional_context,
+        personality_context=personality_context,
+        relevant_memories=relevant_memories_str,
+        friendship_hearts=request.friendship_hearts,
+        season=request.season,
+        day_of_week=request.day_of_week,
+        day_of_month=request.day_of_month,
+        time_of_day=request.time_of_day,
+        weather=request.weather,
+        player_location=request.player_location,
+        conversation_context=conversation_context,
+        gift_context=gift_context,
+        gift_focus=" and especially to any gift received"
+        if request.gift_given
+        else "",
+        gift_reaction_instruction=gift_reaction_instruction,
+    )
+
+    token_report = context_builder.report(prompt)
+    logger.info(
+        "Dialogue prompt for %s: %s tokens (sections: %s, dropped: %s)",
+        request.npc_name,
+        token_report["prompt_tokens"],
+        token_report["sections"],
+        token_report["dropped"],
+    )
+
+    messages = [{"role": "user", "content": prompt}]
+
+    interactive = priority == LLMPriority.INTERACTIVE
+    response = await llm_service.acompletion(
+        model=dialogue_model,
+        messages=messages,
+        priority=priority,
+        latency_budget=settings.dialogue_latency_budget_seconds if interactive else None,
+        call_site="dialogue",
+    )
+
+    # Parse the response
+    response_text = response.choices[0].message.content
+    lines = response_text.split("\n")
+
+    npc_message = ""
+    options = []
+
+    for line in lines:
+        line = line.strip()
+        if line.startswith("NPC_MESSAGE:"):
+            npc_message = line.replace("NPC_MESSAGE:", "").strip()
+        elif line.startswith("OPTION_1:"):
+            options.append(line.replace("OPTION_1:", "").strip())
+        elif line.startswith("OPTION_2:"):
+            options.append(line.replace("OPTION_2:", "").strip())
+        elif line.startswith("OPTION_3:"):
+            options.append(line.replace("OPTION_3:", "").strip())
+
+    # Fallback if parsing fails
+    if not npc_message:
+        npc_message = response_text
+    if len(options) < 3:
+        options = get_fallback_options(request.language)
+    return npc_message, options
+
+
+@router.post("/generate_greetings")
+async def generate_greetings(request: GreetingBatchRequest):
+    """
+    Opening lines from several NPCs in one game context (e.g. everyone in the
+    Saloon). Their relationship rows are loaded in one bulk query and their
+    dialogue pipelines run concurrently, at most `greeting_batch_concurrency`
+    at a time. Streams one GreetingResult per NPC as NDJSON, in the order
+    they finish.
+    """
+    check_greeting_batch(request)
+
+    async def stream():
+        results = greeting_results(request)
+        try:
+            async for result in results:
+                yield result.model_dump_json(exclude_none=True) + "\n"
+        finally:
+            await results.aclose()
 
-        conversation_id = result[0]["id"]
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
 
-        # Marcar conversación como terminada
-        await memory_service.end_conversation(conversation_id)
 
-        # NEW: Trigger the single, unified analysis service in the background
-        background_tasks.add_task(
-            analysis_service.analyze_conversation_and_update_memory, conversation_id
+def check_greeting_batch(request: GreetingBatchRequest):
+    """Raises 429/400 before any greeting is started."""
+    enforce_rate_limit(request.player_name, "greeting_batch")
+    if len(request.npcs) > settings.greeting_batch_max_npcs:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.greeting_batch_max_npcs} NPCs per batch",
         )
 
-        logger.info(
-            f"Conversation ended between {player_name} and {npc_name} - triggering unified memory analysis."
+
+async def greeting_results(
+    request: GreetingBatchRequest,
+) -> AsyncIterator[GreetingResult]:
+    """
+    Runs a checked greeting batch (see `check_greeting_batch`) and yields
+    each NPC's result as it finishes. Greetings still running when the
+    consumer stops are cancelled.
+    """
+    # One greeting per NPC even if the client lists one twice
+    targets = list({target.npc_name: target for target in request.npcs}.values())
+    dialogue_requests = [request.dialogue_request(target) for target in targets]
+    logger.info(
+        "Generating %d greetings for %s at %s",
+        len(targets),
+        request.player_name,
+        request.player_location,
+    )
+    contexts = await prefetch_relationship_contexts(dialogue_requests)
+    semaphore = asyncio.Semaphore(settings.greeting_batch_concurrency)
+
+    async def greet(
+        dialogue_request: DialogueRequest, ctx: RequestContext
+    ) -> GreetingResult:
+        async with semaphore:
+            try:
+                response = await run_dialogue_pipeline(dialogue_request, ctx)
+            except HTTPException as e:
+                return GreetingResult(npc_name=dialogue_request.npc_name, error=e.detail)
+        return GreetingResult(npc_name=dialogue_request.npc_name, response=response)
+
+    tasks = [
+        asyncio.create_task(greet(dialogue_request, ctx))
+        for dialogue_request, ctx in zip(dialogue_requests, contexts)
+    ]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        # Client went away: stop the greetings nobody will read
+        for task in tasks:
+            task.cancel()
+
+
+@router.post("/prepare_day", status_code=202)
+async def prepare_day(request: PrepareDayRequest):
+    """
+    Called by the mod at the start of an in-game day with the NPCs in the
+    loaded locations. In the background, loads each NPC's personality
+    profile and emotional state, renders their mood and personality prompt
+    fragments and generates an opening line, so the player's first click on
+    them that day is answered without an LLM call (see DayPrecomputeCache).
+    """
+    if not settings.prepare_day_enabled:
+        return {"message": "Day preparation is disabled.", "npcs": 0}
+    requests = plan_day(request)
+    background_work.run(prepare_openings(requests), label="prepare_day")
+    return {"message": "Preparing the day in the background.", "npcs": len(requests)}
+
+
+def plan_day(request: PrepareDayRequest) -> List[DialogueRequest]:
+    """
+    The opening turns to prepare for a day, one per NPC that has no fitting
+    line ready yet; 400 if too many, 429 if the player asks too often.
+    """
+    enforce_rate_limit(request.player_name, "prepare_day")
+    if len(request.npcs) > settings.prepare_day_max_entries:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.prepare_day_max_entries} NPCs per day",
+        )
+
+    targets = list({target.npc_name: target for target in request.npcs}.values())
+    requests = [
+        dialogue_request
+        for dialogue_request in map(request.dialogue_request, targets)
+        if not day_cache.has_ready(dialogue_request)
+    ]
+    logger.info(
+        "Preparing day %s %s for %s: %d NPCs (%d already ready)",
+        request.season,
+        request.day_of_month,
+        request.player_name,
+        len(requests),
+        len(targets) - len(requests),
+    )
+    return requests
+
+
+async def prepare_openings(requests: List[DialogueRequest]):
+    """Prepares opening lines, `prepare_day_concurrency` NPCs at a time."""
+    semaphore = asyncio.Semaphore(settings.prepare_day_concurrency)
+
+    async def prepare(request: DialogueRequest):
+        async with semaphore:
+            try:
+                await prepare_opening(request)
+            except Exception as e:
+                day_cache.failed += 1
+                logger.warning(f"Could not prepare opening line for {request.npc_name}: {e}")
+
+    await asyncio.gather(*(prepare(request) for request in requests))
+
+
+async def prepare_opening(request: DialogueRequest):
+    """
+    Loads and caches what the NPC's first turn needs and stores a generated
+    opening line. No conversation is opened; that happens on the first click.
+    Skipped while dialogue is degraded, since it only adds LLM load, and when
+    a fitting line is already ready (e.g. an overlapping /prepare_day).
+    """
+    if degradation_controller.evaluate() > DegradationLevel.NORMAL:
+        return
+    if day_cache.has_ready(request):
+        return
+
+    ctx = RequestContext()
+    player_id = await memory_service.get_or_create_player(request.player_name, ctx=ctx)
+    npc_id = await memory_service.get_or_create_npc(
+        request.npc_name, request.npc_location, ctx=ctx
+    )
+    # Read before the profile and state, so a concurrent update marks the line stale
+    version = prompt_templates.version(player_id, npc_id)
+    personality_profile, emotional_state = await asyncio.gather(
+        memory_service.get_personality_profile(player_id, npc_id, ctx=ctx),
+        memory_service.get_emotional_state(npc_id, player_id, ctx=ctx),
+    )
+    context = {
+        "player_id": player_id,
+        "npc_id": npc_id,
+        "personality_profile": personality_profile,
+        "emotional_state": emotional_state,
+        "relevant_memories": [],
+        "conversation_history": [],
+        "templates_version": version,
+    }
+    npc_message, options = await compose_npc_turn(
+        request, context, settings.dialogue_model, priority=LLMPriority.BACKGROUND
+    )
+    day_cache.store(
+        request.player_name,
+        request.npc_name,
+        PreparedOpening(request, player_id, npc_id, version, npc_message, options),
+    )
+    # Lets a client on /ws/game know the first click on this NPC is ready
+    await game_channel.push(
+        request.player_name,
+        {
+            "type": "opening_ready",
+            "npc_name": request.npc_name,
+            "npc_message": npc_message,
+            "response_options": options,
+        },
+    )
+
+
+async def generate_pool_opening(
+    template: DialogueRequest, emotional_state: Dict[str, Any]
+) -> Optional[Tuple[str, List[str]]]:
+    """
+    Writes one line for the shared opening pool (see OpeningPool), from the
+    bucket's template turn and mood alone. Nothing is generated while
+    dialogue is degraded.
+    """
+    if degradation_controller.evaluate() > DegradationLevel.NORMAL:
+        return None
+    context = {
+        "player_id": "",
+        "npc_id": "",
+        "personality_profile": {},
+        "emotional_state": emotional_state,
+        "relevant_memories": [],
+        "conversation_history": [],
+    }
+    return await compose_npc_turn(
+        template, context, settings.dialogue_model, priority=LLMPriority.BACKGROUND
+    )
+
+
+async def find_active_conversation_id(player_name: str, npc_name: str) -> Optional[str]:
+    """Looks the active conversation up in the database (no session in memory)."""
+    player_id = await memory_service.get_or_create_player(player_name)
+    npc_id = await memory_service.get_or_create_npc(npc_name)
+
+    if not player_id or not npc_id:
+        raise HTTPException(status_code=404, detail="Player or NPC not found")
+
+    # Buscar conversación activa (por última actividad, como las sesiones)
+    return await memory_service.find_active_conversation(player_id, npc_id)
+
+
+@router.post("/end_conversation")
+async def end_conversation(request: EndConversationRequest):
+    """Triggers the new unified post-conversation analysis service."""
+    try:
+        enforce_rate_limit(request.player_name, "end_conversation")
+        conversation_id = await close_conversation(
+            request.player_name, request.npc_name
+        )
+        if not conversation_id:
+            return {"message": "No active conversation found - nothing to end."}
+
+        # Trigger the unified analysis in the background (batched when enabled)
+        background_work.run(
+            analysis_batcher.submit(conversation_id), label=f"analysis:{conversation_id}"
         )
 
         return {
@@ -842,6 +1185,41 @@ async def end_conversation(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def close_conversation(player_name: str, npc_name: str) -> Optional[str]:
+    """
+    Marks the pair's active conversation as ended once its last turns are
+    persisted. Returns its id for analysis, or None if there was none.
+    """
+    # Replies of the ended conversation must not be replayed into the next one
+    dialogue_replay_cache.forget((player_name, npc_name))
+    session = (
+        session_store.end(player_name, npc_name)
+        if settings.session_store_enabled
+        else None
+    )
+    if session is not None:
+        conversation_id = session.conversation_id
+    else:
+        conversation_id = await find_active_conversation_id(player_name, npc_name)
+
+    if not conversation_id:
+        logger.warning(
+            f"No active conversation found for {player_name} and {npc_name}"
+        )
+        return None
+
+    # Let the last turns finish persisting before the transcript is analyzed
+    await conversation_pipeline.wait_for((player_name, npc_name))
+
+    # Marcar conversación como terminada
+    await memory_service.end_conversation(conversation_id)
+
+    logger.info(
+        f"Conversation ended between {player_name} and {npc_name} - triggering unified memory analysis."
+    )
+    return conversation_id
+
+
 @router.get("/gift_preferences/{npc_name}")
 async def get_npc_gift_preferences(npc_name: str):
     """Get gift preferences for a specific NPC."""
@@ -916,9 +1294,15 @@ async def get_all_gift_preferences():
 
 
 @router.post("/check_gift_preference")
-async def check_gift_preference(request: dict):
+async def check_gift_preference(request: dict, http_request: Request):
     """Check how much a specific NPC would like a specific gift."""
     try:
+        # Limited per player when the client says who it is, else per address
+        enforce_rate_limit(
+            request.get("player_name")
+            or (http_request.client.host if http_request.client else "unknown"),
+            "gift",
+        )
         npc_name = request.get("npc_name")
         item_name = request.get("item_name")
         item_category = request.get("item_category", "Unknown")
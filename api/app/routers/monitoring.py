@@ -9,6 +9,22 @@ from ..services.memory_service import memory_service
 from ..services.memory.emotional_state_service import emotional_state_service
 from ..services.memory.personality_service import personality_service
 from ..services.memory.vector_service import vector_service
+from ..services.llm_service import llm_service
+from ..services.llm_metrics import llm_metrics
+from ..services.memory.analysis_batcher import analysis_batcher
+from ..services.dialogue_context import dialogue_stage_metrics
+from ..services.conversation_pipeline import conversation_pipeline
+from ..services.memory.dialogue_writer import dialogue_writer
+from ..services.prompt_templates import prompt_templates
+from ..services.idempotency import dialogue_replay_cache
+from ..services.session_store import session_store
+from ..services.rate_limiter import player_rate_limiter
+from ..services.degradation import degradation_controller
+from ..services.day_cache import day_cache
+from ..services.opening_pool import opening_pool
+from ..services.semantic_cache import semantic_cache
+from ..websockets.game_channel import game_channel
+from ..services.background_work import background_work
 
 logger = logging.getLogger(__name__)
 
@@ -821,6 +837,120 @@ async def get_system_stats():
         }
 
 
+@router.get("/api/llm/scheduler")
+async def get_llm_scheduler_stats():
+    """Get per-provider LLM queue depth and wait times by priority class"""
+    return {"providers": llm_service.scheduler.get_stats()}
+
+
+@router.get("/api/llm/hedging")
+async def get_llm_hedging_stats():
+    """Get per-model hedge rate, hedge win rate and observed latency"""
+    return {"models": llm_service.hedge_tracker.get_stats()}
+
+
+@router.get("/api/llm/circuits")
+async def get_llm_circuit_stats():
+    """Get circuit breaker state, failure rate and rejected calls per provider/model"""
+    return llm_service.circuits.get_stats()
+
+
+@router.get("/api/llm/metrics")
+async def get_llm_metrics():
+    """Get rolling latency, token and cost histograms per LLM call site"""
+    return llm_metrics.snapshot()
+
+
+@router.get("/api/llm/http_pool")
+async def get_llm_http_pool_stats():
+    """Get connection pool and per-host utilization of the shared LLM HTTP client"""
+    return llm_service.get_http_pool_stats()
+
+
+@router.get("/api/dialogue/stages")
+async def get_dialogue_stage_metrics():
+    """Get per-stage context assembly timings and critical-path counts"""
+    return dialogue_stage_metrics.snapshot()
+
+
+@router.get("/api/dialogue/pipeline")
+async def get_conversation_pipeline_stats():
+    """Get pending and failed background dialogue side effects"""
+    return conversation_pipeline.get_stats()
+
+
+@router.get("/api/dialogue/writes")
+async def get_dialogue_write_stats():
+    """Get write-behind buffer, flush and journal replay stats for dialogue lines"""
+    return dialogue_writer.get_stats()
+
+
+@router.get("/api/dialogue/prompt_cache")
+async def get_prompt_cache_stats():
+    """Get compiled dialogue template and cached prompt fragment hit rates"""
+    return prompt_templates.get_stats()
+
+
+@router.get("/api/dialogue/idempotency")
+async def get_dialogue_idempotency_stats():
+    """Get executed, replayed and joined duplicate dialogue requests"""
+    return dialogue_replay_cache.get_stats()
+
+
+@router.get("/api/dialogue/sessions")
+async def get_session_store_stats():
+    """Get active conversation sessions and how often turns were served from them"""
+    return session_store.get_stats()
+
+
+@router.get("/api/rate_limits")
+async def get_player_rate_limit_stats():
+    """Get per-player allowed and rejected requests for each rate-limited endpoint"""
+    return player_rate_limiter.get_stats()
+
+
+@router.get("/api/dialogue/degradation")
+async def get_dialogue_degradation():
+    """Get the current load-shedding level, its signals and recent transitions"""
+    return degradation_controller.get_stats()
+
+
+@router.get("/api/dialogue/prepared_openings")
+async def get_prepared_opening_stats():
+    """Get opening lines prepared by /prepare_day and how many were served"""
+    return day_cache.get_stats()
+
+
+@router.get("/api/dialogue/opening_pool")
+async def get_opening_pool_stats():
+    """Get pooled opening lines, hit rate and background refills"""
+    return opening_pool.get_stats()
+
+
+@router.get("/api/dialogue/semantic_cache")
+async def get_semantic_cache_stats():
+    """Get cached replies, hit rate and recent lookup similarities"""
+    return semantic_cache.get_stats()
+
+
+@router.get("/api/game_channel")
+async def get_game_channel_stats():
+    """Get game clients connected on /ws/game, requests in flight and pushes"""
+    return game_channel.get_stats()
+
+
+@router.get("/api/background_work")
+async def get_background_work_stats():
+    """Get analysis and day preparation tasks running after their request"""
+    return background_work.get_stats()
+
+
+@router.get("/api/analysis/batching")
+async def get_analysis_batching_stats():
+    """Get batch sizes, fallbacks and prompt tokens saved by batched analysis"""
+    return analysis_batcher.get_stats()
+
+
 @router.delete("/api/admin/clear-data")
 async def clear_all_data(confirm: bool = False):
     """Clear all monitoring data (admin only)"""
@@ -1,6 +1,20 @@
+import json
 import logging
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query
+from typing import Any, Dict
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, Query
+from pydantic import BaseModel, ValidationError
+from ..config import settings
+from ..models.request import (
+    DialogueRequest,
+    EndConversationRequest,
+    GreetingBatchRequest,
+    PrepareDayRequest,
+)
+from ..services.memory.analysis_batcher import analysis_batcher
 from ..websockets.realtime import realtime_monitor
+from ..websockets.game_channel import game_channel, GameConnection
+from ..services.background_work import background_work
+from . import dialogue
 
 logger = logging.getLogger(__name__)
 
@@ -54,3 +68,177 @@ async def websocket_monitoring_endpoint(
         logger.error(f"WebSocket error: {e}")
     finally:
         await realtime_monitor.disconnect(websocket)
+
+
+# Request types accepted on /ws/game and the payload model each one expects
+GAME_REQUEST_MODELS = {
+    "dialogue": DialogueRequest,
+    "greetings": GreetingBatchRequest,
+    "end_conversation": EndConversationRequest,
+    "prepare_day": PrepareDayRequest,
+}
+
+
+@router.websocket("/ws/game")
+async def websocket_game_endpoint(websocket: WebSocket, player_name: str = Query()):
+    """
+    Persistent channel for the game mod's traffic: dialogue turns, greeting
+    batches, end of conversations and day preparation, over one connection
+    instead of one HTTP request each. They go through the same code as the
+    HTTP endpoints.
+
+    Client frames are `{"id", "type", "payload"}`, where `type` is one of
+    GAME_REQUEST_MODELS and `payload` is that endpoint's request body
+    (`dialogue` also accepts an `idempotency_key`). Requests are handled
+    concurrently, up to `game_channel_max_in_flight` per connection, and
+    every reply frame carries the request's id and type: a `result`, or an
+    `error` with the HTTP status and detail. A greeting batch answers with
+    one frame per NPC; the frame with `"done": true` ends each request.
+
+    Frames without an id are pushed by the server, e.g. `opening_ready` when
+    /prepare_day has a first line ready for an NPC.
+    """
+    if not settings.game_channel_enabled:
+        await websocket.close(code=1008)
+        return
+
+    connection = await game_channel.connect(websocket, player_name)
+    try:
+        while True:
+            data = await websocket.receive_text()
+            if data == "ping":
+                await connection.send("pong")
+                continue
+
+            try:
+                message = json.loads(data)
+                request_id = message["id"]
+                request_type = message["type"]
+            except (json.JSONDecodeError, KeyError, TypeError):
+                game_channel.errors += 1
+                await connection.send(
+                    {
+                        "id": None,
+                        "type": "error",
+                        "error": {"status": 400, "detail": "Malformed message"},
+                        "done": True,
+                    }
+                )
+                continue
+
+            game_channel.requests += 1
+            if len(connection.tasks) >= settings.game_channel_max_in_flight:
+                await send_game_error(
+                    connection,
+                    request_id,
+                    request_type,
+                    429,
+                    "Too many requests in flight",
+                )
+                continue
+            connection.start(
+                handle_game_request(connection, request_id, request_type, message)
+            )
+
+    except WebSocketDisconnect:
+        logger.info(f"Game WebSocket client disconnected ({player_name})")
+    except Exception as e:
+        logger.error(f"Game WebSocket error: {e}")
+    finally:
+        await game_channel.disconnect(connection)
+
+
+async def send_game_error(
+    connection: GameConnection,
+    request_id: Any,
+    request_type: str,
+    status: int,
+    detail: Any,
+):
+    game_channel.errors += 1
+    await connection.send(
+        {
+            "id": request_id,
+            "type": request_type,
+            "error": {"status": status, "detail": detail},
+            "done": True,
+        }
+    )
+
+
+async def handle_game_request(
+    connection: GameConnection,
+    request_id: Any,
+    request_type: str,
+    message: Dict[str, Any],
+):
+    """Validates one /ws/game request, runs it and sends its reply frames."""
+
+    async def fail(status: int, detail: Any):
+        await send_game_error(connection, request_id, request_type, status, detail)
+
+    model = GAME_REQUEST_MODELS.get(request_type)
+    if model is None:
+        await fail(400, f"Unknown request type '{request_type}'")
+        return
+    try:
+        request = model.model_validate(message.get("payload") or {})
+    except ValidationError as e:
+        await fail(422, json.loads(e.json(include_url=False)))
+        return
+    if request.player_name != connection.player_name:
+        await fail(403, "player_name does not match the connection")
+        return
+
+    async def reply(result: Any, done: bool = True):
+        if isinstance(result, BaseModel):
+            result = result.model_dump(mode="json", exclude_none=True)
+        await connection.send(
+            {"id": request_id, "type": request_type, "result": result, "done": done}
+        )
+
+    try:
+        if request_type == "dialogue":
+            response = await dialogue.answer_dialogue(
+                request, message.get("idempotency_key")
+            )
+            await reply(response)
+
+        elif request_type == "greetings":
+            dialogue.check_greeting_batch(request)
+            results = dialogue.greeting_results(request)
+            try:
+                async for result in results:
+                    await reply(result, done=False)
+            finally:
+                await results.aclose()
+            await reply(None)
+
+        elif request_type == "end_conversation":
+            dialogue.enforce_rate_limit(request.player_name, "end_conversation")
+            conversation_id = await dialogue.close_conversation(
+                request.player_name, request.npc_name
+            )
+            if conversation_id:
+                # Analysis outlives this request and the connection
+                background_work.run(
+                    analysis_batcher.submit(conversation_id),
+                    label=f"analysis:{conversation_id}",
+                )
+            await reply({"conversation_id": conversation_id})
+
+        elif request_type == "prepare_day":
+            requests = (
+                dialogue.plan_day(request) if settings.prepare_day_enabled else []
+            )
+            if requests:
+                background_work.run(
+                    dialogue.prepare_openings(requests), label="prepare_day"
+                )
+            await reply({"npcs": len(requests)})
+
+    except HTTPException as e:
+        await fail(e.status_code, e.detail)
+    except Exception as e:
+        logger.error(f"Error handling game request {request_type} {request_id}: {e}")
+        await fail(500, str(e))
@@ -0,0 +1,64 @@
+import asyncio
+import logging
+from typing import Dict, Any, Awaitable, Optional, Set
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundWork:
+    """
+    Work started by a request that outlives it (conversation analysis, day
+    preparation), from HTTP endpoints and /ws/game alike.
+
+    Tasks stay referenced until they finish, and `drain` waits for them on
+    shutdown so they do not run against a closed database.
+    """
+
+    def __init__(self):
+        self._tasks: Set[asyncio.Task] = set()
+        self.started = 0
+        self.failed = 0
+        self.cancelled_on_shutdown = 0
+
+    def run(self, work: Awaitable[Any], label: str = ""):
+        task = asyncio.create_task(self._run(work, label))
+        self.started += 1
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, work: Awaitable[Any], label: str):
+        try:
+            await work
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Background work '{label}' failed: {e}")
+
+    async def drain(self, timeout: Optional[float] = None):
+        """Waits for running work; what is left after `timeout` is cancelled."""
+        if not self._tasks:
+            return
+        if timeout is None:
+            timeout = settings.conversation_pipeline_drain_timeout_seconds
+        logger.info(f"Draining {len(self._tasks)} background tasks...")
+        _, still_pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        if still_pending:
+            logger.warning(
+                f"Cancelling {len(still_pending)} background tasks that did not finish before shutdown"
+            )
+            self.cancelled_on_shutdown += len(still_pending)
+            for task in still_pending:
+                task.cancel()
+            await asyncio.gather(*still_pending, return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "running": len(self._tasks),
+            "started": self.started,
+            "failed": self.failed,
+            "cancelled_on_shutdown": self.cancelled_on_shutdown,
+        }
+
+
+background_work = BackgroundWork()
@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Any, Hashable, Callable, Awaitable, Optional, Set
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationPipeline:
+    """
+    Runs post-response side effects (dialogue persistence, notifications) in
+    the background, in submission order per conversation key.
+
+    Jobs for the same key run one after another, so entries keep their order
+    and a failed job does not block the ones after it. Readers that need a
+    conversation's earlier writes (memory search, end-of-conversation
+    analysis) call `wait_for` first. Jobs for different keys run
+    concurrently. `drain` waits for everything on shutdown.
+    """
+
+    def __init__(self):
+        self._tails: Dict[Hashable, asyncio.Task] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.max_lag_ms = 0.0
+
+    def submit(self, key: Hashable, job: Callable[[], Awaitable[Any]], label: str = ""):
+        """Schedules `job` after every job already submitted for `key`."""
+        previous = self._tails.get(key)
+        submitted_at = time.monotonic()
+        task = asyncio.create_task(self._run(previous, job, submitted_at, label))
+        self.submitted += 1
+        self._tails[key] = task
+        self._tasks.add(task)
+
+        def _done(finished: asyncio.Task):
+            self._tasks.discard(finished)
+            if self._tails.get(key) is finished:
+                del self._tails[key]
+
+        task.add_done_callback(_done)
+
+    async def _run(
+        self,
+        previous: Optional[asyncio.Task],
+        job: Callable[[], Awaitable[Any]],
+        submitted_at: float,
+        label: str,
+    ):
+        if previous is not None:
+            # Wait for the earlier job without inheriting its failure
+            await asyncio.wait({previous})
+        try:
+            await job()
+            self.completed += 1
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Background side effect '{label}' failed: {e}")
+        finally:
+            lag_ms = (time.monotonic() - submitted_at) * 1000
+            self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+
+    async def wait_for(self, key: Hashable, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until every job submitted so far for `key` has finished.
+        Returns False if the timeout expired first.
+        """
+        tail = self._tails.get(key)
+        if tail is None:
+            return True
+        if timeout is None:
+            timeout = settings.conversation_pipeline_wait_timeout_seconds
+        done, _ = await asyncio.wait({tail}, timeout=timeout)
+        if not done:
+            logger.warning(f"Timed out waiting for pending writes of {key}")
+        return bool(done)
+
+    async def drain(self, timeout: Optional[float] = None):
+        """Waits for all pending jobs, e.g. before the database disconnects."""
+        if not self._tasks:
+            return
+        if timeout is None:
+            timeout = settings.conversation_pipeline_drain_timeout_seconds
+        pending = len(self._tasks)
+        logger.info(f"Draining {pending} background side effects...")
+        _, still_pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        if still_pending:
+            logger.warning(
+                f"{len(still_pending)} background side effects did not finish before shutdown"
+            )
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.conversation_pipeline_enabled,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "pending": len(self._tasks),
+            "active_conversations": len(self._tails),
+            "max_lag_ms": self.max_lag_ms,
+        }
+
+
+conversation_pipeline = ConversationPipeline()
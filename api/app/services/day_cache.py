@@ -0,0 +1,128 @@
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+from app.config import settings
+from app.models.request import DialogueRequest
+from app.services.prompt_templates import prompt_templates
+
+logger = logging.getLogger(__name__)
+
+
+def is_opening_turn(request: DialogueRequest) -> bool:
+    """A first turn: no player response, history, gift or conversation to continue."""
+    return not (
+        request.player_response
+        or request.conversation_history
+        or request.gift_given
+        or request.conversation_handle
+    )
+
+
+def _day_key(request: DialogueRequest) -> Tuple[int, str, int]:
+    return (request.year, request.season, request.day_of_month)
+
+
+class PreparedOpening:
+    """An opening line generated ahead of the player's first click on an NPC."""
+
+    def __init__(
+        self,
+        request: DialogueRequest,
+        player_id: str,
+        npc_id: str,
+        version: int,
+        npc_message: str,
+        response_options: List[str],
+    ):
+        self.day = _day_key(request)
+        self.weather = request.weather
+        # Prepared lines are written with the player standing where the NPC is
+        self.location = request.player_location
+        self.language = request.language
+        self.friendship_hearts = request.friendship_hearts
+        self.time_of_day = request.time_of_day
+        self.player_id = player_id
+        self.npc_id = npc_id
+        # Profile/state version the line was written from (see PromptTemplateCache)
+        self.version = version
+        self.npc_message = npc_message
+        self.response_options = response_options
+
+    def matches(self, request: DialogueRequest) -> bool:
+        """
+        Same day, weather, location, language and hearts, and not too late in
+        the day.
+        """
+        return (
+            self.day == _day_key(request)
+            and self.weather == request.weather
+            and self.location == request.player_location
+            and self.language == request.language
+            and self.friendship_hearts == request.friendship_hearts
+            and request.time_of_day - self.time_of_day
+            <= settings.prepare_day_max_time_gap
+            and self.version == prompt_templates.version(self.player_id, self.npc_id)
+        )
+
+
+class DayPrecomputeCache:
+    """
+    Opening lines prepared by /prepare_day, one per (player, NPC).
+
+    A prepared line is used once, for the pair's first opening turn that
+    matches it (see `PreparedOpening.matches`); a line that no longer
+    matches (another day, weather or mood after a conversation was analyzed)
+    is dropped. Bounded by `prepare_day_max_entries`, least recently
+    prepared first.
+    """
+
+    def __init__(self):
+        self._openings: "OrderedDict[Tuple[str, str], PreparedOpening]" = OrderedDict()
+        self.prepared = 0
+        self.served = 0
+        self.stale = 0
+        self.misses = 0
+        self.failed = 0
+
+    def store(self, player_name: str, npc_name: str, opening: PreparedOpening):
+        key = (player_name, npc_name)
+        self._openings[key] = opening
+        self._openings.move_to_end(key)
+        self.prepared += 1
+        while len(self._openings) > settings.prepare_day_max_entries:
+            self._openings.popitem(last=False)
+
+    def has_ready(self, request: DialogueRequest) -> bool:
+        """Whether the pair already holds a line that fits this turn."""
+        opening = self._openings.get((request.player_name, request.npc_name))
+        return opening is not None and opening.matches(request)
+
+    def take(self, request: DialogueRequest) -> Optional[PreparedOpening]:
+        """Removes and returns the pair's prepared line if it fits this turn."""
+        opening = self._openings.pop((request.player_name, request.npc_name), None)
+        if opening is None:
+            self.misses += 1
+            return None
+        if not opening.matches(request):
+            self.stale += 1
+            return None
+        self.served += 1
+        logger.info(
+            f"Serving prepared opening line for {request.npc_name} to {request.player_name}"
+        )
+        return opening
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.prepare_day_enabled,
+            "ready": len(self._openings),
+            "prepared": self.prepared,
+            "served": self.served,
+            "stale": self.stale,
+            "misses": self.misses,
+            "failed": self.failed,
+        }
+
+
+day_cache = DayPrecomputeCache()
@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from enum import IntEnum
+from typing import Dict, Any, Optional
+
+from app.config import settings
+from app.services.llm_scheduler import percentile
+from app.services.llm_metrics import llm_metrics
+from app.services.llm_service import llm_service
+
+logger = logging.getLogger(__name__)
+
+# Import realtime monitor for WebSocket notifications
+try:
+    from app.websockets.realtime import realtime_monitor
+
+    REALTIME_AVAILABLE = True
+except ImportError:
+    REALTIME_AVAILABLE = False
+
+
+class DegradationLevel(IntEnum):
+    """Rungs of the load-shedding ladder; each level includes the ones below it."""
+
+    NORMAL = 0
+    NO_MEMORY_SEARCH = 1  # Skip the embedding + vector memory search
+    REDUCED_CONTEXT = 2  # Shrink the prompt's section token budgets
+    FAST_MODEL = 3  # Use degradation_fast_model for dialogue
+    CANNED = 4  # Serve canned per-NPC lines, no LLM call
+
+
+class DegradationController:
+    """
+    Steps the dialogue pipeline down a degradation ladder under load and back
+    up when load recedes.
+
+    Pressure is read from the LLM scheduler's queue depth and the p95 wall
+    time of recent dialogue calls against `degradation_latency_slo_ms`. Under
+    pressure the level rises one rung at a time; once both signals are below
+    their recovery thresholds it falls one rung at a time. A rung is held for
+    at least `degradation_hold_seconds` so the level does not flap.
+    """
+
+    def __init__(self):
+        self.level = DegradationLevel.NORMAL
+        self._changed_at = time.monotonic()
+        self._evaluated_at = 0.0
+        self.queue_depth = 0
+        self.latency_p95_ms = 0.0
+        self.served: Dict[str, int] = {
+            level.name.lower(): 0 for level in DegradationLevel
+        }
+        self.transitions: deque = deque(maxlen=20)
+
+    def evaluate(self) -> DegradationLevel:
+        """Level for a new request; signals are re-read at most once per interval."""
+        if not settings.degradation_enabled:
+            return DegradationLevel.NORMAL
+        if settings.degradation_forced_level is not None:
+            return DegradationLevel(settings.degradation_forced_level)
+
+        now = time.monotonic()
+        if now - self._evaluated_at >= settings.degradation_eval_interval_seconds:
+            self._evaluated_at = now
+            self._update(now)
+        return self.level
+
+    def _update(self, now: float):
+        self.queue_depth = llm_service.scheduler.queue_depth()
+        latencies = llm_metrics.recent_wall_times_ms(
+            "dialogue", settings.degradation_latency_window_seconds
+        )
+        self.latency_p95_ms = (
+            percentile(latencies, 95)
+            if len(latencies) >= settings.degradation_min_samples
+            else 0.0
+        )
+
+        slo = settings.degradation_latency_slo_ms
+        overloaded = (
+            self.queue_depth >= settings.degradation_queue_depth_high
+            or self.latency_p95_ms > slo
+        )
+        recovered = (
+            self.queue_depth <= settings.degradation_queue_depth_low
+            and self.latency_p95_ms <= slo * settings.degradation_recover_ratio
+        )
+
+        if now - self._changed_at < settings.degradation_hold_seconds:
+            return
+        if overloaded and self.level < DegradationLevel.CANNED:
+            self._set_level(DegradationLevel(self.level + 1), now)
+        elif recovered and self.level > DegradationLevel.NORMAL:
+            self._set_level(DegradationLevel(self.level - 1), now)
+
+    def _set_level(self, level: DegradationLevel, now: float):
+        previous = self.level
+        self.level = level
+        self._changed_at = now
+        transition = {
+            "from": previous.name.lower(),
+            "to": level.name.lower(),
+            "queue_depth": self.queue_depth,
+            "latency_p95_ms": self.latency_p95_ms,
+            "at": time.time(),
+        }
+        self.transitions.append(transition)
+        log = logger.warning if level > previous else logger.info
+        log(
+            f"Dialogue degradation {previous.name} -> {level.name} "
+            f"(queue depth {self.queue_depth}, p95 {self.latency_p95_ms:.0f}ms)"
+        )
+        if REALTIME_AVAILABLE:
+            try:
+                asyncio.get_running_loop().create_task(
+                    realtime_monitor.notify_degradation_level(self.get_stats())
+                )
+            except RuntimeError:
+                pass  # No running loop (e.g. called from sync code)
+
+    def record_served(self, level: DegradationLevel):
+        self.served[level.name.lower()] += 1
+
+    def dialogue_model(self, level: DegradationLevel) -> str:
+        if level >= DegradationLevel.FAST_MODEL and settings.degradation_fast_model:
+            return settings.degradation_fast_model
+        return settings.dialogue_model
+
+    def budget_scale(self, level: DegradationLevel) -> float:
+        if level >= DegradationLevel.REDUCED_CONTEXT:
+            return settings.degradation_budget_scale
+        return 1.0
+
+    def get_stats(self) -> Dict[str, Any]:
+        forced: Optional[int] = settings.degradation_forced_level
+        return {
+            "enabled": settings.degradation_enabled,
+            "level": self.level.name.lower(),
+            "level_value": int(self.level),
+            "forced_level": DegradationLevel(forced).name.lower()
+            if forced is not None
+            else None,
+            "queue_depth": self.queue_depth,
+            "latency_p95_ms": self.latency_p95_ms,
+            "latency_slo_ms": settings.degradation_latency_slo_ms,
+            "served": dict(self.served),
+            "transitions": list(self.transitions),
+        }
+
+
+degradation_controller = DegradationController()
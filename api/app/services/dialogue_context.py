@@ -0,0 +1,319 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Any, List, Callable, Awaitable, Sequence, Tuple
+
+from app.config import settings
+from app.models.request import DialogueRequest, ConversationEntry
+from app.services.memory_service import memory_service
+from app.services.request_context import RequestContext
+from app.services.conversation_pipeline import conversation_pipeline
+from app.services.session_store import session_store
+from app.services.prompt_templates import prompt_templates
+from app.services.llm_metrics import RollingHistogram, LATENCY_BUCKETS_MS
+
+logger = logging.getLogger(__name__)
+
+
+class StageGraph:
+    """
+    Runs named async stages as soon as the stages they depend on finish, and
+    records when each stage started and how long it took.
+
+    Stages must be added after their dependencies. Each stage function is
+    called with the results of its dependencies, in the order listed.
+    """
+
+    def __init__(self):
+        self._stages: Dict[str, Tuple[Callable[..., Awaitable[Any]], Tuple[str, ...]]] = {}
+        self.timings: Dict[str, Dict[str, float]] = {}
+
+    def add(
+        self,
+        name: str,
+        fn: Callable[..., Awaitable[Any]],
+        deps: Sequence[str] = (),
+    ):
+        for dep in deps:
+            if dep not in self._stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+        self._stages[name] = (fn, tuple(deps))
+
+    async def run(self) -> Dict[str, Any]:
+        """Runs every stage; the first failure cancels the rest and is raised."""
+        started = time.monotonic()
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_stage(name: str):
+            fn, deps = self._stages[name]
+            args = [await tasks[dep] for dep in deps]
+            stage_started = time.monotonic()
+            try:
+                return await fn(*args)
+            finally:
+                self.timings[name] = {
+                    "start_ms": (stage_started - started) * 1000,
+                    "duration_ms": (time.monotonic() - stage_started) * 1000,
+                }
+
+        for name in self._stages:
+            tasks[name] = asyncio.create_task(run_stage(name))
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            raise
+
+        return {name: task.result() for name, task in tasks.items()}
+
+    def critical_path(self) -> List[str]:
+        """Stages on the longest chain, walking back from the last stage to finish."""
+        if not self.timings:
+            return []
+
+        def end(name: str) -> float:
+            timing = self.timings[name]
+            return timing["start_ms"] + timing["duration_ms"]
+
+        path = [max(self.timings, key=end)]
+        while True:
+            deps = [d for d in self._stages[path[-1]][1] if d in self.timings]
+            if not deps:
+                break
+            path.append(max(deps, key=end))
+        return list(reversed(path))
+
+
+class DialogueStageMetrics:
+    """Rolling per-stage durations and how often each stage is on the critical path."""
+
+    def __init__(self):
+        self._stages: Dict[str, RollingHistogram] = {}
+        self._critical: Dict[str, int] = {}
+        self._total = RollingHistogram(
+            settings.llm_metrics_window_seconds, LATENCY_BUCKETS_MS
+        )
+        self.requests = 0
+
+    def record(self, graph: StageGraph):
+        self.requests += 1
+        for name, timing in graph.timings.items():
+            if name not in self._stages:
+                self._stages[name] = RollingHistogram(
+                    settings.llm_metrics_window_seconds, LATENCY_BUCKETS_MS
+                )
+            self._stages[name].observe(timing["duration_ms"])
+        if graph.timings:
+            self._total.observe(
+                max(t["start_ms"] + t["duration_ms"] for t in graph.timings.values())
+            )
+        for name in graph.critical_path():
+            self._critical[name] = self._critical.get(name, 0) + 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "total_ms": self._total.snapshot(),
+            "stages": {
+                name: {
+                    "duration_ms": histogram.snapshot(),
+                    "on_critical_path": self._critical.get(name, 0),
+                }
+                for name, histogram in self._stages.items()
+            },
+        }
+
+
+dialogue_stage_metrics = DialogueStageMetrics()
+
+
+def dialogue_context_data(request: DialogueRequest) -> Dict[str, Any]:
+    """Game context stored with a new conversation."""
+    return {
+        "season": request.season,
+        "day_of_month": request.day_of_month,
+        "day_of_week": request.day_of_week,
+        "time_of_day": request.time_of_day,
+        "year": request.year,
+        "weather": request.weather,
+        "player_location": request.player_location,
+        "friendship_hearts": request.friendship_hearts,
+    }
+
+
+async def prefetch_relationship_contexts(
+    requests: List[DialogueRequest],
+) -> List[RequestContext]:
+    """
+    RequestContexts for several turns of one player, primed with all their
+    relationship rows from a single bulk lookup. NPCs the bulk lookup missed
+    still share one player lookup and fall back to the per-entity reads in
+    `build_context_graph`.
+    """
+    if not requests:
+        return []
+    player_name = requests[0].player_name
+    rows = await memory_service.get_relationship_contexts(
+        player_name,
+        [
+            (request.npc_name, request.npc_location, dialogue_context_data(request))
+            for request in requests
+        ],
+    )
+
+    player_id = None
+    if len(rows) < len(requests):
+        player_id = await memory_service.get_or_create_player(player_name)
+
+    contexts = []
+    for request in requests:
+        ctx = RequestContext()
+        row = rows.get(request.npc_name)
+        if row:
+            memory_service.prime_relationship_context(
+                ctx, player_name, request.npc_name, row
+            )
+        elif player_id:
+            ctx.put(("player", player_name), player_id)
+        contexts.append(ctx)
+    return contexts
+
+
+def build_context_graph(
+    request: DialogueRequest, ctx: RequestContext, search_memories: bool = True
+) -> StageGraph:
+    """
+    Dependency graph of the lookups `generate_dialogue` needs before the LLM
+    call. All reads go through `ctx`, so each one happens at most once per
+    request.
+
+    The relationship row (player, NPC, profile, emotional state and active
+    conversation, from the pair's session or one SQL function call) is loaded
+    first; if it is not available each of those falls back to its own service
+    call, with player and NPC resolved first. Everything keyed on their ids
+    then runs concurrently.
+
+    `search_memories=False` skips the memory search (load shedding).
+
+    Stage results: relationship_row, player_id, npc_id, emotional_state,
+    personality_profile, relevant_memories, conversation_id,
+    conversation_history and templates_version (the prompt template version
+    read before the profile and state were loaded). Lookups that need ids
+    resolve to empty values when the player or NPC is missing.
+    """
+    graph = StageGraph()
+    context_data = dialogue_context_data(request)
+    # Read before any lookup below; a row carries the version read before it
+    loaded_version = prompt_templates.current_version()
+
+    async def relationship_row():
+        return await memory_service.get_relationship_context(
+            request.player_name,
+            request.npc_name,
+            request.npc_location,
+            context_data,
+            ctx=ctx,
+        )
+
+    async def templates_version(row):
+        return row["templates_version"] if row else loaded_version
+
+    async def player(_row):
+        return await memory_service.get_or_create_player(request.player_name, ctx=ctx)
+
+    async def npc(_row):
+        return await memory_service.get_or_create_npc(
+            request.npc_name, request.npc_location, ctx=ctx
+        )
+
+    async def emotional_state(player_id, npc_id):
+        if not player_id or not npc_id:
+            return None
+        return await memory_service.get_emotional_state(npc_id, player_id, ctx=ctx)
+
+    async def personality_profile(player_id, npc_id):
+        if not player_id or not npc_id:
+            return {}
+        return await memory_service.get_personality_profile(player_id, npc_id, ctx=ctx)
+
+    async def relevant_memories(player_id, npc_id):
+        if not (search_memories and player_id and npc_id and request.player_response):
+            return []
+        # Shared with the semantic response cache lookup through `ctx`
+        query_embedding = await memory_service.embed_text(
+            request.player_response, ctx=ctx
+        )
+        # The previous turn's lines may still be being written in the background
+        await conversation_pipeline.wait_for((request.player_name, request.npc_name))
+        return await memory_service.search_relevant_memories(
+            player_id, npc_id, request.player_response, query_embedding=query_embedding
+        )
+
+    async def conversation(row, player_id, npc_id):
+        if row:
+            return row["conversation_id"]
+        if not player_id or not npc_id:
+            return ""
+        return await memory_service.get_or_create_active_conversation(
+            player_id, npc_id, context_data
+        )
+
+    async def conversation_history(conversation_id):
+        if not request.conversation_handle or request.conversation_history:
+            return list(request.conversation_history)
+        if request.conversation_handle != conversation_id:
+            # The handle's conversation ended or timed out; this turn starts a new one
+            return []
+        session = session_store.get(request.player_name, request.npc_name)
+        if session is not None and session.conversation_id == conversation_id:
+            return list(session.history)
+        # No session (e.g. after a restart): rebuild from the stored lines
+        await conversation_pipeline.wait_for((request.player_name, request.npc_name))
+        lines = await memory_service.get_recent_dialogue(
+            conversation_id, settings.session_history_max_lines
+        )
+        return [
+            ConversationEntry(
+                speaker="player" if line["speaker"] == "player" else "npc",
+                message=line["message"],
+            )
+            for line in lines
+        ]
+
+    ids = ("player_id", "npc_id")
+    graph.add("relationship_row", relationship_row)
+    graph.add("templates_version", templates_version, ["relationship_row"])
+    graph.add("player_id", player, ["relationship_row"])
+    graph.add("npc_id", npc, ["relationship_row"])
+    graph.add("emotional_state", emotional_state, ids)
+    graph.add("personality_profile", personality_profile, ids)
+    graph.add("relevant_memories", relevant_memories, ids)
+    graph.add("conversation_id", conversation, ("relationship_row",) + ids)
+    graph.add("conversation_history", conversation_history, ["conversation_id"])
+    return graph
+
+
+async def log_relationship_insight(
+    request: DialogueRequest, context: Dict[str, Any], ctx: RequestContext
+):
+    """
+    Logs the relationship insight at DEBUG. It is only rendered when this
+    module's logger has DEBUG enabled, and reuses the reads memoized in `ctx`.
+    """
+    if not logger.isEnabledFor(logging.DEBUG) or not context["personality_profile"]:
+        return
+
+    insight = await memory_service.generate_relationship_insight(
+        context["personality_profile"],
+        request.player_name,
+        request.npc_name,
+        context["npc_id"],
+        context["player_id"],
+        ctx=ctx,
+    )
+    logger.debug("=== RELATIONSHIP INSIGHT ===")
+    for line in insight.strip().split("\n"):
+        logger.debug(line)
+    logger.debug("==============================")
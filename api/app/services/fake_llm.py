@@ -0,0 +1,232 @@
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import random
+import re
+from typing import List, Dict, Any
+
+import litellm
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class FakeLLMError(Exception):
+    """Injected provider failure raised by the fake LLM provider."""
+
+
+_NPC_LINES = [
+    "Oh, hello {player}! Lovely {weather} day, isn't it?",
+    "Hey {player}. I was just thinking about how busy this season has been.",
+    "{player}! Good to see you. Have you been out to the mines lately?",
+    "Hmm? Oh, it's you, {player}. What brings you by?",
+    "Hi {player}! I tried something new at the Saloon last night.",
+]
+
+_OPTIONS = [
+    (
+        "It's great to see you! How have you been?",
+        "Is there anything happening in town I should know about?",
+        "Do you always look this serious or is it just today?",
+    ),
+    (
+        "You always brighten my day!",
+        "What are you working on right now?",
+        "Wow, you really never stop talking, huh?",
+    ),
+    (
+        "I'd love to hear more about that!",
+        "Anything you need from the farm this week?",
+        "Sounds boring, honestly.",
+    ),
+]
+
+_GIFT_PREFERENCES = ["loved", "liked", "neutral", "neutral", "disliked", "hated"]
+_MOODS = ["HAPPY", "CONTENT", "NEUTRAL", "EXCITED", "WORRIED", "NOSTALGIC"]
+
+
+class FakeLLMProvider:
+    """
+    Deterministic offline LLM used when LLM_PROVIDER=fake.
+
+    The reply is picked from the prompt content so the same prompt always
+    produces the same text: NPC_MESSAGE/OPTION_n dialogue, one-word gift
+    preferences, analysis JSON, or a JSON array for batched analysis.
+    Latency, token rate and error injection are drawn from a seeded RNG so
+    load tests are reproducible. With `stream=True` the first chunk arrives
+    after the base latency and the rest at the configured token rate.
+    """
+
+    def __init__(self):
+        self._rng = random.Random(settings.fake_llm_seed)
+
+    def _prompt_rng(self, prompt: str) -> random.Random:
+        digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+        return random.Random(int.from_bytes(digest[:8], "big") ^ settings.fake_llm_seed)
+
+    def _sample_latency(self, completion_tokens: int) -> float:
+        mean = settings.fake_llm_latency_ms_mean / 1000
+        stddev = settings.fake_llm_latency_ms_stddev / 1000
+        distribution = settings.fake_llm_latency_distribution
+
+        if distribution == "fixed":
+            base = mean
+        elif distribution == "uniform":
+            base = self._rng.uniform(max(0.0, mean - stddev), mean + stddev)
+        elif distribution == "lognormal" and mean > 0:
+            # Parameterise so the distribution has the requested mean and stddev
+            sigma = math.sqrt(math.log(1 + (stddev / mean) ** 2))
+            mu = math.log(mean) - sigma**2 / 2
+            base = self._rng.lognormvariate(mu, sigma)
+        else:
+            base = max(0.0, self._rng.gauss(mean, stddev))
+
+        if settings.fake_llm_tokens_per_second > 0:
+            base += completion_tokens / settings.fake_llm_tokens_per_second
+        return base
+
+    def _render(self, prompt: str) -> str:
+        rng = self._prompt_rng(prompt)
+
+        if "JSON ARRAY OUTPUT FORMAT" in prompt:
+            return json.dumps(
+                [
+                    {"conversation_id": conversation_id, **self._analysis_result(rng)}
+                    for conversation_id in re.findall(
+                        r"### CONVERSATION_ID: (\S+)", prompt
+                    )
+                ]
+            )
+
+        if "JSON OUTPUT FORMAT" in prompt:
+            return json.dumps(self._analysis_result(rng))
+
+        if "Respond with ONLY one word" in prompt:
+            return rng.choice(_GIFT_PREFERENCES)
+
+        if "NPC_MESSAGE:" in prompt:
+            player = _search(r"Player: ([^\n]+)\nNPC:", prompt, "farmer")
+            weather = _search(r"Weather: ([^\n]+)", prompt, "sunny").lower()
+            options = rng.choice(_OPTIONS)
+            return "\n".join(
+                [
+                    "NPC_MESSAGE: "
+                    + rng.choice(_NPC_LINES).format(player=player, weather=weather),
+                    f"OPTION_1: {options[0]}",
+                    f"OPTION_2: {options[1]}",
+                    f"OPTION_3: {options[2]}",
+                ]
+            )
+
+        return "OK"
+
+    def _analysis_result(self, rng: random.Random) -> Dict[str, Any]:
+        def score() -> float:
+            return round(rng.uniform(2.0, 9.0), 1)
+
+        return {
+            "final_player_sentiment": {"score": round(rng.uniform(-1.0, 1.0), 2)},
+            "memory_consolidation": {
+                "episodic_memories": [],
+                "learned_preferences": [],
+            },
+            "emotional_state_update": {
+                "new_mood": rng.choice(_MOODS),
+                "new_mood_intensity": score(),
+                "mood_reason": "Simulated analysis.",
+                "interaction_summary": "A simulated conversation took place.",
+            },
+            "personality_profile_update": {
+                "new_summary": "A familiar face around town.",
+                "new_trust": score(),
+                "new_affection": score(),
+                "new_annoyance": score(),
+                "new_friendliness": score(),
+                "new_sincerity": score(),
+                "new_romantic_interest": score(),
+            },
+        }
+
+    async def acompletion(
+        self, model: str, messages: List[Dict[str, Any]], **kwargs
+    ) -> litellm.ModelResponse:
+        prompt = "\n".join(str(m.get("content", "")) for m in messages)
+        content = self._render(prompt)
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = max(1, len(content) // 4)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+        streaming = bool(kwargs.get("stream"))
+        # A stream is returned at its first token; the rest arrive as it is read
+        await asyncio.sleep(self._sample_latency(0 if streaming else completion_tokens))
+        if self._rng.random() < settings.fake_llm_error_rate:
+            raise FakeLLMError(f"Injected failure for {model}")
+
+        if streaming:
+            return self._stream(model, content, usage)
+
+        return litellm.ModelResponse(
+            model=model,
+            choices=[
+                {
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": content},
+                }
+            ],
+            usage=usage,
+        )
+
+    async def _stream(self, model: str, content: str, usage: Dict[str, int]):
+        """Yields the reply word by word, then a final chunk carrying usage."""
+        for index, word in enumerate(re.findall(r"\S+\s*", content) or [content]):
+            if index and settings.fake_llm_tokens_per_second > 0:
+                await asyncio.sleep(
+                    max(1, len(word) // 4) / settings.fake_llm_tokens_per_second
+                )
+            yield litellm.ModelResponseStream(
+                model=model,
+                choices=[
+                    {"index": 0, "delta": {"role": "assistant", "content": word}}
+                ],
+            )
+        yield litellm.ModelResponseStream(
+            model=model,
+            choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            usage=usage,
+        )
+
+    async def aembedding(
+        self, model: str, input: List[str], **kwargs
+    ) -> litellm.EmbeddingResponse:
+        await asyncio.sleep(self._sample_latency(0) / 4)
+        data = []
+        for index, text in enumerate(input):
+            rng = self._prompt_rng(text)
+            data.append(
+                {
+                    "object": "embedding",
+                    "index": index,
+                    "embedding": [rng.uniform(-1.0, 1.0) for _ in range(768)],
+                }
+            )
+        tokens = sum(len(text) // 4 for text in input)
+        return litellm.EmbeddingResponse(
+            model=model,
+            data=data,
+            usage={"prompt_tokens": tokens, "total_tokens": tokens},
+        )
+
+
+def _search(pattern: str, text: str, default: str) -> str:
+    match = re.search(pattern, text)
+    return match.group(1).strip() if match else default
+
+
+fake_llm_provider = FakeLLMProvider()
@@ -0,0 +1,158 @@
+import asyncio
+import logging
+from typing import Dict, Any, Optional
+
+import httpx
+from litellm.llms.custom_httpx.http_handler import AsyncHTTPHandler
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class _HostStats:
+    def __init__(self):
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.requests = 0
+        self.waited = 0  # Requests that had to wait for the per-host limit
+
+
+class HostLimitedTransport(httpx.AsyncBaseTransport):
+    """
+    httpx transport that caps concurrent requests per host on top of the
+    connection pool's global limits, and counts utilization per host.
+    """
+
+    def __init__(self, per_host_limit: int, **transport_kwargs):
+        self._transport = httpx.AsyncHTTPTransport(**transport_kwargs)
+        self._per_host_limit = max(1, per_host_limit)
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._hosts: Dict[str, _HostStats] = {}
+
+    def _host_key(self, request: httpx.Request) -> str:
+        port = f":{request.url.port}" if request.url.port else ""
+        return f"{request.url.scheme}://{request.url.host}{port}"
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = self._host_key(request)
+        semaphore = self._semaphores.setdefault(
+            host, asyncio.Semaphore(self._per_host_limit)
+        )
+        stats = self._hosts.setdefault(host, _HostStats())
+
+        if semaphore.locked():
+            stats.waited += 1
+        await semaphore.acquire()
+        stats.requests += 1
+        stats.in_flight += 1
+        stats.peak_in_flight = max(stats.peak_in_flight, stats.in_flight)
+
+        def _release():
+            stats.in_flight -= 1
+            semaphore.release()
+
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            _release()
+            raise
+
+        if response.is_closed:
+            # Body was already read in full by the transport
+            _release()
+            return response
+
+        # Hold the host slot until the body has been read or the stream closed
+        response.stream = _ReleasingStream(response.stream, _release)
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+    def get_stats(self) -> Dict[str, Any]:
+        pool = getattr(self._transport, "_pool", None)
+        connections = list(getattr(pool, "connections", []) or [])
+        idle = sum(1 for c in connections if _safe_call(c, "is_idle"))
+        return {
+            "per_host_limit": self._per_host_limit,
+            "pool": {
+                "open_connections": len(connections),
+                "idle_connections": idle,
+                "active_connections": len(connections) - idle,
+            },
+            "hosts": {
+                host: {
+                    "in_flight": s.in_flight,
+                    "peak_in_flight": s.peak_in_flight,
+                    "requests": s.requests,
+                    "waited_for_host_limit": s.waited,
+                    "utilization": s.in_flight / self._per_host_limit,
+                }
+                for host, s in self._hosts.items()
+            },
+        }
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Response stream that runs `on_close` exactly once when closed."""
+
+    def __init__(self, stream, on_close):
+        self._stream = stream
+        self._on_close = on_close
+        self._closed = False
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._closed:
+                self._closed = True
+                self._on_close()
+
+
+def _safe_call(obj, method: str) -> bool:
+    try:
+        return bool(getattr(obj, method)())
+    except Exception:
+        return False
+
+
+def create_pooled_client() -> httpx.AsyncClient:
+    """Builds the long-lived keep-alive client shared by all LLM calls."""
+    transport = HostLimitedTransport(
+        per_host_limit=settings.llm_http_per_host_limit,
+        limits=httpx.Limits(
+            max_connections=settings.llm_http_max_connections,
+            max_keepalive_connections=settings.llm_http_max_keepalive_connections,
+            keepalive_expiry=settings.llm_http_keepalive_expiry_seconds,
+        ),
+        http2=False,
+    )
+    return httpx.AsyncClient(
+        transport=transport,
+        timeout=httpx.Timeout(
+            settings.llm_http_timeout_seconds,
+            connect=settings.llm_http_connect_timeout_seconds,
+        ),
+    )
+
+
+def create_provider_handler(client: httpx.AsyncClient) -> AsyncHTTPHandler:
+    """
+    LiteLLM handler on the pooled client's transport, for the providers that
+    take a `client=` handler (Gemini, Ollama) instead of `aclient_session`.
+    """
+    return AsyncHTTPHandler(transport=client._transport, timeout=client.timeout)
+
+
+def get_pool_stats(client: Optional[httpx.AsyncClient]) -> Dict[str, Any]:
+    if client is None:
+        return {"enabled": False}
+    transport = getattr(client, "_transport", None)
+    if not isinstance(transport, HostLimitedTransport):
+        return {"enabled": True}
+    return {"enabled": True, **transport.get_stats()}
@@ -0,0 +1,142 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Hashable, Callable, Awaitable, Optional, Tuple
+
+from pydantic import BaseModel
+
+from app.config import settings
+from app.models.request import DialogueRequest
+
+logger = logging.getLogger(__name__)
+
+
+def request_hash(request: BaseModel) -> str:
+    """Canonical hash of a request body: same fields and values, same hash."""
+    canonical = json.dumps(
+        request.model_dump(mode="json"), sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ReplayCache:
+    """
+    Runs a handler at most once per key within a short window.
+
+    A duplicate that arrives while the first call is still running awaits
+    that call's result; one that arrives after it finished, within
+    `idempotency_ttl_seconds`, gets the stored result. Failures are not
+    stored, so a retry after an error runs the handler again.
+
+    Results may be stored under a `scope` (e.g. a player/NPC pair) so that
+    `forget` can drop them once they must no longer be replayed.
+    """
+
+    def __init__(self):
+        self._results: "OrderedDict[Hashable, Tuple[float, Any, Hashable]]" = (
+            OrderedDict()
+        )
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self.executed = 0
+        self.replayed = 0
+        self.joined = 0
+
+    async def run(
+        self,
+        key: Hashable,
+        handler: Callable[[], Awaitable[Any]],
+        scope: Hashable = None,
+    ) -> Any:
+        now = time.monotonic()
+        self._evict_expired(now)
+
+        stored = self._results.get(key)
+        if stored is not None and stored[0] <= now:
+            del self._results[key]
+            stored = None
+        if stored is not None:
+            self.replayed += 1
+            logger.info(f"Replaying stored response for duplicate request {key}")
+            return stored[1]
+
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.joined += 1
+            logger.info(f"Duplicate request {key} is waiting for the in-flight call")
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        self.executed += 1
+        try:
+            result = await handler()
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # Mark retrieved so waiter-less failures are not logged as unhandled
+                future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+
+        future.set_result(result)
+        self._results[key] = (
+            time.monotonic() + settings.idempotency_ttl_seconds,
+            result,
+            scope,
+        )
+        if len(self._results) > settings.idempotency_max_entries:
+            self._results.popitem(last=False)
+        return result
+
+    def _evict_expired(self, now: float):
+        # Entries are stored in completion order with the same TTL, so the
+        # oldest ones expire first
+        while self._results:
+            key, (expires_at, _, _) = next(iter(self._results.items()))
+            if expires_at > now:
+                break
+            del self._results[key]
+
+    def forget(self, scope: Hashable) -> int:
+        """Drops the stored results of `scope`; returns how many."""
+        keys = [key for key, stored in self._results.items() if stored[2] == scope]
+        for key in keys:
+            del self._results[key]
+        return len(keys)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.idempotency_enabled,
+            "ttl_seconds": settings.idempotency_ttl_seconds,
+            "executed": self.executed,
+            "replayed": self.replayed,
+            "joined_in_flight": self.joined,
+            "stored": len(self._results),
+            "in_flight": len(self._in_flight),
+        }
+
+
+dialogue_replay_cache = ReplayCache()
+
+
+def dialogue_idempotency_key(
+    request: DialogueRequest, client_key: Optional[str]
+) -> Optional[Tuple[str, ...]]:
+    """
+    The client's Idempotency-Key (scoped to the player) or the request hash.
+
+    Without a client key, opening turns are never deduplicated (None): game
+    time is paused in dialogue, so reopening the same NPC right after a
+    conversation ended sends the very same body.
+    """
+    if client_key:
+        return ("key", request.player_name, client_key)
+    if request.player_response is None:
+        return None
+    return ("hash", request_hash(request))
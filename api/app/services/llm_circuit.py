@@ -0,0 +1,195 @@
+import logging
+import time
+from collections import deque
+from typing import Dict, Any, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider/model whose breaker is open."""
+
+    def __init__(self, provider: str, model: str, retry_after: float):
+        super().__init__(
+            f"Circuit open for {provider}/{model}, retry in {retry_after:.1f}s"
+        )
+        self.provider = provider
+        self.model = model
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Breaker for one provider/model.
+
+    Closed: calls go through and their outcomes fill a rolling window. The
+    breaker opens when the window's failure rate reaches
+    `llm_circuit_failure_rate` (after `llm_circuit_min_calls` calls) or after
+    `llm_circuit_consecutive_timeouts` timeouts in a row.
+
+    Open: calls fail immediately with CircuitOpenError for
+    `llm_circuit_open_seconds`.
+
+    Half-open: up to `llm_circuit_half_open_max_calls` trial calls go
+    through; the rest still fail fast. A successful trial closes the
+    breaker, a failed one opens it again.
+    """
+
+    def __init__(self, provider: str, model: str):
+        self.provider = provider
+        self.model = model
+        self.state = CLOSED
+        self._outcomes: deque = deque(maxlen=settings.llm_circuit_window_size)
+        self._consecutive_timeouts = 0
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.opened = 0
+
+    def before_call(self) -> bool:
+        """
+        Admits a call or raises CircuitOpenError.
+
+        Returns:
+            True if the call is a half-open trial; pass it back to
+            `record_success` / `record_failure` / `release`.
+        """
+        if self.state == OPEN:
+            remaining = self._opened_at + settings.llm_circuit_open_seconds - time.monotonic()
+            if remaining > 0:
+                self.rejected += 1
+                raise CircuitOpenError(self.provider, self.model, remaining)
+            self._set_state(HALF_OPEN)
+
+        self.calls += 1
+        if self.state == CLOSED:
+            return False
+        if self._probes_in_flight >= settings.llm_circuit_half_open_max_calls:
+            self.calls -= 1
+            self.rejected += 1
+            raise CircuitOpenError(
+                self.provider, self.model, settings.llm_circuit_open_seconds
+            )
+        self._probes_in_flight += 1
+        return True
+
+    def record_success(self, probe: bool = False):
+        self._consecutive_timeouts = 0
+        if probe:
+            self._probes_in_flight -= 1
+            if self.state == HALF_OPEN:
+                self._outcomes.clear()
+                self._set_state(CLOSED)
+        if self.state == CLOSED:
+            self._outcomes.append(False)
+
+    def record_failure(self, timeout: bool = False, probe: bool = False):
+        self.failures += 1
+        if timeout:
+            self.timeouts += 1
+        if probe:
+            self._probes_in_flight -= 1
+            if self.state == HALF_OPEN:
+                self._open()
+            return
+        if self.state != CLOSED:
+            # A call admitted before the breaker opened; it is already open
+            return
+
+        self._consecutive_timeouts = self._consecutive_timeouts + 1 if timeout else 0
+        self._outcomes.append(True)
+        if self._consecutive_timeouts >= settings.llm_circuit_consecutive_timeouts:
+            self._open()
+        elif (
+            len(self._outcomes) >= settings.llm_circuit_min_calls
+            and self.failure_rate >= settings.llm_circuit_failure_rate
+        ):
+            self._open()
+
+    def release(self, probe: bool = False):
+        """Ends a call that says nothing about provider health (cancelled, bad request)."""
+        if probe:
+            self._probes_in_flight -= 1
+
+    def is_open(self) -> bool:
+        """True while calls would be rejected without a trial."""
+        return (
+            self.state == OPEN
+            and time.monotonic() - self._opened_at < settings.llm_circuit_open_seconds
+        )
+
+    @property
+    def failure_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return sum(self._outcomes) / len(self._outcomes)
+
+    def _open(self):
+        self._opened_at = time.monotonic()
+        self._consecutive_timeouts = 0
+        self.opened += 1
+        self._set_state(OPEN)
+
+    def _set_state(self, state: str):
+        if state == self.state:
+            return
+        log = logger.warning if state == OPEN else logger.info
+        log(f"LLM circuit for {self.provider}/{self.model}: {self.state} -> {state}")
+        self.state = state
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "failure_rate": self.failure_rate,
+            "window": len(self._outcomes),
+            "calls": self.calls,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "opened": self.opened,
+        }
+
+
+class CircuitBreakerRegistry:
+    """One CircuitBreaker per (provider, model), created on first use."""
+
+    def __init__(self):
+        self._breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+
+    def breaker(self, provider: str, model: str) -> CircuitBreaker:
+        key = (provider, model)
+        if key not in self._breakers:
+            self._breakers[key] = CircuitBreaker(provider, model)
+        return self._breakers[key]
+
+    def is_open(self, provider: str, model: str) -> bool:
+        breaker: Optional[CircuitBreaker] = self._breakers.get((provider, model))
+        return breaker is not None and breaker.is_open()
+
+    def check(self, provider: str, model: str):
+        """
+        Raises CircuitOpenError if the breaker is open, so callers can fail
+        before queueing for a scheduler slot.
+        """
+        breaker = self._breakers.get((provider, model))
+        if breaker is not None and breaker.is_open():
+            breaker.before_call()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.llm_circuit_enabled,
+            "call_timeout_seconds": settings.llm_call_timeout_seconds,
+            "breakers": {
+                f"{provider}/{model}": breaker.to_dict()
+                for (provider, model), breaker in self._breakers.items()
+            },
+        }
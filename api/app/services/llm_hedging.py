@@ -0,0 +1,79 @@
+import logging
+from collections import deque
+from typing import Dict, Any, Optional
+
+from app.config import settings
+from app.services.llm_scheduler import percentile
+
+logger = logging.getLogger(__name__)
+
+
+class _ModelHedgeStats:
+    """Latency samples and hedge counters for one model."""
+
+    def __init__(self):
+        self.latencies: deque = deque(maxlen=settings.llm_hedge_sample_size)
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "hedge_rate": self.hedged / self.calls if self.calls else 0.0,
+            "win_rate": self.hedge_wins / self.hedged if self.hedged else 0.0,
+            "p50_latency_ms": percentile(self.latencies, 50) * 1000,
+            "p95_latency_ms": percentile(self.latencies, 95) * 1000,
+        }
+
+
+class HedgeTracker:
+    """
+    Tracks observed completion latency per model and decides when a call
+    should be hedged with a second request.
+    """
+
+    def __init__(self):
+        self._models: Dict[str, _ModelHedgeStats] = {}
+
+    def _stats(self, model: str) -> _ModelHedgeStats:
+        if model not in self._models:
+            self._models[model] = _ModelHedgeStats()
+        return self._models[model]
+
+    def record_latency(self, model: str, seconds: float):
+        self._stats(model).latencies.append(seconds)
+
+    def record_call(self, model: str):
+        self._stats(model).calls += 1
+
+    def record_hedge(self, model: str, hedge_won: bool):
+        stats = self._stats(model)
+        stats.hedged += 1
+        if hedge_won:
+            stats.hedge_wins += 1
+
+    def hedge_delay(self, model: str, latency_budget: float) -> float:
+        """
+        Seconds to wait for the primary call before sending a hedge.
+
+        Uses the configured latency percentile of the model once enough samples
+        exist, and never waits longer than the configured share of the budget.
+        """
+        latencies = self._stats(model).latencies
+        if len(latencies) >= settings.llm_hedge_min_samples:
+            delay = percentile(latencies, settings.llm_hedge_percentile)
+        else:
+            delay = settings.llm_hedge_default_delay_seconds
+        return min(delay, latency_budget * settings.llm_hedge_budget_fraction)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {model: s.to_dict() for model, s in self._models.items()}
+
+
+def hedge_model_for(model: str) -> str:
+    """Model used for the hedged request: the configured secondary or the same one."""
+    secondary: Optional[str] = settings.llm_hedge_model
+    return secondary or model
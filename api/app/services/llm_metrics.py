@@ -0,0 +1,254 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Dict, Any, Optional, List, Set
+
+import litellm
+from app.config import settings
+from app.services.llm_scheduler import percentile
+
+logger = logging.getLogger(__name__)
+
+# Import realtime monitor for WebSocket notifications
+try:
+    from app.websockets.realtime import realtime_monitor
+
+    REALTIME_AVAILABLE = True
+except ImportError:
+    REALTIME_AVAILABLE = False
+
+
+class RollingHistogram:
+    """
+    Histogram over a sliding time window.
+
+    Samples older than `window_seconds` are dropped on read, so the snapshot
+    always describes recent traffic.
+    """
+
+    def __init__(self, window_seconds: float, buckets: List[float]):
+        self.window_seconds = window_seconds
+        self.buckets = sorted(buckets)
+        self._samples: deque = deque()
+
+    def observe(self, value: float):
+        self._samples.append((time.monotonic(), value))
+
+    def _prune(self):
+        cutoff = time.monotonic() - self.window_seconds
+        while self._samples and self._samples[0][0] < cutoff:
+            self._samples.popleft()
+
+    def recent(self, seconds: float) -> List[float]:
+        """Values observed in the last `seconds` (a sub-window of this histogram)."""
+        cutoff = time.monotonic() - seconds
+        return [v for t, v in self._samples if t >= cutoff]
+
+    def snapshot(self) -> Dict[str, Any]:
+        self._prune()
+        values = [v for _, v in self._samples]
+        counts = {f"le_{b:g}": 0 for b in self.buckets}
+        counts["le_inf"] = 0
+        for value in values:
+            for bucket in self.buckets:
+                if value <= bucket:
+                    counts[f"le_{bucket:g}"] += 1
+                    break
+            else:
+                counts["le_inf"] += 1
+
+        return {
+            "count": len(values),
+            "sum": sum(values),
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "p99": percentile(values, 99),
+            "buckets": counts,
+        }
+
+
+LATENCY_BUCKETS_MS = [100, 250, 500, 1000, 2000, 4000, 8000, 16000]
+TOKEN_BUCKETS = [64, 256, 512, 1024, 2048, 4096, 8192]
+COST_BUCKETS_USD = [0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05]
+
+
+class CallSiteMetrics:
+    """Rolling histograms and running totals for one call-site label."""
+
+    def __init__(self, window_seconds: float):
+        self.wall_time_ms = RollingHistogram(window_seconds, LATENCY_BUCKETS_MS)
+        self.ttft_ms = RollingHistogram(window_seconds, LATENCY_BUCKETS_MS)
+        self.prompt_tokens = RollingHistogram(window_seconds, TOKEN_BUCKETS)
+        self.completion_tokens = RollingHistogram(window_seconds, TOKEN_BUCKETS)
+        self.cost_usd = RollingHistogram(window_seconds, COST_BUCKETS_USD)
+        self.calls = 0
+        self.errors = 0
+        self.total_prompt_tokens = 0
+        self.total_completion_tokens = 0
+        self.total_cost_usd = 0.0
+        self.models: Dict[str, int] = {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "models": dict(self.models),
+            "total_prompt_tokens": self.total_prompt_tokens,
+            "total_completion_tokens": self.total_completion_tokens,
+            "total_cost_usd": round(self.total_cost_usd, 6),
+            "wall_time_ms": self.wall_time_ms.snapshot(),
+            "ttft_ms": self.ttft_ms.snapshot(),
+            "prompt_tokens": self.prompt_tokens.snapshot(),
+            "completion_tokens": self.completion_tokens.snapshot(),
+            "cost_usd": self.cost_usd.snapshot(),
+        }
+
+
+class LLMMetrics:
+    """
+    Aggregates per-call-site LLM metrics (wall time, time to first token,
+    token usage and estimated cost) and periodically pushes a snapshot to the
+    monitoring WebSocket.
+    """
+
+    def __init__(self):
+        self._sites: Dict[str, CallSiteMetrics] = {}
+        self._last_push = 0.0
+        # Pushes in flight, referenced so they are not garbage collected
+        self._push_tasks: Set[asyncio.Task] = set()
+
+    def _site(self, call_site: str) -> CallSiteMetrics:
+        if call_site not in self._sites:
+            self._sites[call_site] = CallSiteMetrics(settings.llm_metrics_window_seconds)
+        return self._sites[call_site]
+
+    def record(
+        self,
+        call_site: str,
+        model: str,
+        wall_time: float,
+        response: Any = None,
+        ttft: Optional[float] = None,
+        error: bool = False,
+    ):
+        """Records one finished call. `response` is used for usage and cost."""
+        site = self._site(call_site)
+        site.calls += 1
+        site.models[model] = site.models.get(model, 0) + 1
+        site.wall_time_ms.observe(wall_time * 1000)
+        if ttft is not None:
+            site.ttft_ms.observe(ttft * 1000)
+
+        if error:
+            site.errors += 1
+        elif response is not None:
+            usage = getattr(response, "usage", None)
+            prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+            completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+            site.prompt_tokens.observe(prompt_tokens)
+            site.completion_tokens.observe(completion_tokens)
+            site.total_prompt_tokens += prompt_tokens
+            site.total_completion_tokens += completion_tokens
+
+            cost = self._estimate_cost(response)
+            site.cost_usd.observe(cost)
+            site.total_cost_usd += cost
+
+        logger.debug(
+            f"LLM call [{call_site}] model={model} wall={wall_time * 1000:.0f}ms "
+            f"ttft={'-' if ttft is None else f'{ttft * 1000:.0f}ms'} error={error}"
+        )
+        self._maybe_push()
+
+    def _estimate_cost(self, response: Any) -> float:
+        try:
+            return float(litellm.completion_cost(completion_response=response) or 0.0)
+        except Exception:
+            # Unknown pricing (e.g. local Ollama models) counts as free
+            return 0.0
+
+    def _maybe_push(self):
+        if not REALTIME_AVAILABLE:
+            return
+        now = time.monotonic()
+        if now - self._last_push < settings.llm_metrics_push_interval_seconds:
+            return
+        self._last_push = now
+        try:
+            task = asyncio.get_running_loop().create_task(
+                realtime_monitor.notify_llm_metrics(self.snapshot())
+            )
+        except RuntimeError:
+            return  # No running loop (e.g. called from sync code)
+        self._push_tasks.add(task)
+        task.add_done_callback(self._push_tasks.discard)
+
+    def recent_wall_times_ms(self, call_site: str, seconds: float) -> List[float]:
+        """Wall times of the call site's calls in the last `seconds`."""
+        site = self._sites.get(call_site)
+        return site.wall_time_ms.recent(seconds) if site else []
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "window_seconds": settings.llm_metrics_window_seconds,
+            "call_sites": {name: s.to_dict() for name, s in self._sites.items()},
+        }
+
+
+class StreamTimer:
+    """
+    Wraps a streaming LiteLLM response to record time to first token and
+    total wall time once the stream is exhausted. The wrapped stream is
+    closed when iteration ends, early or not, so a slot it holds (see
+    SlotHoldingStream) is released.
+    """
+
+    def __init__(self, stream, metrics: LLMMetrics, call_site: str, model: str, started: float):
+        self._stream = stream
+        self._metrics = metrics
+        self._call_site = call_site
+        self._model = model
+        self._started = started
+        self._ttft: Optional[float] = None
+        self._last_chunk = None
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        error = False
+        chunks = self._stream.__aiter__()
+        try:
+            async for chunk in chunks:
+                if self._ttft is None:
+                    self._ttft = time.monotonic() - self._started
+                self._last_chunk = chunk
+                yield chunk
+        except Exception:
+            error = True
+            raise
+        finally:
+            self._metrics.record(
+                self._call_site,
+                self._model,
+                time.monotonic() - self._started,
+                response=self._last_chunk,
+                ttft=self._ttft,
+                error=error,
+            )
+            await _close(chunks)
+            await self.aclose()
+
+    async def aclose(self):
+        """Closes the wrapped stream, e.g. when it is abandoned unread."""
+        await _close(self._stream)
+
+
+async def _close(stream):
+    close = getattr(stream, "aclose", None)
+    if close is not None:
+        await close()
+
+
+llm_metrics = LLMMetrics()
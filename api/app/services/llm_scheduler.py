@@ -0,0 +1,289 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager, AsyncExitStack
+from enum import Enum
+from typing import Dict, Any, Optional, List, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LLMPriority(str, Enum):
+    """Priority classes for LLM calls. Lower rank is served first."""
+
+    INTERACTIVE = "interactive"  # Live dialogue and gift inference
+    BACKGROUND = "background"  # Post-conversation analysis
+
+
+PRIORITY_RANK = {
+    LLMPriority.INTERACTIVE: 0,
+    LLMPriority.BACKGROUND: 1,
+}
+
+
+def percentile(values, pct: float) -> float:
+    """Nearest-rank percentile of an iterable of numbers (0.0 when empty)."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """
+        Takes `tokens` from the bucket if available.
+
+        Returns:
+            0.0 if the tokens were taken, otherwise the seconds to wait until
+            enough tokens will be available.
+        """
+        if self.rate <= 0:
+            return 0.0  # Unlimited
+
+        self._refill()
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return 0.0
+        return (tokens - self.tokens) / self.rate
+
+
+class _ClassStats:
+    """Queue depth and wait time counters for one priority class."""
+
+    def __init__(self):
+        self.queued = 0
+        self.granted = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.recent_waits: deque = deque(maxlen=200)
+
+    def record_wait(self, wait: float):
+        self.granted += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.recent_waits.append(wait)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self.queued,
+            "granted": self.granted,
+            "avg_wait_ms": (self.total_wait / self.granted * 1000) if self.granted else 0.0,
+            "p95_wait_ms": percentile(self.recent_waits, 95) * 1000,
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+
+class ProviderScheduler:
+    """
+    Admission control for a single LLM provider.
+
+    Calls acquire a slot before hitting the provider. Slots are bounded by a
+    concurrency limit and a token-bucket request rate. Waiting calls are served
+    by priority class first and arrival order second, so interactive calls jump
+    ahead of any queued background work. Schedulers of one provider's tiers
+    pass in a shared `bucket`, so the rate limit holds across all of them.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        max_concurrency: int,
+        rate: float,
+        burst: float,
+        bucket: Optional[TokenBucket] = None,
+    ):
+        self.provider = provider
+        self.max_concurrency = max(1, max_concurrency)
+        self.bucket = bucket or TokenBucket(rate, max(1.0, burst))
+        self.active = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future, LLMPriority, float]] = []
+        self._counter = itertools.count()
+        self._retry_handle: Optional[asyncio.TimerHandle] = None
+        self.stats: Dict[LLMPriority, _ClassStats] = {p: _ClassStats() for p in LLMPriority}
+
+    async def acquire(self, priority: LLMPriority):
+        enqueued_at = time.monotonic()
+        stats = self.stats[priority]
+
+        # Fast path: nothing queued ahead of us and capacity is available
+        if not self._waiters and self.active < self.max_concurrency:
+            if self.bucket.try_acquire() == 0.0:
+                self.active += 1
+                stats.record_wait(0.0)
+                return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(
+            self._waiters,
+            (PRIORITY_RANK[priority], next(self._counter), future, priority, enqueued_at),
+        )
+        stats.queued += 1
+        self._dispatch()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was granted just as we were cancelled; give it back
+                self.release()
+            else:
+                stats.queued -= 1
+            raise
+
+        stats.record_wait(time.monotonic() - enqueued_at)
+
+    def release(self):
+        self.active = max(0, self.active - 1)
+        self._dispatch()
+
+    def _dispatch(self):
+        while self._waiters and self.active < self.max_concurrency:
+            _, _, future, priority, _ = self._waiters[0]
+            if future.cancelled():
+                heapq.heappop(self._waiters)
+                continue
+
+            wait = self.bucket.try_acquire()
+            if wait > 0:
+                self._schedule_retry(wait)
+                return
+
+            heapq.heappop(self._waiters)
+            self.stats[priority].queued -= 1
+            self.active += 1
+            future.set_result(None)
+
+    def _schedule_retry(self, delay: float):
+        if self._retry_handle and not self._retry_handle.cancelled():
+            return
+
+        def _retry():
+            self._retry_handle = None
+            self._dispatch()
+
+        self._retry_handle = asyncio.get_running_loop().call_later(delay, _retry)
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(s.queued for s in self.stats.values())
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "provider": self.provider,
+            "max_concurrency": self.max_concurrency,
+            "active": self.active,
+            "rate_per_second": self.bucket.rate,
+            "classes": {p.value: s.to_dict() for p, s in self.stats.items()},
+        }
+
+
+class LLMScheduler:
+    """
+    Keeps one ProviderScheduler per provider, configured from settings.
+
+    Model tiers (see `llm_model_tiers`) get their own scheduler keyed
+    "provider/tier", with the tier's concurrency. The provider's rate limit is
+    one token bucket shared by the provider and all its tiers.
+    """
+
+    def __init__(self):
+        self._providers: Dict[str, ProviderScheduler] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def for_provider(
+        self,
+        provider: str,
+        tier: Optional[str] = None,
+        max_concurrency: Optional[int] = None,
+    ) -> ProviderScheduler:
+        key = f"{provider}/{tier}" if tier else provider
+        scheduler = self._providers.get(key)
+        if scheduler is None:
+            if max_concurrency is None:
+                max_concurrency = settings.llm_provider_concurrency.get(
+                    provider, settings.llm_default_concurrency
+                )
+            rate = settings.llm_provider_rate_limits.get(provider, 0.0)
+            burst = settings.llm_rate_limit_burst
+            bucket = self._buckets.get(provider)
+            if bucket is None:
+                bucket = TokenBucket(rate, max(1.0, burst))
+                self._buckets[provider] = bucket
+            scheduler = ProviderScheduler(
+                key,
+                max_concurrency=max_concurrency,
+                rate=rate,
+                burst=burst,
+                bucket=bucket,
+            )
+            self._providers[key] = scheduler
+        return scheduler
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        provider: str,
+        priority: LLMPriority,
+        tier: Optional[str] = None,
+        max_concurrency: Optional[int] = None,
+    ):
+        """Holds a provider (or provider tier) slot for the duration of the block."""
+        scheduler = self.for_provider(provider, tier, max_concurrency)
+        await scheduler.acquire(priority)
+        try:
+            yield
+        finally:
+            scheduler.release()
+
+    def queue_depth(self) -> int:
+        """Calls waiting for a slot across all providers and tiers."""
+        return sum(s.queue_depth for s in self._providers.values())
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {name: s.get_stats() for name, s in self._providers.items()}
+
+
+class SlotHoldingStream:
+    """
+    Streaming response that keeps its scheduler slot (an AsyncExitStack
+    holding `LLMScheduler.slot`) until it is exhausted or closed, so the
+    provider's concurrency limit covers the whole stream.
+    """
+
+    def __init__(self, stream, slot: AsyncExitStack):
+        self._stream = stream
+        self._slot = slot
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        try:
+            async for chunk in self._stream:
+                yield chunk
+        finally:
+            await self.aclose()
+
+    async def aclose(self):
+        """Releases the slot; safe to call more than once."""
+        await self._slot.aclose()
@@ -1,12 +1,29 @@
+import asyncio
 import logging
 import os
-from typing import List, Dict, Any
+import time
+from contextlib import AsyncExitStack
+from typing import List, Dict, Any, Optional, Callable, Awaitable
 
 import litellm
 from app.config import settings
+from app.services.llm_scheduler import LLMScheduler, LLMPriority, SlotHoldingStream
+from app.services.llm_hedging import HedgeTracker, hedge_model_for
+from app.services.llm_circuit import CircuitBreakerRegistry
+from app.services.llm_metrics import llm_metrics, StreamTimer
+from app.services.fake_llm import fake_llm_provider
+from app.services.http_pool import (
+    create_pooled_client,
+    create_provider_handler,
+    get_pool_stats,
+)
 
 logger = logging.getLogger(__name__)
 
+# LiteLLM reads `aclient_session` only in its OpenAI handlers; these providers
+# take the pooled client as a `client=` handler instead
+HANDLER_PROVIDERS = ("google", "ollama")
+
 
 class LLMService:
     def __init__(self):
@@ -18,30 +35,273 @@ class LLMService:
         if settings.openai_api_key:
             os.environ["OPENAI_API_KEY"] = settings.openai_api_key
 
-    def _get_model_string(self, model_name: str) -> str:
+        self.scheduler = LLMScheduler()
+        self.hedge_tracker = HedgeTracker()
+        self.circuits = CircuitBreakerRegistry()
+        self.http_client = None
+        self.provider_http_handler = None
+
+    async def startup(self):
+        """
+        Creates the shared keep-alive HTTP client and hands it to LiteLLM so
+        provider calls reuse pooled connections instead of opening new ones:
+        as `aclient_session` for OpenAI, and as a `client=` handler for the
+        providers in HANDLER_PROVIDERS. Called from the app lifespan.
+        """
+        if self.http_client is not None:
+            return
+        self.http_client = create_pooled_client()
+        litellm.aclient_session = self.http_client
+        self.provider_http_handler = create_provider_handler(self.http_client)
+        logger.info(
+            "LLM HTTP pool ready (max %s connections, %s per host)",
+            settings.llm_http_max_connections,
+            settings.llm_http_per_host_limit,
+        )
+
+    async def shutdown(self):
+        """Closes the shared HTTP client. Called from the app lifespan."""
+        if self.http_client is None:
+            return
+        if litellm.aclient_session is self.http_client:
+            litellm.aclient_session = None
+        # The handler shares the client's transport, closed with it
+        self.provider_http_handler = None
+        await self.http_client.aclose()
+        self.http_client = None
+
+    def get_http_pool_stats(self) -> Dict[str, Any]:
+        return get_pool_stats(self.http_client)
+
+    def _add_pooled_client(self, call_kwargs: Dict[str, Any], provider: str):
+        """Routes a non-OpenAI provider call through the shared HTTP pool."""
+        if (
+            provider in HANDLER_PROVIDERS
+            and self.provider_http_handler is not None
+            and "client" not in call_kwargs
+        ):
+            call_kwargs["client"] = self.provider_http_handler
+
+    def _get_model_string(self, model_name: str, provider: Optional[str] = None) -> str:
         """
         Constructs the full model string for LiteLLM, including the provider prefix.
         """
-        provider = settings.LLM_PROVIDER
+        provider = provider or settings.LLM_PROVIDER
         if provider == "google":
             return f"gemini/{model_name}"
         return f"{provider}/{model_name}"
 
+    def count_tokens(self, model: str, text: str) -> int:
+        """
+        Counts tokens in `text` with the tokenizer LiteLLM associates with the
+        configured model, falling back to ~4 characters per token.
+        """
+        if not text:
+            return 0
+        try:
+            return litellm.token_counter(model=self._get_model_string(model), text=text)
+        except Exception:
+            return len(text) // 4 + 1
+
     async def acompletion(
-        self, model: str, messages: List[Dict[str, Any]], **kwargs
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        priority: LLMPriority = LLMPriority.INTERACTIVE,
+        latency_budget: Optional[float] = None,
+        call_site: str = "unknown",
+        validator: Optional[Callable[[str], bool]] = None,
+        **kwargs,
     ) -> litellm.ModelResponse:
         """
         Makes an asynchronous call to the completion endpoint of the configured LLM.
 
+        Call sites with a route in `llm_call_site_routes` are first sent to
+        their model tiers, in order; `model` is only used when every tier
+        fails or returns output rejected by `validator`.
+
+        Each provider call runs through its provider/model circuit breaker;
+        while a breaker is open the call raises CircuitOpenError without
+        reaching the provider (see CircuitBreaker).
+
         Args:
             model: The base name of the model to use (e.g., 'gpt-4o').
             messages: The list of messages for the conversation.
+            priority: Scheduling class; interactive calls are served before
+                queued background work for the same provider.
+            latency_budget: Optional seconds the caller can afford to wait. When
+                set, a hedged request is sent if the primary call is slow and
+                whichever finishes first is used.
+            call_site: Label used to aggregate latency, token and cost metrics
+                (e.g. 'dialogue', 'gift_inference', 'analysis') and to pick
+                the model route.
+            validator: Optional check of the response text; a tier whose
+                output fails it falls back to the next tier.
             **kwargs: Additional arguments for litellm.acompletion.
 
         Returns:
-            The response from the LLM provider.
+            The response from the LLM provider. Streaming responses are wrapped
+            so time to first token is recorded as the stream is consumed.
         """
-        model_string = self._get_model_string(model)
+        if not kwargs.get("stream"):
+            for tier_name, tier in self._route_for(call_site):
+                response = await self._tier_completion(
+                    tier_name, tier, messages, priority, call_site, validator, **kwargs
+                )
+                if response is not None:
+                    return response
+
+        self.hedge_tracker.record_call(model)
+        started = time.monotonic()
+
+        try:
+            if kwargs.get("stream"):
+                # Streams are never hedged; metrics are recorded on exhaustion
+                stream = await self._timed_completion(
+                    model, messages, priority, **kwargs
+                )
+                return StreamTimer(stream, llm_metrics, call_site, model, started)
+
+            if latency_budget is None or not settings.llm_hedging_enabled:
+                response = await self._timed_completion(
+                    model, messages, priority, **kwargs
+                )
+            else:
+                response = await self._hedged_completion(
+                    model, messages, priority, latency_budget, **kwargs
+                )
+        except Exception:
+            llm_metrics.record(
+                call_site, model, time.monotonic() - started, error=True
+            )
+            raise
+
+        llm_metrics.record(
+            call_site, model, time.monotonic() - started, response=response
+        )
+        return response
+
+    def is_unavailable(self, call_site: str, model: str) -> bool:
+        """
+        True when every model a call site could use has an open circuit, so
+        a call would fail fast without reaching a provider.
+        """
+        if not settings.llm_circuit_enabled:
+            return False
+        candidates = [
+            (tier.get("provider") or settings.LLM_PROVIDER, tier["model"])
+            for _, tier in self._route_for(call_site)
+        ]
+        candidates.append((settings.LLM_PROVIDER, model))
+        return all(
+            self.circuits.is_open(provider, candidate)
+            for provider, candidate in candidates
+        )
+
+    async def _guarded_call(
+        self, provider: str, model: str, call: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Runs a provider call through its circuit breaker and the per-call
+        timeout. Raises CircuitOpenError without calling while it is open.
+        """
+        if not settings.llm_circuit_enabled:
+            return await call()
+
+        breaker = self.circuits.breaker(provider, model)
+        probe = breaker.before_call()
+        timeout = settings.llm_call_timeout_seconds
+        try:
+            response = await asyncio.wait_for(call(), timeout=timeout)
+        except asyncio.TimeoutError:
+            breaker.record_failure(timeout=True, probe=probe)
+            raise TimeoutError(
+                f"{provider}/{model} did not answer within {timeout}s"
+            ) from None
+        except litellm.BadRequestError:
+            # The request's fault, not the provider's
+            breaker.release(probe)
+            raise
+        except asyncio.CancelledError:
+            breaker.release(probe)
+            raise
+        except Exception:
+            breaker.record_failure(probe=probe)
+            raise
+        breaker.record_success(probe)
+        return response
+
+    def _route_for(self, call_site: str) -> List[tuple]:
+        """Configured (tier_name, tier) pairs for a call site, in fallback order."""
+        route = []
+        for tier_name in settings.llm_call_site_routes.get(call_site, []):
+            tier = settings.llm_model_tiers.get(tier_name)
+            if tier and tier.get("model"):
+                route.append((tier_name, tier))
+            else:
+                logger.warning(f"Unknown model tier '{tier_name}' for call site {call_site}")
+        return route
+
+    async def _tier_completion(
+        self,
+        tier_name: str,
+        tier: Dict[str, Any],
+        messages: List[Dict[str, Any]],
+        priority: LLMPriority,
+        call_site: str,
+        validator: Optional[Callable[[str], bool]],
+        **kwargs,
+    ) -> Optional[litellm.ModelResponse]:
+        """
+        One attempt on a routed model tier. Returns None when the call fails or
+        its output is rejected, so the caller moves on to the next tier.
+        """
+        model = tier["model"]
+        provider = tier.get("provider") or settings.LLM_PROVIDER
+        self.hedge_tracker.record_call(model)
+        started = time.monotonic()
+        try:
+            response = await self._timed_completion(
+                model,
+                messages,
+                priority,
+                provider=provider,
+                tier=tier_name,
+                max_concurrency=tier.get("concurrency"),
+                api_base=tier.get("api_base"),
+                **kwargs,
+            )
+        except Exception as e:
+            llm_metrics.record(call_site, model, time.monotonic() - started, error=True)
+            logger.warning(f"Model tier '{tier_name}' failed for {call_site}: {e}")
+            return None
+
+        llm_metrics.record(
+            call_site, model, time.monotonic() - started, response=response
+        )
+        if validator is not None and not validator(
+            response.choices[0].message.content or ""
+        ):
+            logger.info(
+                f"Model tier '{tier_name}' returned invalid output for {call_site}, falling back"
+            )
+            return None
+        return response
+
+    async def _timed_completion(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        priority: LLMPriority,
+        provider: Optional[str] = None,
+        tier: Optional[str] = None,
+        max_concurrency: Optional[int] = None,
+        api_base: Optional[str] = None,
+        **kwargs,
+    ) -> litellm.ModelResponse:
+        """Single scheduled completion call that feeds the latency tracker."""
+        provider = provider or settings.LLM_PROVIDER
+        model_string = self._get_model_string(model, provider)
         logger.debug(f"Calling acompletion with model: {model_string}")
 
         call_kwargs = {
@@ -50,13 +310,97 @@ class LLMService:
             **kwargs,
         }
 
-        if settings.LLM_PROVIDER == "ollama" and settings.ollama_api_base_url:
+        if api_base:
+            call_kwargs["api_base"] = api_base
+        elif provider == "ollama" and settings.ollama_api_base_url:
             call_kwargs["api_base"] = settings.ollama_api_base_url
+        self._add_pooled_client(call_kwargs, provider)
+
+        if settings.llm_circuit_enabled:
+            # Fail fast instead of waiting for a slot to a failing provider
+            self.circuits.check(provider, model)
+
+        async with AsyncExitStack() as slot:
+            await slot.enter_async_context(
+                self.scheduler.slot(
+                    provider, LLMPriority(priority), tier, max_concurrency
+                )
+            )
+            started = time.monotonic()
+            if provider == "fake":
+                completion = fake_llm_provider.acompletion
+            else:
+                completion = litellm.acompletion
+            try:
+                response = await self._guarded_call(
+                    provider, model, lambda: completion(**call_kwargs)
+                )
+            except asyncio.CancelledError:
+                # A call that lost a hedge race took at least this long; dropping
+                # it would bias the latency percentile low
+                self.hedge_tracker.record_latency(model, time.monotonic() - started)
+                raise
+            self.hedge_tracker.record_latency(model, time.monotonic() - started)
+            if kwargs.get("stream"):
+                # The slot is held until the stream is consumed or closed
+                return SlotHoldingStream(response, slot.pop_all())
+            return response
+
+    async def _hedged_completion(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        priority: LLMPriority,
+        latency_budget: float,
+        **kwargs,
+    ) -> litellm.ModelResponse:
+        """
+        Runs the primary call and, if it has not answered within the hedge
+        delay, races it against a second request. The loser is cancelled.
+        """
+        primary = asyncio.create_task(
+            self._timed_completion(model, messages, priority, **kwargs)
+        )
+        delay = self.hedge_tracker.hedge_delay(model, latency_budget)
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+
+        secondary_model = hedge_model_for(model)
+        logger.info(
+            f"Primary call to {model} exceeded {delay:.2f}s, hedging with {secondary_model}"
+        )
+        hedge = asyncio.create_task(
+            self._timed_completion(secondary_model, messages, priority, **kwargs)
+        )
 
-        return await litellm.acompletion(**call_kwargs)
+        pending = {primary, hedge}
+        last_error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        self.hedge_tracker.record_hedge(model, hedge_won=task is hedge)
+                        return task.result()
+                    last_error = task.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        # Both calls failed
+        self.hedge_tracker.record_hedge(model, hedge_won=False)
+        raise last_error
 
     async def aembedding(
-        self, model: str, input_texts: List[str], **kwargs
+        self,
+        model: str,
+        input_texts: List[str],
+        priority: LLMPriority = LLMPriority.INTERACTIVE,
+        call_site: str = "embedding",
+        **kwargs,
     ) -> litellm.EmbeddingResponse:
         """
         Makes an asynchronous call to the embedding endpoint of the configured LLM.
@@ -64,6 +408,8 @@ class LLMService:
         Args:
             model: The base name of the embedding model to use.
             input_texts: A list of texts to generate embeddings for.
+            priority: Scheduling class, see `acompletion`.
+            call_site: Label for latency, error and usage metrics, see `acompletion`.
             **kwargs: Additional arguments for litellm.aembedding.
 
         Returns:
@@ -80,8 +426,28 @@ class LLMService:
 
         if settings.LLM_PROVIDER == "ollama" and settings.ollama_api_base_url:
             call_kwargs["api_base"] = settings.ollama_api_base_url
+        self._add_pooled_client(call_kwargs, settings.LLM_PROVIDER)
+
+        started = time.monotonic()
+        try:
+            if settings.llm_circuit_enabled:
+                self.circuits.check(settings.LLM_PROVIDER, model)
+            async with self.scheduler.slot(settings.LLM_PROVIDER, LLMPriority(priority)):
+                if settings.LLM_PROVIDER == "fake":
+                    embedding = fake_llm_provider.aembedding
+                else:
+                    embedding = litellm.aembedding
+                response = await self._guarded_call(
+                    settings.LLM_PROVIDER, model, lambda: embedding(**call_kwargs)
+                )
+        except Exception:
+            llm_metrics.record(call_site, model, time.monotonic() - started, error=True)
+            raise
 
-        return await litellm.aembedding(**call_kwargs)
+        llm_metrics.record(
+            call_site, model, time.monotonic() - started, response=response
+        )
+        return response
 
 
 llm_service = LLMService()
@@ -0,0 +1,186 @@
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional, Set
+
+from app.config import settings
+from app.services.llm_service import llm_service
+from app.services.memory.analysis_service import analysis_service
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisBatchStats:
+    """Counters for batched analysis: batch sizes, fallbacks and tokens saved."""
+
+    def __init__(self):
+        self.submitted = 0
+        self.batches = 0
+        self.batched_conversations = 0
+        self.single_calls = 0
+        self.fallbacks = 0
+        self.max_batch_size = 0
+        self.prompt_tokens_sent = 0
+        self.prompt_tokens_saved = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "submitted": self.submitted,
+            "batches": self.batches,
+            "batched_conversations": self.batched_conversations,
+            "single_calls": self.single_calls,
+            "fallbacks": self.fallbacks,
+            "avg_batch_size": (
+                self.batched_conversations / self.batches if self.batches else 0.0
+            ),
+            "max_batch_size": self.max_batch_size,
+            "prompt_tokens_sent": self.prompt_tokens_sent,
+            "prompt_tokens_saved": self.prompt_tokens_saved,
+        }
+
+
+class AnalysisBatcher:
+    """
+    Collects conversations ended within a short window and analyzes them in
+    as few LLM calls as possible.
+
+    Pending conversations are packed into batches up to
+    `analysis_batch_max_prompt_tokens`; the instruction block and JSON schema
+    are sent once per batch instead of once per conversation. Conversations
+    the batched response does not cover fall back to the single-call path.
+    When batching is disabled, `submit` runs the single-call analysis directly.
+    """
+
+    def __init__(self):
+        self._pending: List[str] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.stats = AnalysisBatchStats()
+
+    async def submit(self, conversation_id: str):
+        """Queues a finished conversation for analysis."""
+        self.stats.submitted += 1
+        if not settings.analysis_batching_enabled:
+            self.stats.single_calls += 1
+            await analysis_service.analyze_conversation_and_update_memory(
+                conversation_id
+            )
+            return
+
+        self._pending.append(conversation_id)
+        if len(self._pending) >= settings.analysis_batch_max_conversations:
+            self._start_flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                settings.analysis_batch_window_seconds, self._start_flush
+            )
+
+    def _start_flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, []
+        task = asyncio.create_task(self._run(pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def flush(self):
+        """Analyzes everything pending now and waits for in-flight batches."""
+        self._start_flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _run(self, conversation_ids: List[str]):
+        gathered = await asyncio.gather(
+            *(analysis_service._get_data_for_analysis(cid) for cid in conversation_ids)
+        )
+        analysis_data = [data for data in gathered if data]
+        for cid, data in zip(conversation_ids, gathered):
+            if not data:
+                logger.warning(f"Could not gather analysis data for conversation {cid}.")
+
+        for batch in self._pack(analysis_data):
+            if len(batch) == 1:
+                self.stats.single_calls += 1
+                await analysis_service.analyze_conversation_and_update_memory(
+                    batch[0]["conversation_id"], analysis_data=batch[0]
+                )
+                continue
+            await self._run_batch(batch)
+
+    def _pack(self, analysis_data: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Greedily groups conversations into batches that fit the token budget."""
+        model = settings.memory_consolidation_model
+        overhead = llm_service.count_tokens(
+            model, analysis_service._build_batched_analysis_prompt([])
+        )
+        budget = settings.analysis_batch_max_prompt_tokens
+
+        batches: List[List[Dict[str, Any]]] = []
+        current: List[Dict[str, Any]] = []
+        used = overhead
+        for data in analysis_data:
+            cost = llm_service.count_tokens(
+                model, analysis_service._build_conversation_block(data)
+            )
+            if current and (
+                used + cost > budget
+                or len(current) >= settings.analysis_batch_max_conversations
+            ):
+                batches.append(current)
+                current, used = [], overhead
+            current.append(data)
+            used += cost
+        if current:
+            batches.append(current)
+        return batches
+
+    async def _run_batch(self, batch: List[Dict[str, Any]]):
+        model = settings.memory_consolidation_model
+        batched_tokens = llm_service.count_tokens(
+            model, analysis_service._build_batched_analysis_prompt(batch)
+        )
+        single_tokens = {
+            data["conversation_id"]: llm_service.count_tokens(
+                model, analysis_service._build_unified_analysis_prompt(data)
+            )
+            for data in batch
+        }
+
+        self.stats.batches += 1
+        self.stats.batched_conversations += len(batch)
+        self.stats.max_batch_size = max(self.stats.max_batch_size, len(batch))
+        self.stats.prompt_tokens_sent += batched_tokens
+
+        missing = await analysis_service.analyze_batch(batch)
+        # Conversations that fall back pay for their single prompt as well
+        self.stats.prompt_tokens_saved += (
+            sum(t for cid, t in single_tokens.items() if cid not in missing)
+            - batched_tokens
+        )
+
+        by_id = {data["conversation_id"]: data for data in batch}
+        for conversation_id in missing:
+            logger.info(
+                f"Falling back to single analysis for conversation {conversation_id}"
+            )
+            self.stats.fallbacks += 1
+            await analysis_service.analyze_conversation_and_update_memory(
+                conversation_id, analysis_data=by_id[conversation_id]
+            )
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.analysis_batching_enabled,
+            "window_seconds": settings.analysis_batch_window_seconds,
+            "max_conversations": settings.analysis_batch_max_conversations,
+            "max_prompt_tokens": settings.analysis_batch_max_prompt_tokens,
+            "pending": len(self._pending),
+            "in_flight_batches": len(self._tasks),
+            **self.stats.to_dict(),
+        }
+
+
+analysis_batcher = AnalysisBatcher()
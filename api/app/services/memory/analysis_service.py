@@ -6,6 +6,9 @@ from datetime import datetime
 from app.db import db
 from app.config import settings
 from app.services.llm_service import llm_service
+from app.services.llm_scheduler import LLMPriority
+from app.services.prompt_templates import prompt_templates
+from app.services.session_store import session_store
 from app.services.memory.vector_service import vector_service
 from app.services.memory.personality_service import personality_service
 from app.services.memory.emotional_state_service import emotional_state_service, Mood
@@ -20,6 +23,17 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+ANALYSIS_GUIDELINES = """**Guidelines:**
+- If nothing significant happened for a section (e.g., no new memories), return an empty array `[]`.
+- All numeric scores are out of 10.
+- Make meaningful adjustments. Be bold in your analysis. A rude conversation should tank relationship scores. A heartfelt one should boost them significantly.
+"""
+
+ANALYSIS_STEPS = """1.  **Sentiment of Final Player Response**: Analyze the sentiment of the last message from the player.
+2.  **Memory Consolidation**: Extract key memories, learned facts, and relationship milestones.
+3.  **Emotional State Update**: Determine the NPC's new emotional state after the conversation.
+4.  **Personality Profile Update**: Adjust the NPC's personality perception of the player."""
+
 
 class AnalysisService:
     """
@@ -33,14 +47,20 @@ class AnalysisService:
     def __init__(self):
         pass
 
-    async def analyze_conversation_and_update_memory(self, conversation_id: str):
+    async def analyze_conversation_and_update_memory(
+        self, conversation_id: str, analysis_data: Optional[Dict[str, Any]] = None
+    ):
         """
         The main method to orchestrate post-conversation analysis and updates.
+
+        `analysis_data` can be passed when it was already gathered (e.g. by the
+        analysis batcher falling back to a single call).
         """
         logger.info(f"Starting unified analysis for conversation {conversation_id}")
         try:
             # 1. Get all necessary data for the prompt
-            analysis_data = await self._get_data_for_analysis(conversation_id)
+            if analysis_data is None:
+                analysis_data = await self._get_data_for_analysis(conversation_id)
             if not analysis_data:
                 logger.warning(
                     f"Could not gather analysis data for conversation {conversation_id}. Aborting."
@@ -53,12 +73,15 @@ class AnalysisService:
             # 3. Call the LLM
             messages = [{"role": "user", "content": prompt}]
             response = await llm_service.acompletion(
-                model=settings.memory_consolidation_model, messages=messages
+                model=settings.memory_consolidation_model,
+                messages=messages,
+                priority=LLMPriority.BACKGROUND,
+                call_site="analysis",
             )
             response_text = response.choices[0].message.content
 
             # 4. Parse and process the response
-            analysis_results = json.loads(response_text.strip())
+            analysis_results = _parse_json_response(response_text)
             logger.info(f"🔍 ANALYSIS COMPLETE for conversation {conversation_id}")
             logger.info(f"🔍 Analysis results keys: {list(analysis_results.keys())}")
 
@@ -75,6 +98,64 @@ class AnalysisService:
                 f"Error during unified analysis for conversation {conversation_id}: {e}"
             )
 
+    async def analyze_batch(self, batch: List[Dict[str, Any]]) -> List[str]:
+        """
+        Analyzes several conversations in one LLM call.
+
+        Args:
+            batch: Analysis data of each conversation, as gathered by
+                `_get_data_for_analysis`.
+
+        Returns:
+            Ids of the conversations that got no result in the response and
+            still need a single analysis call. A result that fails while being
+            applied is not retried, as part of it may already be written.
+        """
+        conversation_ids = [data["conversation_id"] for data in batch]
+        logger.info(f"Starting batched analysis for conversations {conversation_ids}")
+        try:
+            prompt = self._build_batched_analysis_prompt(batch)
+            response = await llm_service.acompletion(
+                model=settings.memory_consolidation_model,
+                messages=[{"role": "user", "content": prompt}],
+                priority=LLMPriority.BACKGROUND,
+                call_site="analysis_batch",
+            )
+            parsed = _parse_json_response(response.choices[0].message.content)
+        except Exception as e:
+            logger.error(f"Batched analysis failed for {conversation_ids}: {e}")
+            return conversation_ids
+
+        if isinstance(parsed, dict):
+            parsed = parsed.get("results", [])
+        results = {}
+        if isinstance(parsed, list):
+            results = {
+                str(item.get("conversation_id")): item
+                for item in parsed
+                if isinstance(item, dict)
+            }
+
+        missing = []
+        for data in batch:
+            analysis_results = results.get(data["conversation_id"])
+            if not analysis_results:
+                missing.append(data["conversation_id"])
+                continue
+            try:
+                await self._process_analysis_results(data, analysis_results)
+            except Exception as e:
+                # Some updates may already be written; a single call would
+                # apply them again, so this conversation is not retried
+                logger.error(
+                    f"Error processing batched analysis for conversation {data['conversation_id']}: {e}"
+                )
+
+        logger.info(
+            f"Batched analysis complete: {len(batch) - len(missing)}/{len(batch)} conversations processed"
+        )
+        return missing
+
     async def _get_data_for_analysis(
         self, conversation_id: str
     ) -> Optional[Dict[str, Any]]:
@@ -134,7 +215,47 @@ class AnalysisService:
 
     def _build_unified_analysis_prompt(self, data: Dict[str, Any]) -> str:
         """Builds the single, comprehensive prompt for the LLM."""
+        return f"""You are an AI specialized in psychology, memory, and character simulation. Your task is to analyze a conversation from the perspective of {data["npc_name"]} from Stardew Valley and update their internal state.
+
+{self._build_conversation_block(data)}
+
+**ANALYSIS INSTRUCTIONS**
+Based on EVERYTHING above, perform a comprehensive analysis and provide the output in a single, clean JSON object.
+
+{ANALYSIS_STEPS}
 
+**JSON OUTPUT FORMAT (Strictly Adhere to this):**
+{self._build_result_schema()}
+
+{ANALYSIS_GUIDELINES}"""
+
+    def _build_batched_analysis_prompt(self, batch: List[Dict[str, Any]]) -> str:
+        """Builds one prompt for several conversations, sharing the instruction block."""
+        sections = "\n\n---\n\n".join(
+            f"### CONVERSATION_ID: {data['conversation_id']}\n{self._build_conversation_block(data)}"
+            for data in batch
+        )
+        id_field = '\n  "conversation_id": "The CONVERSATION_ID of the conversation this object analyzes",'
+        schema = self._build_result_schema(id_field).replace("\n", "\n  ")
+
+        return f"""You are an AI specialized in psychology, memory, and character simulation. Your task is to analyze {len(batch)} separate conversations from Stardew Valley. Analyze each one ONLY from the perspective of its own NPC, using only the data in its section, and update that NPC's internal state.
+
+{sections}
+
+**ANALYSIS INSTRUCTIONS**
+For EACH conversation above, perform a comprehensive analysis and provide the output as a single, clean JSON array with exactly one object per conversation, in the same order.
+
+{ANALYSIS_STEPS}
+
+**JSON ARRAY OUTPUT FORMAT (Strictly Adhere to this):**
+[
+  {schema}
+]
+
+{ANALYSIS_GUIDELINES}"""
+
+    def _build_conversation_block(self, data: Dict[str, Any]) -> str:
+        """The per-conversation part of the analysis prompt: state, memories, transcript."""
         memories_str = (
             "\n".join(
                 f"- {'You said' if m['speaker'] == data['npc_name'] else 'They said'}: '{m['message']}'"
@@ -144,11 +265,7 @@ class AnalysisService:
             else "No specific long-term memories stand out right now."
         )
 
-        valid_moods = ", ".join([mood.value for mood in Mood])
-
-        prompt = f"""You are an AI specialized in psychology, memory, and character simulation. Your task is to analyze a conversation from the perspective of {data["npc_name"]} from Stardew Valley and update their internal state.
-
-**NPC Profile: {data["npc_name"]}**
+        return f"""**NPC Profile: {data["npc_name"]}**
 **Player Profile: {data["player_name"]}**
 
 **Current Emotional State (before this conversation):**
@@ -165,18 +282,13 @@ class AnalysisService:
 {memories_str}
 
 **Conversation Transcript to Analyze:**
-{data["transcript"]}
+{data["transcript"]}"""
 
-**ANALYSIS INSTRUCTIONS**
-Based on EVERYTHING above, perform a comprehensive analysis and provide the output in a single, clean JSON object.
-
-1.  **Sentiment of Final Player Response**: Analyze the sentiment of the last message from the player.
-2.  **Memory Consolidation**: Extract key memories, learned facts, and relationship milestones.
-3.  **Emotional State Update**: Determine the NPC's new emotional state after the conversation.
-4.  **Personality Profile Update**: Adjust the NPC's personality perception of the player.
+    def _build_result_schema(self, extra_fields: str = "") -> str:
+        """JSON schema of one analysis result; `extra_fields` are prepended inside the object."""
+        valid_moods = ", ".join([mood.value for mood in Mood])
 
-**JSON OUTPUT FORMAT (Strictly Adhere to this):**
-{{
+        return f"""{{{extra_fields}
   "final_player_sentiment": {{
     "score": "A float from -1.0 (very negative) to 1.0 (very positive) based on the last player message"
   }},
@@ -214,14 +326,7 @@ Based on EVERYTHING above, perform a comprehensive analysis and provide the outp
     "new_sincerity": 8.0,
     "new_romantic_interest": 3.0
   }}
-}}
-
-**Guidelines:**
-- If nothing significant happened for a section (e.g., no new memories), return an empty array `[]`.
-- All numeric scores are out of 10.
-- Make meaningful adjustments. Be bold in your analysis. A rude conversation should tank relationship scores. A heartfelt one should boost them significantly.
-"""
-        return prompt
+}}"""
 
     async def _process_analysis_results(
         self, analysis_data: Dict[str, Any], analysis_results: Dict[str, Any]
@@ -305,6 +410,8 @@ Based on EVERYTHING above, perform a comprehensive analysis and provide the outp
                 where={"playerId_npcId": {"playerId": player_id, "npcId": npc_id}},
                 data=db_update_data,
             )
+            prompt_templates.invalidate(player_id, npc_id)
+            session_store.evict_relationship(player_id, npc_id)
             logger.info(
                 f"✅ Successfully updated personality profile for player {player_id} with NPC {npc_id}"
             )
@@ -379,6 +486,8 @@ Based on EVERYTHING above, perform a comprehensive analysis and provide the outp
                     },
                 },
             )
+            prompt_templates.invalidate(player_id, npc_id)
+            session_store.evict_relationship(player_id, npc_id)
             logger.info(
                 f"Updated emotional state for NPC {npc_id} towards player {player_id}"
             )
@@ -482,4 +591,13 @@ Based on EVERYTHING above, perform a comprehensive analysis and provide the outp
             logger.error(f"Error updating friendship points in DB: {e}")
 
 
+def _parse_json_response(text: str) -> Any:
+    """Parses the model's JSON output, tolerating a surrounding markdown code fence."""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        text = text.rsplit("```", 1)[0]
+    return json.loads(text.strip())
+
+
 analysis_service = AnalysisService()
@@ -1,10 +1,11 @@
 import logging
 from datetime import datetime, timedelta, timezone
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 
 from app.db import db
 from app.config import settings
 from app.services.memory.vector_service import vector_service
+from app.services.memory.dialogue_writer import dialogue_writer
 
 logger = logging.getLogger(__name__)
 
@@ -18,28 +19,45 @@ except ImportError:
     logger.warning("Realtime monitor not available, WebSocket notifications disabled")
 
 
+def activity_cutoff() -> datetime:
+    """
+    Conversations without a turn since this moment (UTC) have timed out. A
+    conversation's last activity is its latest dialogue line, or its start
+    when it has none; the session store expires sessions by the same rule.
+    """
+    return datetime.now(timezone.utc) - timedelta(
+        minutes=settings.conversation_timeout_minutes
+    )
+
+
+async def find_active_conversation(player_id: str, npc_id: str) -> Optional[str]:
+    """Id of the pair's conversation that has not ended or timed out, if any."""
+    cutoff_time = activity_cutoff()
+    conversation = await db.conversation.find_first(
+        where={
+            "playerId": player_id,
+            "npcId": npc_id,
+            "endTime": None,
+            "OR": [
+                {"startTime": {"gte": cutoff_time}},
+                {"dialogueEntries": {"some": {"timestamp": {"gte": cutoff_time}}}},
+            ],
+        },
+        order={"startTime": "desc"},
+    )
+    return conversation.id if conversation else None
+
+
 async def get_or_create_active_conversation(
     player_id: str, npc_id: str, context: Dict[str, Any]
 ) -> str:
     """Obtiene una conversación activa o crea una nueva, usando Prisma."""
     try:
-        cutoff_time = datetime.now(timezone.utc) - timedelta(
-            minutes=settings.conversation_timeout_minutes
-        )
-
-        active_conversation = await db.conversation.find_first(
-            where={
-                "playerId": player_id,
-                "npcId": npc_id,
-                "endTime": None,
-                "startTime": {"gte": cutoff_time},
-            },
-            order={"startTime": "desc"},
-        )
+        active_conversation = await find_active_conversation(player_id, npc_id)
 
         if active_conversation:
-            logger.debug(f"Found active conversation: {active_conversation.id}")
-            return active_conversation.id
+            logger.debug(f"Found active conversation: {active_conversation}")
+            return active_conversation
 
         logger.debug("No active conversation found, creating a new one.")
         new_conversation = await db.conversation.create(
@@ -107,6 +125,14 @@ async def add_dialogue_entry(
                     f"Failed to generate embedding for message: {message[:50]}..."
                 )
 
+        if settings.dialogue_write_behind_enabled:
+            # Buffered, journaled and flushed with other lines in one INSERT
+            await dialogue_writer.write(conversation_id, speaker, message, embedding)
+            logger.debug(
+                f"Added dialogue entry for speaker '{speaker}' to conversation '{conversation_id}'"
+            )
+            return
+
         # Create dialogue entry data
         dialogue_data = {
             "conversationId": conversation_id,
@@ -154,6 +180,57 @@ async def add_dialogue_entry(
             logger.error(f"Fallback save also failed: {fallback_error}")
 
 
+async def add_dialogue_entries(
+    conversation_id: str,
+    lines: List[Tuple[str, str]],
+    generate_embedding: bool = True,
+):
+    """
+    Saves (speaker, message) lines of one turn, in order. With write-behind
+    they are buffered together, so the turn waits for a single flush.
+    """
+    if not settings.dialogue_write_behind_enabled:
+        for speaker, message in lines:
+            await add_dialogue_entry(conversation_id, speaker, message, generate_embedding)
+        return
+
+    try:
+        entries = []
+        for speaker, message in lines:
+            embedding = []
+            if generate_embedding:
+                embedding = await vector_service.generate_embedding(message)
+                if not embedding:
+                    logger.warning(
+                        f"Failed to generate embedding for message: {message[:50]}..."
+                    )
+            entries.append((speaker, message, embedding))
+
+        await dialogue_writer.write_lines(conversation_id, entries)
+        logger.debug(
+            f"Added {len(entries)} dialogue entries to conversation '{conversation_id}'"
+        )
+    except Exception as e:
+        logger.error(f"Error al añadir entradas de diálogo: {e}")
+
+
+async def get_recent_dialogue(conversation_id: str, limit: int) -> List[Dict[str, str]]:
+    """Últimas `limit` líneas de una conversación, de la más antigua a la más reciente."""
+    try:
+        entries = await db.dialogueentry.find_many(
+            where={"conversationId": conversation_id},
+            order={"timestamp": "desc"},
+            take=limit,
+        )
+        return [
+            {"speaker": entry.speaker, "message": entry.message}
+            for entry in reversed(entries)
+        ]
+    except Exception as e:
+        logger.error(f"Error loading recent dialogue for {conversation_id}: {e}")
+        return []
+
+
 async def end_conversation(conversation_id: str):
     """Marca una conversación como terminada estableciendo su 'endTime'."""
     try:
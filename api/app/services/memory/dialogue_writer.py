@@ -0,0 +1,338 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+from app.db import db
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class DialogueWriteBuffer:
+    """
+    Write-behind buffer for DialogueEntry rows.
+
+    Entries are appended to a local JSONL journal, buffered, and written with
+    one multi-row INSERT when the buffer reaches `dialogue_write_max_batch_rows`
+    or `dialogue_write_flush_interval_ms` after the first buffered entry.
+    `write` returns once its entry is in the database, so callers keep their
+    ordering and completion guarantees while the round trips are shared. The
+    wait is bounded by `dialogue_write_wait_timeout_seconds`; lines not
+    flushed by then stay buffered and journaled for a later flush.
+    Journal I/O runs in a worker thread.
+
+    At most `dialogue_write_buffer_max_lines` lines are held in memory. While
+    the database is down, further lines are only journaled ("spilled") and
+    `write` returns without waiting; they are read back from the journal as
+    the buffer drains.
+
+    Ids are generated client-side and rows are inserted with
+    ON CONFLICT DO NOTHING, so replaying the journal after a crash never
+    duplicates lines that were already flushed.
+    """
+
+    def __init__(self):
+        self._buffer: List[Dict[str, Any]] = []
+        self._waiters: Dict[str, asyncio.Future] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._journal_lock: Optional[asyncio.Lock] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        # Journaled lines not held in the buffer
+        self._spilled = 0
+        self.spilled_lines = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.failed_flushes = 0
+        self.replayed = 0
+        self.last_flush_ms = 0.0
+        self.timed_out_waits = 0
+
+    @property
+    def journal_path(self) -> str:
+        return settings.dialogue_journal_path
+
+    async def write(
+        self,
+        conversation_id: str,
+        speaker: str,
+        message: str,
+        embedding: Optional[List[float]] = None,
+    ) -> str:
+        """Buffers one dialogue line and waits until it has been flushed."""
+        ids = await self.write_lines(conversation_id, [(speaker, message, embedding)])
+        return ids[0]
+
+    async def write_lines(
+        self,
+        conversation_id: str,
+        lines: List[Tuple[str, str, Optional[List[float]]]],
+    ) -> List[str]:
+        """
+        Buffers (speaker, message, embedding) lines of one conversation
+        together, so a turn's lines share a flush, and waits until they have
+        been flushed. Timestamps increase in the order of `lines`.
+        """
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        entries = [
+            {
+                "id": str(uuid.uuid4()),
+                "conversation_id": conversation_id,
+                "speaker": speaker,
+                "message": message,
+                "embedding": embedding or None,
+                "timestamp": (now + timedelta(microseconds=index)).isoformat(),
+            }
+            for index, (speaker, message, embedding) in enumerate(lines)
+        ]
+        if len(self._buffer) + len(entries) > settings.dialogue_write_buffer_max_lines:
+            await self._spill(entries)
+            logger.warning(
+                f"Dialogue buffer full ({len(self._buffer)} lines), journaling "
+                f"{len(entries)} lines for {conversation_id} without waiting"
+            )
+            self._schedule_flush()
+            return [entry["id"] for entry in entries]
+
+        loop = asyncio.get_running_loop()
+        futures = []
+        for entry in entries:
+            future = loop.create_future()
+            self._waiters[entry["id"]] = future
+            futures.append(future)
+        # Buffered before journaling, so a journal rewrite during the append
+        # cannot drop them; a line flushed first is only replayed as a no-op
+        self._buffer.extend(entries)
+        await self._journal_io(self._append_to_journal, entries)
+        self._schedule_flush()
+
+        try:
+            await asyncio.wait_for(
+                asyncio.shield(asyncio.gather(*futures)),
+                timeout=settings.dialogue_write_wait_timeout_seconds,
+            )
+        except asyncio.TimeoutError:
+            self.timed_out_waits += 1
+            logger.warning(
+                f"Dialogue lines for {conversation_id} not flushed after "
+                f"{settings.dialogue_write_wait_timeout_seconds}s, "
+                "leaving them buffered"
+            )
+        return [entry["id"] for entry in entries]
+
+    def _get_journal_lock(self) -> asyncio.Lock:
+        if self._journal_lock is None:
+            self._journal_lock = asyncio.Lock()
+        return self._journal_lock
+
+    async def _journal_io(self, operation, *args):
+        """Runs a journal operation in a worker thread, one at a time."""
+        async with self._get_journal_lock():
+            await asyncio.to_thread(operation, *args)
+
+    async def _spill(self, entries: List[Dict[str, Any]]):
+        """Journals entries the buffer has no room for."""
+        async with self._get_journal_lock():
+            await asyncio.to_thread(self._append_to_journal, entries)
+            self._spilled += len(entries)
+        self.spilled_lines += len(entries)
+
+    async def _compact_journal(self, flushed: Set[str]):
+        """Drops flushed entries from the journal."""
+        async with self._get_journal_lock():
+            if self._spilled:
+                # The journal holds lines the buffer does not; keep them
+                await asyncio.to_thread(self._remove_from_journal, flushed)
+            else:
+                await asyncio.to_thread(self._rewrite_journal, list(self._buffer))
+
+    def _schedule_flush(self):
+        if len(self._buffer) >= settings.dialogue_write_max_batch_rows:
+            self._start_flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                settings.dialogue_write_flush_interval_ms / 1000, self._start_flush
+            )
+
+    def _start_flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self.flush())
+
+    async def flush(self):
+        """Writes everything buffered, in batches of at most max_batch_rows."""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            if self._spilled and not self._buffer:
+                await self._refill_from_journal()
+            while self._buffer:
+                batch = self._buffer[: settings.dialogue_write_max_batch_rows]
+                started = time.monotonic()
+                try:
+                    await self._insert(batch)
+                except Exception as e:
+                    self.failed_flushes += 1
+                    logger.error(
+                        f"Dialogue flush of {len(batch)} rows failed, will retry: {e}"
+                    )
+                    # Entries stay buffered (and journaled) for the next attempt
+                    if self._flush_handle is None:
+                        self._flush_handle = asyncio.get_running_loop().call_later(
+                            settings.dialogue_write_flush_interval_ms / 1000,
+                            self._start_flush,
+                        )
+                    return
+
+                del self._buffer[: len(batch)]
+                self.flushes += 1
+                self.rows_written += len(batch)
+                self.last_flush_ms = (time.monotonic() - started) * 1000
+                await self._compact_journal({entry["id"] for entry in batch})
+                if self._spilled and not self._buffer:
+                    await self._refill_from_journal()
+                for entry in batch:
+                    future = self._waiters.pop(entry["id"], None)
+                    if future is not None and not future.done():
+                        future.set_result(None)
+
+    async def _insert(self, batch: List[Dict[str, Any]]):
+        values = []
+        params: List[Any] = []
+        for entry in batch:
+            n = len(params)
+            values.append(
+                f"(${n + 1}, ${n + 2}, ${n + 3}, ${n + 4}, ${n + 5}::vector, ${n + 6}::timestamp)"
+            )
+            embedding = entry.get("embedding")
+            params.extend(
+                [
+                    entry["id"],
+                    entry["conversation_id"],
+                    entry["speaker"],
+                    entry["message"],
+                    f"[{','.join(map(str, embedding))}]" if embedding else None,
+                    entry["timestamp"],
+                ]
+            )
+
+        await db.execute_raw(
+            f"""
+            INSERT INTO "DialogueEntry" (id, "conversationId", speaker, message, embedding, timestamp)
+            VALUES {", ".join(values)}
+            ON CONFLICT (id) DO NOTHING
+            """,
+            *params,
+        )
+        logger.debug(f"Flushed {len(batch)} dialogue entries")
+
+    def _append_to_journal(self, entries: List[Dict[str, Any]]):
+        try:
+            with open(self.journal_path, "a", encoding="utf-8") as journal:
+                for entry in entries:
+                    journal.write(json.dumps(entry) + "\n")
+                journal.flush()
+                if settings.dialogue_journal_fsync:
+                    os.fsync(journal.fileno())
+        except OSError as e:
+            logger.error(f"Could not append to dialogue journal: {e}")
+
+    def _rewrite_journal(self, buffered: List[Dict[str, Any]]):
+        """Keeps only still-buffered entries in the journal."""
+        try:
+            if not buffered:
+                if os.path.exists(self.journal_path):
+                    open(self.journal_path, "w").close()
+                return
+            tmp_path = self.journal_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as journal:
+                for entry in buffered:
+                    journal.write(json.dumps(entry) + "\n")
+            os.replace(tmp_path, self.journal_path)
+        except OSError as e:
+            logger.error(f"Could not compact dialogue journal: {e}")
+
+    def _remove_from_journal(self, flushed: Set[str]):
+        """Drops flushed entries from the journal, keeping everything else."""
+        try:
+            entries = [e for e in self._read_journal() if e["id"] not in flushed]
+        except OSError as e:
+            logger.error(f"Could not compact dialogue journal: {e}")
+            return
+        self._rewrite_journal(entries)
+
+    def _read_journal(self) -> List[Dict[str, Any]]:
+        if not os.path.exists(self.journal_path):
+            return []
+        entries = []
+        with open(self.journal_path, encoding="utf-8") as journal:
+            for line in journal:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A torn last line from a crash mid-write
+                    logger.warning("Skipping unreadable dialogue journal line")
+        return entries
+
+    async def _refill_from_journal(self) -> int:
+        """
+        Moves journaled lines the buffer does not hold into it, up to
+        `dialogue_write_buffer_max_lines`; the rest stay spilled. Returns how
+        many were loaded.
+        """
+        async with self._get_journal_lock():
+            try:
+                entries = await asyncio.to_thread(self._read_journal)
+            except OSError as e:
+                logger.error(f"Could not read dialogue journal: {e}")
+                return 0
+            known = {entry["id"] for entry in self._buffer}
+            pending = [entry for entry in entries if entry["id"] not in known]
+            room = max(0, settings.dialogue_write_buffer_max_lines - len(self._buffer))
+            loaded = pending[:room]
+            self._buffer[:0] = loaded
+            self._spilled = len(pending) - len(loaded)
+        return len(loaded)
+
+    async def replay_journal(self):
+        """Re-inserts lines left in the journal by a previous run. Called on startup."""
+        loaded = await self._refill_from_journal()
+        if not loaded:
+            return
+
+        logger.info(f"Replaying {loaded + self._spilled} dialogue entries from the journal")
+        self.replayed += loaded + self._spilled
+        await self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.dialogue_write_behind_enabled,
+            "buffered": len(self._buffer),
+            "spilled": self._spilled,
+            "spilled_lines": self.spilled_lines,
+            "max_buffer_lines": settings.dialogue_write_buffer_max_lines,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "avg_rows_per_flush": self.rows_written / self.flushes
+            if self.flushes
+            else 0.0,
+            "failed_flushes": self.failed_flushes,
+            "replayed": self.replayed,
+            "timed_out_waits": self.timed_out_waits,
+            "last_flush_ms": self.last_flush_ms,
+            "flush_interval_ms": settings.dialogue_write_flush_interval_ms,
+            "max_batch_rows": settings.dialogue_write_max_batch_rows,
+        }
+
+
+dialogue_writer = DialogueWriteBuffer()
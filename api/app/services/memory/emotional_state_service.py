@@ -24,6 +24,22 @@ class Mood(str, Enum):
     STRESSED = "STRESSED"
 
 
+# Dialogue mood descriptions, formatted with the mood intensity
+MOOD_DESCRIPTIONS = {
+    "VERY_HAPPY": "You are in an excellent mood (intensity {intensity}/10). You feel joyful, optimistic, and want to share your happiness.",
+    "HAPPY": "You are feeling good (intensity {intensity}/10). You're in a pleasant, positive mood.",
+    "CONTENT": "You are feeling peaceful and satisfied (intensity {intensity}/10). Life feels stable and good.",
+    "NEUTRAL": "You are in a normal, balanced mood (intensity {intensity}/10). Nothing particular is affecting your emotions.",
+    "WORRIED": "You are feeling anxious or concerned about something (intensity {intensity}/10). Your mind is preoccupied.",
+    "SAD": "You are feeling down or melancholy (intensity {intensity}/10). Things feel a bit heavy emotionally.",
+    "ANGRY": "You are feeling irritated or frustrated (intensity {intensity}/10). Your patience is shorter than usual.",
+    "EXCITED": "You are feeling energetic and enthusiastic (intensity {intensity}/10). You're eager and animated.",
+    "ROMANTIC": "You are feeling affectionate and romantic (intensity {intensity}/10). Your heart feels warm.",
+    "NOSTALGIC": "You are feeling wistful and reflective (intensity {intensity}/10). Old memories are on your mind.",
+    "STRESSED": "You are feeling overwhelmed or under pressure (intensity {intensity}/10). Everything feels like a lot right now.",
+}
+
+
 class EmotionalStateService:
     """
     Service for managing NPCs' dynamic emotional states.
@@ -66,6 +82,34 @@ class EmotionalStateService:
             )
             return self._get_default_emotional_state(npc_id, player_id)
 
+    def emotional_state_from_row(
+        self, npc_id: str, player_id: str, row: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Builds the `get_emotional_state` dict from an EmotionalState row given
+        as a column-name mapping (e.g. the JSON returned by the
+        relationship_context SQL function).
+        """
+        last_updated = row.get("lastUpdated")
+        if isinstance(last_updated, str):
+            last_updated = datetime.fromisoformat(last_updated)
+
+        return {
+            "npc_id": npc_id,
+            "player_id": player_id,
+            "current_mood": row.get("currentMood") or "NEUTRAL",
+            "mood_intensity": float(row.get("moodIntensity", 5.0)),
+            "recent_joy": float(row.get("recentJoy", 0.0)),
+            "recent_sadness": float(row.get("recentSadness", 0.0)),
+            "recent_anger": float(row.get("recentAnger", 0.0)),
+            "recent_anxiety": float(row.get("recentAnxiety", 0.0)),
+            "recent_excitement": float(row.get("recentExcitement", 0.0)),
+            "last_interaction_effect": row.get("lastInteractionEffect") or "",
+            "external_factors": row.get("externalFactors") or "",
+            "last_updated": last_updated or datetime.now(),
+            "relationship_context": "⚠️ DATOS DE PERCEPCIÓN: Estado emocional del NPC hacia este jugador específico",
+        }
+
     async def _get_or_create_emotional_state(
         self, npc_id: str, player_id: str
     ) -> Dict[str, Any]:
@@ -153,21 +197,12 @@ class EmotionalStateService:
         mood = emotional_state["current_mood"]
         intensity = emotional_state["mood_intensity"]
 
-        mood_descriptions = {
-            "VERY_HAPPY": f"You are in an excellent mood (intensity {intensity}/10). You feel joyful, optimistic, and want to share your happiness.",
-            "HAPPY": f"You are feeling good (intensity {intensity}/10). You're in a pleasant, positive mood.",
-            "CONTENT": f"You are feeling peaceful and satisfied (intensity {intensity}/10). Life feels stable and good.",
-            "NEUTRAL": f"You are in a normal, balanced mood (intensity {intensity}/10). Nothing particular is affecting your emotions.",
-            "WORRIED": f"You are feeling anxious or concerned about something (intensity {intensity}/10). Your mind is preoccupied.",
-            "SAD": f"You are feeling down or melancholy (intensity {intensity}/10). Things feel a bit heavy emotionally.",
-            "ANGRY": f"You are feeling irritated or frustrated (intensity {intensity}/10). Your patience is shorter than usual.",
-            "EXCITED": f"You are feeling energetic and enthusiastic (intensity {intensity}/10). You're eager and animated.",
-            "ROMANTIC": f"You are feeling affectionate and romantic (intensity {intensity}/10). Your heart feels warm.",
-            "NOSTALGIC": f"You are feeling wistful and reflective (intensity {intensity}/10). Old memories are on your mind.",
-            "STRESSED": f"You are feeling overwhelmed or under pressure (intensity {intensity}/10). Everything feels like a lot right now.",
-        }
-
-        base_description = mood_descriptions.get(mood, "You are in a normal mood.")
+        template = MOOD_DESCRIPTIONS.get(mood)
+        base_description = (
+            template.format(intensity=intensity)
+            if template
+            else "You are in a normal mood."
+        )
 
         # Add recent emotional modifiers
         modifiers = []
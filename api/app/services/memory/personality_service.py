@@ -1,10 +1,24 @@
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 from app.db import db
 
 logger = logging.getLogger(__name__)
 
+PROFILE_METRICS = (
+    "friendliness",
+    "extroversion",
+    "sincerity",
+    "curiosity",
+    "trust",
+    "respect",
+    "affection",
+    "annoyance",
+    "admiration",
+    "romantic_interest",
+    "humor_compatibility",
+)
+
 
 class PersonalityService:
     def __init__(self):
@@ -39,7 +53,7 @@ class PersonalityService:
             npc = await db.npc.find_unique(where={"id": npc_id})
             npc_name = npc.name if npc else "Unknown"
 
-            default_values = self._get_default_personality_for_npc(npc_name)
+            default_values = self.default_profile_for_npc(npc_name)
 
             await db.playerpersonalityprofile.create(
                 data={
@@ -56,7 +70,18 @@ class PersonalityService:
         except Exception as e:
             logger.error(f"Error en get_personality_profile: {e}")
             # Fallback a un perfil genérico en caso de error grave
-            return self._get_default_personality_for_npc("Unknown")
+            return self.default_profile_for_npc("Unknown")
+
+    def profile_from_row(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Builds the `get_personality_profile` dict from a PlayerPersonalityProfile
+        row given as a column-name mapping (e.g. the JSON returned by the
+        relationship_context SQL function).
+        """
+        return {
+            "summary": row.get("summary") or "",
+            **{metric: float(row[metric]) for metric in PROFILE_METRICS},
+        }
 
     async def generate_relationship_insight(
         self,
@@ -65,22 +90,27 @@ class PersonalityService:
         npc_name: str,
         npc_id: str = None,
         player_id: str = None,
+        emotional_state: Optional[Dict[str, Any]] = None,
     ) -> str:
         """
         Generate relationship insight including current emotional state.
+
+        `emotional_state` can be passed when the caller already has it;
+        otherwise it is fetched when npc_id is provided.
         """
         # Get current emotional state if npc_id is provided
         emotional_context = ""
-        if npc_id:
+        if npc_id or emotional_state:
             try:
-                # Import here to avoid circular imports
-                from app.services.memory.emotional_state_service import (
-                    emotional_state_service,
-                )
+                if emotional_state is None:
+                    # Import here to avoid circular imports
+                    from app.services.memory.emotional_state_service import (
+                        emotional_state_service,
+                    )
 
-                emotional_state = await emotional_state_service.get_emotional_state(
-                    npc_id, player_id
-                )
+                    emotional_state = await emotional_state_service.get_emotional_state(
+                        npc_id, player_id
+                    )
                 current_mood = emotional_state.get("current_mood", "NEUTRAL")
                 mood_intensity = emotional_state.get("mood_intensity", 5.0)
 
@@ -171,7 +201,7 @@ class PersonalityService:
    • Extroversión Percibida: {extroversion:.1f}/10"""
         return insight.strip()
 
-    def _get_default_personality_for_npc(self, npc_name: str) -> Dict[str, Any]:
+    def default_profile_for_npc(self, npc_name: str) -> Dict[str, Any]:
         """Obtiene valores de personalidad por defecto personalizados según el NPC."""
         npc_defaults = {
             # Existing NPCs
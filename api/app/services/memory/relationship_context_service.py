@@ -0,0 +1,197 @@
+import json
+import logging
+from typing import Dict, Any, Optional, List, Tuple
+
+from app.db import db
+from app.config import settings
+from app.services.memory.personality_service import personality_service
+from app.services.memory.emotional_state_service import emotional_state_service
+from app.services.memory.conversation_service import activity_cutoff
+from app.services.prompt_templates import prompt_templates
+
+logger = logging.getLogger(__name__)
+
+# Import realtime monitor for WebSocket notifications
+try:
+    from app.websockets.realtime import realtime_monitor
+
+    REALTIME_AVAILABLE = True
+except ImportError:
+    REALTIME_AVAILABLE = False
+
+# Cleared when the database has no relationship_context function (migration not
+# applied), so callers go straight to the per-entity queries from then on.
+_function_available = True
+
+
+async def get_relationship_context(
+    player_name: str,
+    npc_name: str,
+    npc_location: Optional[str],
+    context: Dict[str, Any],
+) -> Optional[Dict[str, Any]]:
+    """
+    Loads player and NPC ids, personality profile, emotional state and the
+    active conversation in a single round trip, creating any missing rows.
+
+    Returns None when the SQL function is disabled, missing or fails, so the
+    caller can fall back to the per-entity service calls.
+    """
+    global _function_available
+    if not settings.relationship_context_sql_enabled or not _function_available:
+        return None
+
+    # Same activity rule as find_active_conversation and the session store
+    cutoff_time = activity_cutoff()
+    loaded_version = prompt_templates.current_version()
+    default_profile = personality_service.default_profile_for_npc(npc_name)
+
+    try:
+        rows = await db.query_raw(
+            """SELECT * FROM relationship_context($1, $2, $3, $4::timestamp, $5::jsonb, $6::jsonb)""",
+            player_name,
+            npc_name,
+            npc_location,
+            cutoff_time.replace(tzinfo=None).isoformat(),
+            json.dumps(default_profile),
+            json.dumps(context),
+        )
+    except Exception as e:
+        if "does not exist" in str(e):
+            _function_available = False
+            logger.warning(
+                "relationship_context SQL function not found, using per-entity queries"
+            )
+        else:
+            logger.error(f"Error in get_relationship_context: {e}")
+        return None
+
+    if not rows:
+        return None
+    return await _relationship_from_row(
+        rows[0], player_name, npc_name, context, loaded_version
+    )
+
+
+async def get_relationship_contexts(
+    player_name: str,
+    npcs: List[Tuple[str, Optional[str], Dict[str, Any]]],
+) -> Dict[str, Dict[str, Any]]:
+    """
+    `get_relationship_context` for several NPCs in one round trip, by
+    running the SQL function once per (npc_name, npc_location, context)
+    inside a single statement.
+
+    Returns the rows keyed by NPC name; empty when the SQL function is
+    disabled, missing or fails.
+    """
+    global _function_available
+    if not npcs or not settings.relationship_context_sql_enabled or not _function_available:
+        return {}
+
+    # Same activity rule as find_active_conversation and the session store
+    cutoff_time = activity_cutoff()
+    loaded_version = prompt_templates.current_version()
+    targets = [
+        {
+            "npc_name": npc_name,
+            "npc_location": npc_location,
+            "default_profile": personality_service.default_profile_for_npc(npc_name),
+            "context": context,
+        }
+        for npc_name, npc_location, context in npcs
+    ]
+
+    try:
+        rows = await db.query_raw(
+            """SELECT t.npc_name, r.*
+               FROM jsonb_to_recordset($2::jsonb)
+                    AS t(npc_name TEXT, npc_location TEXT, default_profile JSONB, context JSONB)
+               CROSS JOIN LATERAL relationship_context(
+                   $1, t.npc_name, t.npc_location, $3::timestamp, t.default_profile, t.context
+               ) AS r""",
+            player_name,
+            json.dumps(targets),
+            cutoff_time.replace(tzinfo=None).isoformat(),
+        )
+    except Exception as e:
+        if "does not exist" in str(e):
+            _function_available = False
+            logger.warning(
+                "relationship_context SQL function not found, using per-entity queries"
+            )
+        else:
+            logger.error(f"Error in get_relationship_contexts: {e}")
+        return {}
+
+    contexts = {npc_name: context for npc_name, _, context in npcs}
+    return {
+        row["npc_name"]: await _relationship_from_row(
+            row,
+            player_name,
+            row["npc_name"],
+            contexts[row["npc_name"]],
+            loaded_version,
+        )
+        for row in rows
+    }
+
+
+async def _relationship_from_row(
+    row: Dict[str, Any],
+    player_name: str,
+    npc_name: str,
+    context: Dict[str, Any],
+    loaded_version: int,
+) -> Dict[str, Any]:
+    player_id = row["player_id"]
+    npc_id = row["npc_id"]
+    profile_row = _as_dict(row["profile"])
+    state_row = _as_dict(row["emotional_state"])
+
+    if row["conversation_created"]:
+        logger.info(f"Created new conversation: {row['conversation_id']}")
+        await _notify_new_conversation(row, player_name, npc_name, context)
+
+    return {
+        "player_id": player_id,
+        "npc_id": npc_id,
+        "personality_profile": personality_service.profile_from_row(profile_row),
+        "emotional_state": emotional_state_service.emotional_state_from_row(
+            npc_id, player_id, state_row
+        ),
+        "conversation_id": row["conversation_id"],
+        # Read before the query; see PromptTemplateCache.fragment
+        "templates_version": loaded_version,
+    }
+
+
+def _as_dict(value: Any) -> Dict[str, Any]:
+    """JSON columns from raw queries may come back parsed or as text."""
+    if isinstance(value, str):
+        return json.loads(value)
+    return value or {}
+
+
+async def _notify_new_conversation(
+    row: Dict[str, Any], player_name: str, npc_name: str, context: Dict[str, Any]
+):
+    if not REALTIME_AVAILABLE:
+        return
+    try:
+        start_time = row["conversation_start"]
+        await realtime_monitor.notify_new_conversation(
+            {
+                "conversation_id": row["conversation_id"],
+                "player_name": player_name,
+                "npc_name": npc_name,
+                "location": context.get("player_location"),
+                "season": context.get("season"),
+                "friendship_hearts": context.get("friendship_hearts", 0),
+                "start_time": start_time
+                if isinstance(start_time, str)
+                else start_time.isoformat(),
+            }
+        )
+    except Exception as e:
+        logger.error(f"Error sending new conversation notification: {e}")
@@ -95,9 +95,11 @@ class VectorService:
         emotional_weight: float = 0.4,
         importance_weight: float = 0.3,
         max_memories: Optional[int] = None,
+        query_embedding: Optional[List[float]] = None,
     ) -> List[Dict[str, Any]]:
         """
         Enhanced memory search that mimics human memory recall.
+        `query_embedding` may be passed if the query text was already embedded.
 
         Considers:
         - Semantic similarity (via embeddings)
@@ -115,7 +117,8 @@ class VectorService:
 
         try:
             # Generate embedding for the query
-            query_embedding = await self.generate_embedding(query_text)
+            if query_embedding is None:
+                query_embedding = await self.generate_embedding(query_text)
 
             if not query_embedding:
                 # Fallback to simple text search if embeddings fail
@@ -1,6 +1,6 @@
 # flake8: noqa
 import logging
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 
 # Este archivo ahora actúa como una fachada (Facade) para los sub-servicios,
 # manteniendo la compatibilidad con los routers que lo utilizan.
@@ -9,10 +9,21 @@ from app.services.memory.entity_service import get_or_create_player, get_or_crea
 from app.services.memory.personality_service import personality_service
 from app.services.memory.conversation_service import (
     get_or_create_active_conversation,
+    find_active_conversation,
     add_dialogue_entry,
+    add_dialogue_entries,
+    get_recent_dialogue,
     end_conversation,
 )
 from app.services.memory.vector_service import vector_service
+from app.services.memory.relationship_context_service import (
+    get_relationship_context,
+    get_relationship_contexts,
+)
+from app.services.memory.emotional_state_service import emotional_state_service
+from app.services.request_context import RequestContext
+from app.services.session_store import session_store
+from app.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -21,30 +32,147 @@ class MemoryService:
     """
     Servicio de orquestación para la memoria y personalidad de los NPCs.
     Delega las llamadas a los servicios modulares correspondientes.
+
+    Las lecturas aceptan un `RequestContext` opcional que las memoriza
+    durante una petición, para no repetir la misma consulta en un turno.
     """
 
-    async def get_or_create_player(self, player_name: str) -> str:
+    async def _memoized(self, ctx: Optional[RequestContext], key, loader):
+        if ctx is None:
+            return await loader()
+        return await ctx.get_or_load(key, loader)
+
+    async def get_or_create_player(
+        self, player_name: str, ctx: Optional[RequestContext] = None
+    ) -> str:
         """Delega a entity_service."""
-        return await get_or_create_player(player_name)
+        return await self._memoized(
+            ctx, ("player", player_name), lambda: get_or_create_player(player_name)
+        )
 
     async def get_or_create_npc(
-        self, npc_name: str, npc_location: Optional[str] = None
+        self,
+        npc_name: str,
+        npc_location: Optional[str] = None,
+        ctx: Optional[RequestContext] = None,
     ) -> str:
         """Delega a entity_service."""
-        return await get_or_create_npc(npc_name, npc_location)
+        return await self._memoized(
+            ctx,
+            ("npc", npc_name),
+            lambda: get_or_create_npc(npc_name, npc_location),
+        )
+
+    async def get_relationship_context(
+        self,
+        player_name: str,
+        npc_name: str,
+        npc_location: Optional[str],
+        context: Dict[str, Any],
+        ctx: Optional[RequestContext] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Devuelve la sesión activa de la pareja si existe (sin consultas); si no,
+        delega a relationship_context_service (una sola consulta SQL). Con un
+        `ctx`, la fila precarga las lecturas individuales que contiene.
+        """
+
+        async def load():
+            session = (
+                session_store.get(player_name, npc_name)
+                if settings.session_store_enabled
+                else None
+            )
+            if session is not None:
+                return session.as_relationship_row()
+            return await get_relationship_context(
+                player_name, npc_name, npc_location, context
+            )
+
+        row = await self._memoized(ctx, ("relationship_row", player_name, npc_name), load)
+        if row and ctx is not None:
+            self.prime_relationship_context(ctx, player_name, npc_name, row)
+        return row
+
+    async def get_relationship_contexts(
+        self,
+        player_name: str,
+        npcs: List[Tuple[str, Optional[str], Dict[str, Any]]],
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        `get_relationship_context` para varios NPCs, con tuplas (npc_name,
+        npc_location, context): las parejas con sesión activa salen de ella y
+        el resto de una sola consulta SQL. Devuelve las filas por nombre de
+        NPC; los que falten usan las consultas individuales.
+        """
+        rows: Dict[str, Dict[str, Any]] = {}
+        missing = []
+        for npc_name, npc_location, context in npcs:
+            session = (
+                session_store.get(player_name, npc_name)
+                if settings.session_store_enabled
+                else None
+            )
+            if session is not None:
+                rows[npc_name] = session.as_relationship_row()
+            else:
+                missing.append((npc_name, npc_location, context))
+        rows.update(await get_relationship_contexts(player_name, missing))
+        return rows
+
+    def prime_relationship_context(
+        self,
+        ctx: RequestContext,
+        player_name: str,
+        npc_name: str,
+        row: Dict[str, Any],
+    ):
+        """Precarga en `ctx` la fila de la pareja y las lecturas que contiene."""
+        player_id, npc_id = row["player_id"], row["npc_id"]
+        ctx.put(("relationship_row", player_name, npc_name), row)
+        ctx.put(("player", player_name), player_id)
+        ctx.put(("npc", npc_name), npc_id)
+        ctx.put(("personality_profile", player_id, npc_id), row["personality_profile"])
+        ctx.put(("emotional_state", npc_id, player_id), row["emotional_state"])
 
     async def get_personality_profile(
-        self, player_id: str, npc_id: str
+        self, player_id: str, npc_id: str, ctx: Optional[RequestContext] = None
     ) -> Dict[str, Any]:
         """Delega a personality_service."""
-        return await personality_service.get_personality_profile(player_id, npc_id)
+        return await self._memoized(
+            ctx,
+            ("personality_profile", player_id, npc_id),
+            lambda: personality_service.get_personality_profile(player_id, npc_id),
+        )
+
+    async def get_emotional_state(
+        self, npc_id: str, player_id: str, ctx: Optional[RequestContext] = None
+    ) -> Dict[str, Any]:
+        """Delega a emotional_state_service."""
+        return await self._memoized(
+            ctx,
+            ("emotional_state", npc_id, player_id),
+            lambda: emotional_state_service.get_emotional_state(npc_id, player_id),
+        )
+
+    async def embed_text(
+        self, text: str, ctx: Optional[RequestContext] = None
+    ) -> List[float]:
+        """Delega a vector_service. Vacío si no se pudo generar el embedding."""
+        return await self._memoized(
+            ctx, ("embedding", text), lambda: vector_service.generate_embedding(text)
+        )
 
     async def search_relevant_memories(
-        self, player_id: str, npc_id: str, query_text: str
+        self,
+        player_id: str,
+        npc_id: str,
+        query_text: str,
+        query_embedding: Optional[List[float]] = None,
     ) -> List[Dict[str, Any]]:
         """Delega a vector_service."""
         return await vector_service.search_relevant_memories(
-            player_id, npc_id, query_text
+            player_id, npc_id, query_text, query_embedding=query_embedding
         )
 
     async def get_or_create_active_conversation(
@@ -53,6 +181,10 @@ class MemoryService:
         """Delega a conversation_service."""
         return await get_or_create_active_conversation(player_id, npc_id, context)
 
+    async def find_active_conversation(self, player_id: str, npc_id: str) -> Optional[str]:
+        """Delega a conversation_service."""
+        return await find_active_conversation(player_id, npc_id)
+
     async def add_dialogue_entry(
         self,
         conversation_id: str,
@@ -63,6 +195,21 @@ class MemoryService:
         """Delega a conversation_service."""
         await add_dialogue_entry(conversation_id, speaker, message, generate_embedding)
 
+    async def add_dialogue_entries(
+        self,
+        conversation_id: str,
+        lines: List[Tuple[str, str]],
+        generate_embedding: bool = True,
+    ):
+        """Delega a conversation_service."""
+        await add_dialogue_entries(conversation_id, lines, generate_embedding)
+
+    async def get_recent_dialogue(
+        self, conversation_id: str, limit: int
+    ) -> List[Dict[str, str]]:
+        """Delega a conversation_service."""
+        return await get_recent_dialogue(conversation_id, limit)
+
     async def end_conversation(self, conversation_id: str):
         """Delega a conversation_service."""
         await end_conversation(conversation_id)
@@ -78,10 +225,19 @@ class MemoryService:
         npc_name: str,
         npc_id: str = None,
         player_id: str = None,
+        ctx: Optional[RequestContext] = None,
     ) -> str:
         """Delega a personality_service con información del estado emocional."""
+        emotional_state = None
+        if ctx is not None and npc_id:
+            emotional_state = await self.get_emotional_state(npc_id, player_id, ctx)
         return await personality_service.generate_relationship_insight(
-            personality_profile, player_name, npc_name, npc_id, player_id
+            personality_profile,
+            player_name,
+            npc_name,
+            npc_id,
+            player_id,
+            emotional_state=emotional_state,
         )
 
 
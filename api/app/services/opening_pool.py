@@ -0,0 +1,262 @@
+import asyncio
+import copy
+import itertools
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Any, List, Optional, Set, Tuple, Callable, Awaitable
+
+from app.config import settings
+from app.models.request import DialogueRequest
+
+logger = logging.getLogger(__name__)
+
+# Player name the pooled lines are written for; replaced with the real name
+# when a line is served
+PLAYER_PLACEHOLDER = "[PLAYER]"
+
+# Moods grouped by how an opening line would sound, and the mood each
+# bucket's lines are generated with
+MOOD_BUCKETS = {
+    "VERY_HAPPY": "upbeat",
+    "HAPPY": "upbeat",
+    "EXCITED": "upbeat",
+    "ROMANTIC": "upbeat",
+    "CONTENT": "calm",
+    "NEUTRAL": "calm",
+    "NOSTALGIC": "calm",
+    "WORRIED": "low",
+    "SAD": "low",
+    "STRESSED": "low",
+    "ANGRY": "irritated",
+}
+BUCKET_MOODS = {"upbeat": "HAPPY", "calm": "NEUTRAL", "low": "SAD", "irritated": "ANGRY"}
+
+# (lowest hearts, band, hearts the band's lines are generated with)
+FRIENDSHIP_BANDS = [
+    (8, "close", 9),
+    (5, "friend", 6),
+    (2, "acquaintance", 3),
+    (0, "stranger", 1),
+]
+
+PoolKey = Tuple[str, str, str, str, str, str]
+# Writes one opening line and its options for a template turn and emotional
+# state; None when it should not generate right now (e.g. under load)
+OpeningGenerator = Callable[
+    [DialogueRequest, Dict[str, Any]], Awaitable[Optional[Tuple[str, List[str]]]]
+]
+
+
+def friendship_band(hearts: int) -> str:
+    for lowest, band, _ in FRIENDSHIP_BANDS:
+        if hearts >= lowest:
+            return band
+    return "stranger"
+
+
+def mood_bucket(emotional_state: Optional[Dict[str, Any]]) -> str:
+    mood = (emotional_state or {}).get("current_mood", "NEUTRAL")
+    return MOOD_BUCKETS.get(mood, "calm")
+
+
+def pool_key(
+    request: DialogueRequest, emotional_state: Optional[Dict[str, Any]]
+) -> PoolKey:
+    """NPC, season, weather, friendship band, mood bucket and language."""
+    return (
+        request.npc_name,
+        request.season,
+        request.weather,
+        friendship_band(request.friendship_hearts),
+        mood_bucket(emotional_state),
+        request.language,
+    )
+
+
+class PooledOpening:
+    """An opening line and its options, written for PLAYER_PLACEHOLDER."""
+
+    _ids = itertools.count()
+
+    def __init__(self, npc_message: str, response_options: List[str]):
+        self.id = next(self._ids)
+        self.npc_message = npc_message
+        self.response_options = response_options
+        self.created_at = time.monotonic()
+        self.uses = 0
+
+    def for_player(self, player_name: str) -> "PooledOpening":
+        """A copy with the placeholder replaced by the player's name."""
+        opening = copy.copy(self)
+        opening.npc_message = self.npc_message.replace(PLAYER_PLACEHOLDER, player_name)
+        opening.response_options = [
+            option.replace(PLAYER_PLACEHOLDER, player_name)
+            for option in self.response_options
+        ]
+        return opening
+
+    def is_expired(self, now: float) -> bool:
+        return now - self.created_at > settings.opening_pool_max_age_seconds
+
+
+class OpeningPool:
+    """
+    Pre-generated opening lines per NPC, season, weather, friendship band,
+    mood bucket and language, for first turns.
+
+    Lines are shared between players: each is served at most
+    `opening_pool_max_uses` times and never twice to the same player within
+    their last `opening_pool_no_repeat_window` openings, and is dropped after
+    `opening_pool_max_age_seconds`. A bucket is refilled in the background up
+    to `opening_pool_target_size` each time it is asked for, so its lines
+    are ready for the next first turns; the bucket's template turn (with the
+    player name replaced by PLAYER_PLACEHOLDER and hearts/mood set to the
+    band's and bucket's representative values) is handed to the generator
+    passed to `start`.
+    """
+
+    def __init__(self):
+        self._buckets: "OrderedDict[PoolKey, deque]" = OrderedDict()
+        self._recent: "OrderedDict[str, deque]" = OrderedDict()
+        self._refilling: Set[PoolKey] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._generate: Optional[OpeningGenerator] = None
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.failed = 0
+
+    def start(self, generate: OpeningGenerator):
+        """Sets the line generator; refills only run once it is set."""
+        self._generate = generate
+
+    async def stop(self):
+        """Cancels refills in flight. Called from the app lifespan."""
+        self._generate = None
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def take(
+        self, request: DialogueRequest, emotional_state: Optional[Dict[str, Any]]
+    ) -> Optional[PooledOpening]:
+        """
+        A line for this first turn with the player's name filled in, or None.
+        Either way the bucket is topped up in the background.
+        """
+        if not settings.opening_pool_enabled:
+            return None
+
+        key = pool_key(request, emotional_state)
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = deque()
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > settings.opening_pool_max_buckets:
+            self._buckets.popitem(last=False)
+
+        recent = self._recent.get(request.player_name)
+        if recent is None:
+            recent = self._recent[request.player_name] = deque(
+                maxlen=settings.opening_pool_no_repeat_window
+            )
+        self._recent.move_to_end(request.player_name)
+        while len(self._recent) > settings.opening_pool_max_players:
+            self._recent.popitem(last=False)
+
+        opening = None
+        for candidate in list(bucket):
+            if candidate.is_expired(now):
+                bucket.remove(candidate)
+            elif opening is None and candidate.id not in recent:
+                opening = candidate
+
+        if opening is not None:
+            opening.uses += 1
+            if opening.uses >= settings.opening_pool_max_uses:
+                bucket.remove(opening)
+            recent.append(opening.id)
+            self.hits += 1
+        else:
+            self.misses += 1
+
+        self._refill(key, request)
+        logger.debug(
+            f"Opening pool {'hit' if opening else 'miss'} for {key} "
+            f"(hit rate {self.hits / (self.hits + self.misses):.0%})"
+        )
+        return opening.for_player(request.player_name) if opening else None
+
+    def _refill(self, key: PoolKey, request: DialogueRequest):
+        if self._generate is None or key in self._refilling:
+            return
+        missing = settings.opening_pool_target_size - len(self._buckets[key])
+        if missing <= 0:
+            return
+
+        _, _, _, band, bucket_name, _ = key
+        hearts = next(h for _, name, h in FRIENDSHIP_BANDS if name == band)
+        template = request.model_copy(
+            update={"player_name": PLAYER_PLACEHOLDER, "friendship_hearts": hearts}
+        )
+        emotional_state = {
+            "current_mood": BUCKET_MOODS[bucket_name],
+            "mood_intensity": 6.0,
+            "recent_joy": 0.0,
+            "recent_sadness": 0.0,
+            "recent_anger": 0.0,
+            "recent_excitement": 0.0,
+            "last_interaction_effect": "",
+        }
+
+        self._refilling.add(key)
+        task = asyncio.create_task(self._fill(key, template, emotional_state, missing))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _fill(
+        self,
+        key: PoolKey,
+        template: DialogueRequest,
+        emotional_state: Dict[str, Any],
+        count: int,
+    ):
+        try:
+            for _ in range(count):
+                generate = self._generate
+                if generate is None:
+                    return
+                try:
+                    line = await generate(template, emotional_state)
+                except Exception as e:
+                    self.failed += 1
+                    logger.warning(f"Could not refill opening pool {key}: {e}")
+                    return
+                if line is None:
+                    return
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    return  # Bucket evicted while generating
+                bucket.append(PooledOpening(*line))
+                self.generated += 1
+        finally:
+            self._refilling.discard(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": settings.opening_pool_enabled,
+            "buckets": len(self._buckets),
+            "lines": sum(len(bucket) for bucket in self._buckets.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "generated": self.generated,
+            "failed": self.failed,
+            "refilling": len(self._refilling),
+        }
+
+
+opening_pool = OpeningPool()
@@ -0,0 +1,153 @@
+import logging
+from typing import List, Dict, Any, Tuple
+
+from app.config import settings
+from app.services.llm_service import llm_service
+
+logger = logging.getLogger(__name__)
+
+
+class ContextBuilder:
+    """
+    Keeps the variable parts of the dialogue prompt inside per-section token
+    budgets.
+
+    - history: the newest turns are kept verbatim; older turns are collapsed
+      into a one-line recap.
+    - memories: the lowest-relevance memories are dropped first.
+    - personality: metric bullet lines are dropped from the end; the summary
+      and the closing instruction are kept.
+
+    Tokens are counted with the tokenizer of the configured model (see
+    `LLMService.count_tokens`), and `report` gives the final count for the
+    whole prompt.
+    """
+
+    def __init__(self, model: str, budget_scale: float = 1.0):
+        self.model = model
+        self.budgets = {
+            "history": int(settings.prompt_budget_history_tokens * budget_scale),
+            "memories": int(settings.prompt_budget_memories_tokens * budget_scale),
+            "personality": int(
+                settings.prompt_budget_personality_tokens * budget_scale
+            ),
+        }
+        self.section_tokens: Dict[str, int] = {}
+        self.dropped: Dict[str, int] = {}
+
+    def count_tokens(self, text: str) -> int:
+        return llm_service.count_tokens(self.model, text)
+
+    def fit_personality(self, text: str) -> str:
+        """Drops metric bullets of the personality block, last first, until it fits."""
+        budget = self.budgets["personality"]
+        lines = text.split("\n")
+        dropped = 0
+        while self.count_tokens("\n".join(lines)) > budget:
+            bullets = [i for i, line in enumerate(lines) if line.startswith("- ")]
+            if not bullets:
+                break
+            del lines[bullets[-1]]
+            dropped += 1
+
+        fitted = "\n".join(lines)
+        self.section_tokens["personality"] = self.count_tokens(fitted)
+        self.dropped["personality_lines"] = dropped
+        return fitted
+
+    def fit_memories(self, memories: List[Tuple[float, str]], header: str) -> str:
+        """
+        Keeps the most relevant memory lines that fit the budget, in their
+        original order.
+
+        Args:
+            memories: (relevance_score, rendered_line) pairs.
+            header: Heading written above the memory lines.
+        """
+        if not memories:
+            self.section_tokens["memories"] = 0
+            return ""
+
+        budget = self.budgets["memories"] - self.count_tokens(header)
+        ranked = sorted(range(len(memories)), key=lambda i: memories[i][0], reverse=True)
+        kept = set()
+        used = 0
+        for index in ranked:
+            cost = self.count_tokens(memories[index][1])
+            if used + cost <= budget:
+                kept.add(index)
+                used += cost
+
+        self.dropped["memories"] = len(memories) - len(kept)
+        if not kept:
+            self.section_tokens["memories"] = 0
+            return ""
+
+        fitted = header + "".join(
+            memories[i][1] + "\n" for i in range(len(memories)) if i in kept
+        )
+        self.section_tokens["memories"] = self.count_tokens(fitted)
+        return fitted
+
+    def fit_history(self, turns: List[Tuple[str, str]], header: str) -> str:
+        """
+        Keeps the newest turns verbatim and summarizes the rest.
+
+        Args:
+            turns: (speaker_label, message) pairs, oldest first. The last turn
+                is always kept.
+            header: Heading written above the transcript.
+        """
+        if not turns:
+            self.section_tokens["history"] = 0
+            return ""
+
+        budget = self.budgets["history"] - self.count_tokens(header)
+        kept: List[str] = []
+        used = 0
+        cutoff = len(turns)
+        for index in range(len(turns) - 1, -1, -1):
+            line = f"{turns[index][0]}: {turns[index][1]}\n"
+            cost = self.count_tokens(line)
+            if kept and used + cost > budget:
+                break
+            kept.insert(0, line)
+            used += cost
+            cutoff = index
+
+        recap = self._recap(turns[:cutoff], budget - used)
+        self.dropped["history_turns"] = cutoff
+
+        fitted = header + recap + "".join(kept)
+        self.section_tokens["history"] = self.count_tokens(fitted)
+        return fitted
+
+    def _recap(self, older: List[Tuple[str, str]], budget: int) -> str:
+        """One-line recap of older turns: each turn's opening words."""
+        if not older:
+            return ""
+
+        snippets = []
+        recap = ""
+        for speaker, message in older:
+            words = message.split()
+            snippet = f"{speaker}: {' '.join(words[:6])}{'...' if len(words) > 6 else ''}"
+            candidate = (
+                f"(Earlier, {len(older)} lines: " + " | ".join(snippets + [snippet]) + ")\n"
+            )
+            if self.count_tokens(candidate) > budget:
+                break
+            snippets.append(snippet)
+            recap = candidate
+
+        return recap or f"(Earlier, {len(older)} lines omitted)\n"
+
+    def report(self, prompt: str) -> Dict[str, Any]:
+        """Final token count of the assembled prompt, with per-section detail."""
+        return {
+            "model": self.model,
+            "prompt_tokens": self.count_tokens(prompt),
+            "sections": dict(self.section_tokens),
+            "budgets": dict(self.budgets),
+            "dropped": dict(self.dropped),
+        }
@@ -0,0 +1,267 @@
+import logging
+from collections import OrderedDict
+from string import Formatter
+from typing import Dict, Any, List, Tuple, Callable, Hashable, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PromptTemplate:
+    """
+    A `str.format`-style template parsed once into literal segments and
+    fields, so rendering is a single join instead of re-parsing the string.
+
+    `bind` substitutes some fields ahead of time (e.g. the NPC name and the
+    language instruction) and merges the resulting literal runs, so per-request
+    rendering only touches the fields that actually change.
+    """
+
+    def __init__(self, template: str):
+        self._segments: List[Tuple[str, Optional[str], str]] = []
+        for literal, field, spec, conversion in Formatter().parse(template):
+            if conversion:
+                raise ValueError(f"Conversions are not supported in prompt templates: {field}")
+            self._segments.append((literal, field, spec or ""))
+        self.fields = {field for _, field, _ in self._segments if field is not None}
+
+    @classmethod
+    def _from_segments(cls, segments: List[Tuple[str, Optional[str], str]]):
+        template = cls.__new__(cls)
+        template._segments = segments
+        template.fields = {field for _, field, _ in segments if field is not None}
+        return template
+
+    def bind(self, **values: Any) -> "PromptTemplate":
+        """Returns a template with `values` rendered into its literal text."""
+        segments: List[Tuple[str, Optional[str], str]] = []
+        pending = ""
+        for literal, field, spec in self._segments:
+            pending += literal
+            if field is None:
+                continue
+            if field in values:
+                pending += format(values[field], spec)
+            else:
+                segments.append((pending, field, spec))
+                pending = ""
+        if pending:
+            segments.append((pending, None, ""))
+        return PromptTemplate._from_segments(segments)
+
+    def render(self, **values: Any) -> str:
+        parts = []
+        for literal, field, spec in self._segments:
+            parts.append(literal)
+            if field is not None:
+                parts.append(format(values[field], spec))
+        return "".join(parts)
+
+
+PERSONALITY_TEMPLATE = PromptTemplate(
+    """
+**Your current perception of {player_name}:**
+{summary}
+
+**Basic Personality Metrics:**
+- Friendliness: {friendliness:.1f}/10
+- Extroversion: {extroversion:.1f}/10
+- Sincerity: {sincerity:.1f}/10
+- Curiosity: {curiosity:.1f}/10
+
+**Emotional Relationship Metrics:**
+- Trust: {trust:.1f}/10 (How much you trust them)
+- Respect: {respect:.1f}/10 (How much you respect them)
+- Affection: {affection:.1f}/10 (How much you care about them)
+- Annoyance: {annoyance:.1f}/10 (How much they irritate you)
+- Admiration: {admiration:.1f}/10 (How much you admire them)
+- Romantic Interest: {romantic_interest:.1f}/10 (Any romantic feelings)
+- Humor Compatibility: {humor_compatibility:.1f}/10 (How funny you find them)
+
+IMPORTANT: Adjust your tone, dialogue, and responses based on these metrics. High affection = warmer, low trust = more guarded, high annoyance = more irritated or short responses, high romantic interest = flirtier (if appropriate for the character), etc."""
+)
+
+DIALOGUE_TEMPLATE = PromptTemplate(
+    """You are {npc_name}, a character from Stardew Valley. Generate a dialogue response and conversation options based on the following context.
+
+IMPORTANT INSTRUCTIONS:
+- Do NOT use markdown formatting or special characters like *, **, [], etc.
+- Do NOT use placeholder text like [Player Name] - use the actual player name: {player_name}
+- Write everything in plain text
+- Be natural and conversational
+- Stay in character as {npc_name}
+- {language_instruction}
+- VERY IMPORTANT: The NPC message and each player response option must be no longer than 30 words. Keep them concise and short so they fit on the game screen but sometimes some can be longer, depends of the context.
+
+**YOUR CURRENT EMOTIONAL STATE:**
+{emotional_context}
+
+{personality_context}
+{relevant_memories}
+
+**Current Context:**
+Player: {player_name}
+NPC: {npc_name}
+Friendship Hearts: {friendship_hearts}
+Season: {season}
+Day: {day_of_week}, {day_of_month}
+Time: {time_of_day}
+Weather: {weather}
+Location: {player_location}
+{conversation_context}
+{gift_context}
+
+Generate a response as {npc_name} that:
+1. Responds naturally to the conversation{gift_focus}
+2. Reflects {npc_name}'s personality and role in Stardew Valley
+3. Considers the friendship level and your perception of {player_name}
+4. References relevant memories if appropriate and meaningful
+5. Shows your current emotional state through tone and word choice
+6. Is suitable for in-game dialogue{gift_reaction_instruction}
+
+Then provide exactly 3 response options for the player with these specific tones:
+OPTION_1: A FRIENDLY/CORDIAL response - Be warm, kind, humorous, and cheerful. Show genuine interest and positivity.
+OPTION_2: A NEUTRAL/INFORMATIVE response - Be polite but direct, focused on getting important information or business matters. Professional and to-the-point.
+OPTION_3: A PROVOCATIVE/TEASING response - Be playfully mocking, sarcastic, or slightly rude. This should annoy or challenge the NPC (but not be truly offensive).
+
+Each option should lead the conversation in a different emotional direction and potentially affect the NPC's reaction based on their personality.
+
+Format your response exactly like this:
+NPC_MESSAGE: [Your response as {npc_name}]
+OPTION_1: [Friendly/cordial player response]
+OPTION_2: [Neutral/informative player response]
+OPTION_3: [Provocative/teasing player response]"""
+)
+
+LANGUAGE_INSTRUCTIONS = {
+    "es": "Respond in Spanish.",
+    "en": "Respond in English.",
+}
+
+
+def language_instruction(language: str) -> str:
+    return LANGUAGE_INSTRUCTIONS.get(language, f"Respond in {language}.")
+
+
+class PromptTemplateCache:
+    """
+    Compiled dialogue templates per (NPC, language) and rendered prompt
+    fragments per player/NPC relationship.
+
+    Fragments (personality perception, mood) are cached with the version of
+    the relationship they were rendered from. `AnalysisService` calls
+    `invalidate` after it updates a profile or emotional state, which moves
+    the version past every version handed out so far, so the next turn
+    renders them again. Both caches are bounded LRUs.
+
+    Only the last `prompt_version_max_relationships` invalidated
+    relationships keep a version of their own; the rest share a floor that
+    is raised past any version dropped, which at worst re-renders a fragment.
+    """
+
+    def __init__(self):
+        self._templates: "OrderedDict[Tuple[str, str], PromptTemplate]" = OrderedDict()
+        self._fragments: "OrderedDict[Hashable, Tuple[int, str]]" = OrderedDict()
+        self._versions: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+        self._clock = 0
+        self._floor = 0
+        self.template_hits = 0
+        self.template_misses = 0
+        self.fragment_hits = 0
+        self.fragment_misses = 0
+        self.invalidations = 0
+        self.stale_renders = 0
+
+    def dialogue_template(self, npc_name: str, language: str) -> PromptTemplate:
+        """The dialogue template with the NPC name and language instruction bound."""
+        key = (npc_name, language)
+        template = self._templates.get(key)
+        if template is not None:
+            self.template_hits += 1
+            self._templates.move_to_end(key)
+            return template
+
+        self.template_misses += 1
+        template = DIALOGUE_TEMPLATE.bind(
+            npc_name=npc_name, language_instruction=language_instruction(language)
+        )
+        self._templates[key] = template
+        if len(self._templates) > settings.prompt_template_cache_size:
+            self._templates.popitem(last=False)
+        return template
+
+    def fragment(
+        self,
+        kind: str,
+        player_id: str,
+        npc_id: str,
+        render: Callable[[], str],
+        loaded_version: int,
+    ) -> str:
+        """
+        Returns the `kind` fragment for a relationship, calling `render` only
+        when it is not cached for the relationship's current version.
+
+        `loaded_version` is `current_version()` (or the relationship's
+        `version`) read before the profile or state `render` uses was loaded.
+        If the relationship was invalidated since, the text is returned but
+        not cached, since it was rendered from data that is already stale.
+        """
+        if not settings.prompt_fragment_cache_enabled:
+            return render()
+
+        key = (kind, player_id, npc_id)
+        version = self.version(player_id, npc_id)
+        cached = self._fragments.get(key)
+        if cached is not None and cached[0] == version:
+            self.fragment_hits += 1
+            self._fragments.move_to_end(key)
+            return cached[1]
+
+        self.fragment_misses += 1
+        text = render()
+        if version > loaded_version:
+            self.stale_renders += 1
+            return text
+        self._fragments[key] = (version, text)
+        self._fragments.move_to_end(key)
+        if len(self._fragments) > settings.prompt_fragment_cache_size:
+            self._fragments.popitem(last=False)
+        return text
+
+    def version(self, player_id: str, npc_id: str) -> int:
+        """Raised each time the relationship's profile or state changes."""
+        return self._versions.get((player_id, npc_id), self._floor)
+
+    def current_version(self) -> int:
+        """Not below any relationship's version; read it before loading."""
+        return self._clock
+
+    def invalidate(self, player_id: str, npc_id: str):
+        """Marks every fragment of a relationship as stale."""
+        relationship = (player_id, npc_id)
+        self._clock += 1
+        self._versions[relationship] = self._clock
+        self._versions.move_to_end(relationship)
+        self.invalidations += 1
+        while len(self._versions) > settings.prompt_version_max_relationships:
+            _, dropped = self._versions.popitem(last=False)
+            self._floor = max(self._floor, dropped)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "fragment_cache_enabled": settings.prompt_fragment_cache_enabled,
+            "templates": len(self._templates),
+            "template_hits": self.template_hits,
+            "template_misses": self.template_misses,
+            "fragments": len(self._fragments),
+            "fragment_hits": self.fragment_hits,
+            "fragment_misses": self.fragment_misses,
+            "invalidations": self.invalidations,
+            "stale_renders": self.stale_renders,
+            "versioned_relationships": len(self._versions),
+        }
+
+
+prompt_templates = PromptTemplateCache()
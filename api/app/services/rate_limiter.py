@@ -0,0 +1,105 @@
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Tuple
+
+from app.config import settings
+from app.services.llm_scheduler import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+class _PlayerCounters:
+    """Allowed and rejected requests for one player, per endpoint kind."""
+
+    def __init__(self):
+        self.allowed: Dict[str, int] = {}
+        self.rejected: Dict[str, int] = {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"allowed": dict(self.allowed), "rejected": dict(self.rejected)}
+
+
+class PlayerRateLimiter:
+    """
+    Token buckets per (player, kind), so one client flooding the API cannot
+    starve everyone else of LLM capacity.
+
+    Kinds are "dialogue", "gift" (dialogue turns carrying a gift and gift
+    checks), "end_conversation", "greeting_batch" and "prepare_day"; each has
+    its own rate and burst in `player_rate_limits` / `player_rate_limit_burst`.
+    A kind without a rate, or a rate of 0, is unlimited. The least recently
+    seen players are dropped beyond `player_rate_limit_max_players`.
+    """
+
+    def __init__(self):
+        self._buckets: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
+        self._counters: "OrderedDict[str, _PlayerCounters]" = OrderedDict()
+        self.rejected = 0
+
+    def check(self, player_name: str, kind: str) -> float:
+        """
+        Takes one request from the player's bucket for `kind`.
+
+        Returns:
+            0.0 if the request is allowed, otherwise the seconds until it
+            would be.
+        """
+        if not settings.player_rate_limit_enabled:
+            return 0.0
+        rate = settings.player_rate_limits.get(kind, 0.0)
+        if rate <= 0:
+            return 0.0
+
+        key = (player_name, kind)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            burst = settings.player_rate_limit_burst.get(kind, 1.0)
+            bucket = TokenBucket(rate, max(burst, 1.0))
+            self._buckets[key] = bucket
+        self._buckets.move_to_end(key)
+
+        counters = self._counters.get(player_name)
+        if counters is None:
+            counters = self._counters[player_name] = _PlayerCounters()
+        self._counters.move_to_end(player_name)
+
+        retry_after = bucket.try_acquire()
+        if retry_after > 0:
+            counters.rejected[kind] = counters.rejected.get(kind, 0) + 1
+            self.rejected += 1
+            logger.warning(
+                f"Rate limited {kind} request from {player_name} (retry in {retry_after:.1f}s)"
+            )
+        else:
+            counters.allowed[kind] = counters.allowed.get(kind, 0) + 1
+
+        self._trim()
+        return retry_after
+
+    def _trim(self):
+        limit = settings.player_rate_limit_max_players
+        while len(self._counters) > limit:
+            self._counters.popitem(last=False)
+        # Up to one bucket per kind for each tracked player
+        while len(self._buckets) > limit * max(len(settings.player_rate_limits), 1):
+            self._buckets.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.player_rate_limit_enabled,
+            "limits": {
+                kind: {
+                    "rate_per_second": rate,
+                    "burst": settings.player_rate_limit_burst.get(kind, 1.0),
+                }
+                for kind, rate in settings.player_rate_limits.items()
+            },
+            "rejected": self.rejected,
+            "players": {
+                player: counters.to_dict()
+                for player, counters in self._counters.items()
+            },
+        }
+
+
+player_rate_limiter = PlayerRateLimiter()
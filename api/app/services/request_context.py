@@ -0,0 +1,59 @@
+import asyncio
+import logging
+from typing import Dict, Any, Hashable, Callable, Awaitable
+
+logger = logging.getLogger(__name__)
+
+
+class RequestContext:
+    """
+    Unit of work for one dialogue turn: memoizes service reads by key for the
+    lifetime of the request.
+
+    Concurrent callers asking for the same key share one in-flight load, so a
+    read is issued at most once per request. Values known from elsewhere (e.g.
+    the single-query relationship row) can be primed with `put`. A failed
+    load is not cached.
+    """
+
+    def __init__(self):
+        self._values: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def get_or_load(
+        self, key: Hashable, loader: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        future = self._values.get(key)
+        if future is not None:
+            self.hits += 1
+            return await asyncio.shield(future)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._values[key] = future
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            del self._values[key]
+            future.cancel()
+            raise
+        except Exception as e:
+            del self._values[key]
+            future.set_exception(e)
+            # Mark retrieved so waiter-less failures are not logged as unhandled
+            future.exception()
+            raise
+        future.set_result(value)
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(value)
+        self._values[key] = future
+
+    def invalidate(self, key: Hashable):
+        self._values.pop(key, None)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "keys": len(self._values)}
@@ -0,0 +1,246 @@
+import copy
+import itertools
+import logging
+import math
+import re
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Any, List, Optional, Tuple
+
+from app.config import settings
+from app.models.request import ConversationEntry, DialogueRequest
+from app.services.opening_pool import PLAYER_PLACEHOLDER, friendship_band, mood_bucket
+
+logger = logging.getLogger(__name__)
+
+BucketKey = Tuple[str, str, str, str, str, str, str, str]
+
+
+def time_band(time_of_day: int) -> str:
+    """Game time (hhmm) coarsened to morning, afternoon or evening."""
+    if time_of_day < 1200:
+        return "morning"
+    if time_of_day < 1800:
+        return "afternoon"
+    return "evening"
+
+
+def context_bucket(
+    request: DialogueRequest, emotional_state: Optional[Dict[str, Any]]
+) -> BucketKey:
+    """
+    NPC, location, season, weather, time band, friendship band, mood bucket
+    and language.
+    """
+    return (
+        request.npc_name,
+        request.player_location,
+        request.season,
+        request.weather,
+        time_band(request.time_of_day),
+        friendship_band(request.friendship_hearts),
+        mood_bucket(emotional_state),
+        request.language,
+    )
+
+
+def _normalized(vector: List[float]) -> List[float]:
+    norm = math.sqrt(sum(x * x for x in vector))
+    return [x / norm for x in vector] if norm else []
+
+
+class CachedReply:
+    """An NPC reply and its options, written for PLAYER_PLACEHOLDER."""
+
+    _ids = itertools.count()
+
+    def __init__(
+        self,
+        embedding: List[float],
+        player_response: str,
+        npc_message: str,
+        response_options: List[str],
+    ):
+        self.id = next(self._ids)
+        self.embedding = embedding  # Unit length
+        self.player_response = player_response
+        self.npc_message = npc_message
+        self.response_options = response_options
+        self.created_at = time.monotonic()
+        self.uses = 0
+        self.similarity = 1.0  # Of the turn it was last served to
+
+    def for_player(self, player_name: str, similarity: float) -> "CachedReply":
+        """A copy with the placeholder replaced by the player's name."""
+        reply = copy.copy(self)
+        reply.npc_message = self.npc_message.replace(PLAYER_PLACEHOLDER, player_name)
+        reply.response_options = [
+            option.replace(PLAYER_PLACEHOLDER, player_name)
+            for option in self.response_options
+        ]
+        reply.similarity = similarity
+        return reply
+
+    def is_expired(self, now: float) -> bool:
+        return now - self.created_at > settings.semantic_cache_max_age_seconds
+
+
+class SemanticResponseCache:
+    """
+    Replies to later turns, looked up by the meaning of the player's line.
+
+    Replies are grouped by context bucket (see `context_bucket`); within a
+    bucket a turn is answered with the cached reply whose player line
+    embedding is most similar to its own, if the cosine similarity reaches
+    `semantic_cache_similarity_threshold`. Only turns with a player response,
+    no gift and at most `semantic_cache_max_history_lines` lines of history
+    are looked up or stored.
+
+    A reply is served at most `semantic_cache_max_uses` times, never twice
+    to the same player within their last `semantic_cache_no_repeat_window`
+    cached replies, and is dropped after `semantic_cache_max_age_seconds`.
+    """
+
+    def __init__(self):
+        self._buckets: "OrderedDict[BucketKey, deque]" = OrderedDict()
+        self._recent: "OrderedDict[str, deque]" = OrderedDict()
+        # Best similarity found by recent lookups, hit or miss, for tuning the threshold
+        self._similarities: deque = deque(maxlen=500)
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+
+    def accepts(
+        self, request: DialogueRequest, conversation_history: List[ConversationEntry]
+    ) -> bool:
+        """Whether this turn may be answered from, and stored in, the cache."""
+        return (
+            settings.semantic_cache_enabled
+            and bool(request.player_response and request.player_response.strip())
+            and not request.gift_given
+            and len(conversation_history) <= settings.semantic_cache_max_history_lines
+        )
+
+    def find(
+        self,
+        request: DialogueRequest,
+        emotional_state: Optional[Dict[str, Any]],
+        embedding: List[float],
+    ) -> Optional[CachedReply]:
+        """A cached reply for this turn with the player's name filled in, or None."""
+        query = _normalized(embedding)
+        if not query:
+            return None
+
+        key = context_bucket(request, emotional_state)
+        now = time.monotonic()
+        recent = self._recent_for(request.player_name)
+
+        best: Optional[CachedReply] = None
+        best_similarity = 0.0
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            for candidate in list(bucket):
+                if candidate.is_expired(now):
+                    bucket.remove(candidate)
+                    continue
+                if candidate.id in recent or len(candidate.embedding) != len(query):
+                    continue
+                similarity = sum(a * b for a, b in zip(query, candidate.embedding))
+                if similarity > best_similarity:
+                    best, best_similarity = candidate, similarity
+
+        self._similarities.append(best_similarity)
+        hit = best is not None and (
+            best_similarity >= settings.semantic_cache_similarity_threshold
+        )
+        if hit:
+            best.uses += 1
+            if best.uses >= settings.semantic_cache_max_uses:
+                bucket.remove(best)
+            recent.append(best.id)
+            self.hits += 1
+        else:
+            self.misses += 1
+
+        logger.debug(
+            f"Semantic cache {'hit' if hit else 'miss'} for {request.npc_name} "
+            f"(similarity {best_similarity:.3f}, "
+            f"hit rate {self.hits / (self.hits + self.misses):.0%})"
+        )
+        return best.for_player(request.player_name, best_similarity) if hit else None
+
+    def store(
+        self,
+        request: DialogueRequest,
+        emotional_state: Optional[Dict[str, Any]],
+        embedding: List[float],
+        npc_message: str,
+        response_options: List[str],
+    ):
+        """Caches a freshly generated reply to this turn."""
+        vector = _normalized(embedding)
+        if not vector:
+            return
+
+        key = context_bucket(request, emotional_state)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = deque(
+                maxlen=settings.semantic_cache_entries_per_bucket
+            )
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > settings.semantic_cache_max_buckets:
+            self._buckets.popitem(last=False)
+
+        name = request.player_name
+        # Whole words only: a player named "Sam" must not rewrite "Samantha"
+        name_pattern = re.compile(rf"(?<!\w){re.escape(name)}(?!\w)") if name else None
+
+        def generic(text: str) -> str:
+            if name_pattern is None:
+                return text
+            return name_pattern.sub(PLAYER_PLACEHOLDER, text)
+
+        reply = CachedReply(
+            vector,
+            request.player_response,
+            generic(npc_message),
+            [generic(option) for option in response_options],
+        )
+        bucket.append(reply)
+        # The player already saw this reply
+        self._recent_for(name).append(reply.id)
+        self.stored += 1
+
+    def _recent_for(self, player_name: str) -> deque:
+        recent = self._recent.get(player_name)
+        if recent is None:
+            recent = self._recent[player_name] = deque(
+                maxlen=settings.semantic_cache_no_repeat_window
+            )
+        self._recent.move_to_end(player_name)
+        while len(self._recent) > settings.semantic_cache_max_players:
+            self._recent.popitem(last=False)
+        return recent
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        similarities = list(self._similarities)
+        return {
+            "enabled": settings.semantic_cache_enabled,
+            "similarity_threshold": settings.semantic_cache_similarity_threshold,
+            "buckets": len(self._buckets),
+            "replies": sum(len(bucket) for bucket in self._buckets.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "stored": self.stored,
+            "recent_best_similarity_avg": sum(similarities) / len(similarities)
+            if similarities
+            else 0.0,
+            "recent_best_similarity_max": max(similarities, default=0.0),
+        }
+
+
+semantic_cache = SemanticResponseCache()
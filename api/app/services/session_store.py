@@ -0,0 +1,183 @@
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Any, Optional, Tuple, List
+
+from app.config import settings
+from app.models.request import ConversationEntry
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationSession:
+    """An active conversation between a player and an NPC, and its cached context."""
+
+    def __init__(
+        self,
+        player_name: str,
+        npc_name: str,
+        player_id: str,
+        npc_id: str,
+        conversation_id: str,
+        personality_profile: Dict[str, Any],
+        emotional_state: Optional[Dict[str, Any]],
+        history: Optional[List[ConversationEntry]] = None,
+        templates_version: int = 0,
+    ):
+        self.player_name = player_name
+        self.npc_name = npc_name
+        self.player_id = player_id
+        self.npc_id = npc_id
+        self.conversation_id = conversation_id
+        self.personality_profile = personality_profile
+        self.emotional_state = emotional_state
+        # Prompt template version read before the profile and state were loaded
+        self.templates_version = templates_version
+        self.started_at = time.monotonic()
+        self.last_activity = self.started_at
+        self.turns = 0
+        self.history: deque = deque(
+            history or [], maxlen=settings.session_history_max_lines
+        )
+
+    def add_lines(self, player_response: Optional[str], npc_message: str):
+        """Appends a finished turn to the history served to handle-based clients."""
+        if player_response:
+            self.history.append(
+                ConversationEntry(speaker="player", message=player_response)
+            )
+        self.history.append(ConversationEntry(speaker="npc", message=npc_message))
+
+    def as_relationship_row(self) -> Dict[str, Any]:
+        """The same shape as `get_relationship_context` returns."""
+        return {
+            "player_id": self.player_id,
+            "npc_id": self.npc_id,
+            "personality_profile": self.personality_profile,
+            "emotional_state": self.emotional_state,
+            "conversation_id": self.conversation_id,
+            "templates_version": self.templates_version,
+        }
+
+    def is_expired(self, now: float) -> bool:
+        return now - self.last_activity > settings.conversation_timeout_minutes * 60
+
+
+class SessionStore:
+    """
+    In-process registry of active conversations keyed by (player, NPC).
+
+    A session is opened after the first turn resolves its conversation and
+    holds the ids, conversation id, personality profile and emotional state,
+    so later turns and /end_conversation need no lookup query. It also keeps
+    the last lines of the conversation for clients that send a
+    `conversation_handle` instead of the full history. Profile and
+    state only change in the post-conversation analysis, which evicts the
+    relationship's session. Sessions also end on /end_conversation or after
+    `conversation_timeout_minutes` without a turn, the rule the database
+    lookup applies too (see `activity_cutoff`).
+
+    After a restart the store is empty and the first turn of each
+    conversation falls back to the database lookup.
+    """
+
+    def __init__(self):
+        self._sessions: "OrderedDict[Tuple[str, str], ConversationSession]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.opened = 0
+        self.ended = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def get(self, player_name: str, npc_name: str) -> Optional[ConversationSession]:
+        key = (player_name, npc_name)
+        session = self._sessions.get(key)
+        if session is not None and session.is_expired(time.monotonic()):
+            del self._sessions[key]
+            self.expired += 1
+            session = None
+        if session is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return session
+
+    def record_turn(
+        self, player_name: str, npc_name: str, context: Dict[str, Any]
+    ) -> ConversationSession:
+        """
+        Marks activity on the pair's session, opening it from the turn's
+        resolved context (player_id, npc_id, conversation_id,
+        personality_profile, emotional_state, conversation_history and
+        templates_version) if there is none.
+        """
+        key = (player_name, npc_name)
+        session = self._sessions.get(key)
+        if session is None or session.conversation_id != context["conversation_id"]:
+            session = ConversationSession(
+                player_name,
+                npc_name,
+                context["player_id"],
+                context["npc_id"],
+                context["conversation_id"],
+                context["personality_profile"],
+                context["emotional_state"],
+                context.get("conversation_history"),
+                context.get("templates_version", 0),
+            )
+            self._sessions[key] = session
+            self.opened += 1
+            self._sweep()
+
+        session.last_activity = time.monotonic()
+        session.turns += 1
+        self._sessions.move_to_end(key)
+        return session
+
+    def end(self, player_name: str, npc_name: str) -> Optional[ConversationSession]:
+        """Removes and returns the pair's session, if it is still active."""
+        session = self._sessions.pop((player_name, npc_name), None)
+        if session is None:
+            return None
+        if session.is_expired(time.monotonic()):
+            self.expired += 1
+            return None
+        self.ended += 1
+        return session
+
+    def evict_relationship(self, player_id: str, npc_id: str):
+        """Drops sessions whose cached profile or state is out of date."""
+        for key, session in list(self._sessions.items()):
+            if session.player_id == player_id and session.npc_id == npc_id:
+                del self._sessions[key]
+                self.evicted += 1
+
+    def _sweep(self):
+        """Drops timed-out sessions and keeps the store under its size limit."""
+        now = time.monotonic()
+        # Ordered by last activity, so the timed-out sessions are at the front
+        while self._sessions:
+            key, session = next(iter(self._sessions.items()))
+            if not session.is_expired(now):
+                break
+            del self._sessions[key]
+            self.expired += 1
+        while len(self._sessions) > settings.session_store_max_sessions:
+            self._sessions.popitem(last=False)
+            self.evicted += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.session_store_enabled,
+            "active": len(self._sessions),
+            "hits": self.hits,
+            "misses": self.misses,
+            "opened": self.opened,
+            "ended": self.ended,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+
+session_store = SessionStore()
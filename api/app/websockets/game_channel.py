@@ -0,0 +1,112 @@
+import asyncio
+import json
+import logging
+from typing import Set, Dict, Any, Awaitable, Union
+from fastapi import WebSocket
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class GameConnection:
+    """One mod client on /ws/game and the requests it has in flight."""
+
+    def __init__(self, websocket: WebSocket, player_name: str):
+        self.websocket = websocket
+        self.player_name = player_name
+        self.tasks: Set[asyncio.Task] = set()
+        # Replies to multiplexed requests are sent from several tasks
+        self._send_lock = asyncio.Lock()
+
+    async def send(self, data: Union[Dict[str, Any], str]) -> bool:
+        """Sends one frame (JSON, or text as is); False if the connection is gone."""
+        text = data if isinstance(data, str) else json.dumps(data)
+        try:
+            async with self._send_lock:
+                await self.websocket.send_text(text)
+            return True
+        except Exception as e:
+            logger.debug(f"Could not send to game client {self.player_name}: {e}")
+            return False
+
+    def start(self, request: Awaitable[None]):
+        """Handles a request concurrently with the connection's other requests."""
+        task = asyncio.create_task(request)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+
+class GameChannel:
+    """
+    Connections of game clients (the SMAPI mod) on /ws/game, by player.
+
+    Besides the replies to its requests, a client receives what the server
+    pushes for its player (see `push`). Work started by a request that must
+    outlive the connection (e.g. conversation analysis) runs through
+    `background_work`.
+    """
+
+    def __init__(self):
+        self.connections_by_player: Dict[str, Set[GameConnection]] = {}
+        self.requests = 0
+        self.errors = 0
+        self.pushed = 0
+
+    async def connect(self, websocket: WebSocket, player_name: str) -> GameConnection:
+        await websocket.accept()
+        connection = GameConnection(websocket, player_name)
+        self.connections_by_player.setdefault(player_name, set()).add(connection)
+        logger.info(
+            f"Game client connected for {player_name}. "
+            f"Players connected: {len(self.connections_by_player)}"
+        )
+        await connection.send(
+            {
+                "type": "connection_confirmed",
+                "player_name": player_name,
+                "timestamp": datetime.now().isoformat(),
+            }
+        )
+        return connection
+
+    async def disconnect(self, connection: GameConnection):
+        """Unregisters the connection and cancels its requests still in flight."""
+        connections = self.connections_by_player.get(connection.player_name)
+        if connections is not None:
+            connections.discard(connection)
+            if not connections:
+                del self.connections_by_player[connection.player_name]
+
+        tasks = list(connection.tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        logger.info(f"Game client disconnected for {connection.player_name}")
+
+    async def push(self, player_name: str, data: Dict[str, Any]) -> int:
+        """Sends an unsolicited frame to the player's clients; returns how many."""
+        delivered = 0
+        for connection in list(self.connections_by_player.get(player_name, ())):
+            if await connection.send(data):
+                delivered += 1
+        self.pushed += delivered
+        return delivered
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "players": len(self.connections_by_player),
+            "connections": sum(
+                len(connections) for connections in self.connections_by_player.values()
+            ),
+            "in_flight": sum(
+                len(connection.tasks)
+                for connections in self.connections_by_player.values()
+                for connection in connections
+            ),
+            "requests": self.requests,
+            "errors": self.errors,
+            "pushed": self.pushed,
+        }
+
+
+game_channel = GameChannel()
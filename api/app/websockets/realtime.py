@@ -168,6 +168,24 @@ class RealtimeMonitor:
         }
         await self.broadcast_to_all(message)
 
+    async def notify_llm_metrics(self, metrics_snapshot: Dict[str, Any]):
+        """Push rolling LLM latency/token/cost metrics per call site"""
+        message = {
+            "type": "llm_metrics",
+            "data": metrics_snapshot,
+            "timestamp": datetime.now().isoformat(),
+        }
+        await self.broadcast_to_type("dashboard", message)
+
+    async def notify_degradation_level(self, degradation_stats: Dict[str, Any]):
+        """Push the dialogue pipeline's load-shedding level after it changes"""
+        message = {
+            "type": "degradation_level",
+            "data": degradation_stats,
+            "timestamp": datetime.now().isoformat(),
+        }
+        await self.broadcast_to_type("dashboard", message)
+
 
 # Global instance
 realtime_monitor = RealtimeMonitor()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Load test for the dialogue, gift and analysis pipelines.
+
+Run the API with the deterministic fake provider so results do not depend on
+a real LLM backend:
+
+    LLM_PROVIDER=fake poetry run uvicorn app.main:app
+    poetry run python benchmarks/dialogue_load.py --players 20 --turns 5
+
+Each simulated player talks to one NPC for a few turns (one of them carrying a
+gift whose preference the server must infer) and then ends the conversation,
+which schedules the background analysis.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from collections import defaultdict
+
+import httpx
+
+NPCS = ["Abigail", "Sebastian", "Penny", "Haley", "Alex", "Emily", "Leah", "Shane"]
+REPLIES = [
+    "It's great to see you! How have you been?",
+    "Is there anything important I should know?",
+    "Do you always look like that or is it just today?",
+]
+
+
+def build_request(rng: random.Random, player: str, npc: str, turn: int, history):
+    request = {
+        "npc_name": npc,
+        "npc_location": "Town",
+        "player_name": player,
+        "friendship_hearts": rng.randint(0, 10),
+        "season": rng.choice(["Spring", "Summer", "Fall", "Winter"]),
+        "day_of_month": rng.randint(1, 28),
+        "day_of_week": rng.randint(0, 6),
+        "time_of_day": rng.choice([900, 1200, 1500, 1800]),
+        "year": 1,
+        "weather": rng.choice(["sunny", "rainy"]),
+        "player_location": "Town",
+        "language": "en",
+        "conversation_history": list(history),
+        "player_response": rng.choice(REPLIES) if turn > 0 else None,
+    }
+    if turn == 1:
+        request["gift_given"] = {
+            "item_name": rng.choice(["Amethyst", "Clay", "Coffee", "Daffodil"]),
+            "item_category": "Minerals",
+            "gift_preference": "unknown",
+        }
+    return request
+
+
+async def simulate_player(client, rng, index, turns, timings):
+    player = f"LoadPlayer{index}"
+    npc = rng.choice(NPCS)
+    history = []
+
+    for turn in range(turns):
+        request = build_request(rng, player, npc, turn, history)
+        started = time.perf_counter()
+        response = await client.post("/generate_dialogue", json=request)
+        timings["generate_dialogue"].append(time.perf_counter() - started)
+        if response.status_code != 200:
+            timings["errors"].append(response.status_code)
+            continue
+
+        data = response.json()
+        if request["player_response"]:
+            history.append({"speaker": "player", "message": request["player_response"]})
+        history.append({"speaker": "npc", "message": data["npc_message"]})
+
+    started = time.perf_counter()
+    await client.post(
+        "/end_conversation", json={"player_name": player, "npc_name": npc}
+    )
+    timings["end_conversation"].append(time.perf_counter() - started)
+
+
+def report(timings, elapsed):
+    print(f"\nCompleted in {elapsed:.2f}s")
+    for name, values in timings.items():
+        if name == "errors" or not values:
+            continue
+        values = sorted(values)
+        p95 = values[max(0, int(len(values) * 0.95) - 1)]
+        print(
+            f"{name:20s} n={len(values):5d} "
+            f"mean={statistics.mean(values) * 1000:8.1f}ms "
+            f"p50={statistics.median(values) * 1000:8.1f}ms "
+            f"p95={p95 * 1000:8.1f}ms "
+            f"max={values[-1] * 1000:8.1f}ms"
+        )
+    if timings["errors"]:
+        print(f"errors: {len(timings['errors'])}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--players", type=int, default=10)
+    parser.add_argument("--turns", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    timings = defaultdict(list)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=120) as client:
+
+        async def run(index):
+            async with semaphore:
+                await simulate_player(
+                    client, random.Random(rng.random()), index, args.turns, timings
+                )
+
+        started = time.perf_counter()
+        await asyncio.gather(*(run(i) for i in range(args.players)))
+        report(timings, time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
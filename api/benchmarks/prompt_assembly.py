@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark of dialogue prompt assembly.
+
+Compares building the prompt from scratch on every turn (formatting the full
+template, the personality block and the mood description) with the compiled
+per-NPC template and cached fragments used by /generate_dialogue:
+
+    poetry run python benchmarks/prompt_assembly.py --iterations 20000
+
+No server or database is needed.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.services.prompt_templates import (  # noqa: E402
+    DIALOGUE_TEMPLATE,
+    PERSONALITY_TEMPLATE,
+    PromptTemplateCache,
+    language_instruction,
+)
+from app.services.memory.personality_service import PROFILE_METRICS  # noqa: E402
+from app.services.memory.emotional_state_service import (  # noqa: E402
+    emotional_state_service,
+)
+
+NPCS = ["Abigail", "Sebastian", "Penny", "Haley", "Alex", "Emily", "Leah", "Shane"]
+PLAYERS = [f"BenchPlayer{i}" for i in range(20)]
+
+
+def build_turns(rng: random.Random, count: int):
+    profiles = {}
+    states = {}
+    for player in PLAYERS:
+        for npc in NPCS:
+            profiles[(player, npc)] = {
+                "summary": f"{npc} thinks {player} is a hard-working farmer.",
+                **{metric: rng.uniform(0, 10) for metric in PROFILE_METRICS},
+            }
+            states[(player, npc)] = {
+                "current_mood": rng.choice(["HAPPY", "NEUTRAL", "SAD", "EXCITED"]),
+                "mood_intensity": rng.uniform(1, 10),
+                "recent_joy": rng.uniform(0, 2),
+                "recent_sadness": rng.uniform(0, 2),
+                "recent_anger": rng.uniform(0, 2),
+                "recent_excitement": rng.uniform(0, 2),
+                "last_interaction_effect": "They talked about the harvest.",
+            }
+
+    turns = []
+    for _ in range(count):
+        player, npc = rng.choice(PLAYERS), rng.choice(NPCS)
+        turns.append(
+            {
+                "player_name": player,
+                "npc_name": npc,
+                "language": rng.choice(["en", "es"]),
+                "profile": profiles[(player, npc)],
+                "state": states[(player, npc)],
+                "fields": {
+                    "player_name": player,
+                    "relevant_memories": "",
+                    "friendship_hearts": rng.randint(0, 10),
+                    "season": rng.choice(["Spring", "Summer", "Fall", "Winter"]),
+                    "day_of_week": rng.randint(0, 6),
+                    "day_of_month": rng.randint(1, 28),
+                    "time_of_day": rng.choice([900, 1200, 1500, 1800]),
+                    "weather": rng.choice(["sunny", "rainy"]),
+                    "player_location": "Town",
+                    "conversation_context": f"Player: Hello {npc}!\n",
+                    "gift_context": "",
+                    "gift_focus": "",
+                    "gift_reaction_instruction": "",
+                },
+            }
+        )
+    return turns
+
+
+def assemble_uncached(turn) -> str:
+    emotional_context = emotional_state_service.generate_mood_context_for_dialogue(
+        turn["state"]
+    )
+    personality_context = PERSONALITY_TEMPLATE.render(
+        player_name=turn["player_name"], **turn["profile"]
+    )
+    return DIALOGUE_TEMPLATE.render(
+        npc_name=turn["npc_name"],
+        language_instruction=language_instruction(turn["language"]),
+        emotional_context=emotional_context,
+        personality_context=personality_context,
+        **turn["fields"],
+    )
+
+
+def assemble_cached(cache: PromptTemplateCache, turn) -> str:
+    player, npc = turn["player_name"], turn["npc_name"]
+    loaded_version = cache.current_version()
+    emotional_context = cache.fragment(
+        "mood",
+        player,
+        npc,
+        lambda: emotional_state_service.generate_mood_context_for_dialogue(
+            turn["state"]
+        ),
+        loaded_version,
+    )
+    personality_context = cache.fragment(
+        "personality",
+        player,
+        npc,
+        lambda: PERSONALITY_TEMPLATE.render(player_name=player, **turn["profile"]),
+        loaded_version,
+    )
+    return cache.dialogue_template(npc, turn["language"]).render(
+        emotional_context=emotional_context,
+        personality_context=personality_context,
+        **turn["fields"],
+    )
+
+
+def measure(name, assemble, turns):
+    started = time.perf_counter()
+    for turn in turns:
+        assemble(turn)
+    elapsed = time.perf_counter() - started
+    per_turn_us = elapsed / len(turns) * 1_000_000
+    print(f"{name:10s} {len(turns):7d} prompts  {per_turn_us:8.2f}us/prompt")
+    return per_turn_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    turns = build_turns(random.Random(args.seed), args.iterations)
+    cache = PromptTemplateCache()
+
+    # Both paths must produce the same prompt
+    for turn in turns[:100]:
+        assert assemble_uncached(turn) == assemble_cached(cache, turn)
+
+    uncached = measure("uncached", assemble_uncached, turns)
+    cached = measure("cached", lambda turn: assemble_cached(cache, turn), turns)
+    print(f"speedup    {uncached / cached:.2f}x")
+    print(f"cache      {cache.get_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+-- A conversation stays active while it has had a turn within the timeout
+-- (its last dialogue line, or its start if it has none yet), the same rule
+-- the in-process session store applies. Previously the database only looked
+-- at "startTime", so long conversations timed out mid-way after a restart.
+
+-- CreateIndex
+CREATE INDEX "DialogueEntry_conversationId_timestamp_idx" ON "DialogueEntry"("conversationId", "timestamp");
+
+-- CreateOrReplaceFunction
+CREATE OR REPLACE FUNCTION "relationship_context"(
+    p_player_name TEXT,
+    p_npc_name TEXT,
+    p_npc_location TEXT,
+    p_cutoff TIMESTAMP(3),
+    p_default_profile JSONB,
+    p_conversation JSONB
+)
+RETURNS TABLE (
+    player_id TEXT,
+    npc_id TEXT,
+    profile JSONB,
+    emotional_state JSONB,
+    conversation_id TEXT,
+    conversation_start TIMESTAMP(3),
+    conversation_created BOOLEAN
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_player_id TEXT;
+    v_npc_id TEXT;
+    v_npc_location TEXT;
+    v_conversation_id TEXT;
+    v_conversation_start TIMESTAMP(3);
+    v_created BOOLEAN := FALSE;
+BEGIN
+    -- Player
+    SELECT p."id" INTO v_player_id FROM "Player" p WHERE p."name" = p_player_name;
+    IF v_player_id IS NULL THEN
+        INSERT INTO "Player" ("id", "name", "updatedAt")
+        VALUES (gen_random_uuid()::text, p_player_name, NOW())
+        ON CONFLICT ("name") DO NOTHING;
+        SELECT p."id" INTO v_player_id FROM "Player" p WHERE p."name" = p_player_name;
+    END IF;
+
+    -- NPC (keeps the last known location up to date)
+    SELECT n."id", n."location" INTO v_npc_id, v_npc_location
+    FROM "Npc" n WHERE n."name" = p_npc_name;
+    IF v_npc_id IS NULL THEN
+        INSERT INTO "Npc" ("id", "name", "location", "updatedAt")
+        VALUES (gen_random_uuid()::text, p_npc_name, p_npc_location, NOW())
+        ON CONFLICT ("name") DO NOTHING;
+        SELECT n."id" INTO v_npc_id FROM "Npc" n WHERE n."name" = p_npc_name;
+    ELSIF p_npc_location IS NOT NULL AND v_npc_location IS DISTINCT FROM p_npc_location THEN
+        UPDATE "Npc" SET "location" = p_npc_location, "updatedAt" = NOW()
+        WHERE "id" = v_npc_id;
+    END IF;
+
+    -- Personality profile
+    INSERT INTO "PlayerPersonalityProfile" (
+        "id", "playerId", "npcId", "summary",
+        "friendliness", "extroversion", "sincerity", "curiosity",
+        "trust", "respect", "affection", "annoyance", "admiration",
+        "romantic_interest", "humor_compatibility", "updatedAt"
+    )
+    VALUES (
+        gen_random_uuid()::text, v_player_id, v_npc_id,
+        COALESCE(p_default_profile->>'summary', ''),
+        COALESCE((p_default_profile->>'friendliness')::float8, 5.0),
+        COALESCE((p_default_profile->>'extroversion')::float8, 5.0),
+        COALESCE((p_default_profile->>'sincerity')::float8, 5.0),
+        COALESCE((p_default_profile->>'curiosity')::float8, 5.0),
+        COALESCE((p_default_profile->>'trust')::float8, 5.0),
+        COALESCE((p_default_profile->>'respect')::float8, 5.0),
+        COALESCE((p_default_profile->>'affection')::float8, 3.0),
+        COALESCE((p_default_profile->>'annoyance')::float8, 2.0),
+        COALESCE((p_default_profile->>'admiration')::float8, 3.0),
+        COALESCE((p_default_profile->>'romantic_interest')::float8, 1.0),
+        COALESCE((p_default_profile->>'humor_compatibility')::float8, 5.0),
+        NOW()
+    )
+    ON CONFLICT ("playerId", "npcId") DO NOTHING;
+
+    -- Emotional state (column defaults are the neutral state)
+    INSERT INTO "EmotionalState" (
+        "id", "npcId", "playerId", "lastInteractionEffect", "externalFactors"
+    )
+    VALUES (gen_random_uuid()::text, v_npc_id, v_player_id, '', '')
+    ON CONFLICT ("npcId", "playerId") DO NOTHING;
+
+    -- Active conversation
+    SELECT c."id", c."startTime" INTO v_conversation_id, v_conversation_start
+    FROM "Conversation" c
+    WHERE c."playerId" = v_player_id
+      AND c."npcId" = v_npc_id
+      AND c."endTime" IS NULL
+      AND (
+          c."startTime" >= p_cutoff
+          OR EXISTS (
+              SELECT 1 FROM "DialogueEntry" d
+              WHERE d."conversationId" = c."id" AND d."timestamp" >= p_cutoff
+          )
+      )
+    ORDER BY c."startTime" DESC
+    LIMIT 1;
+
+    IF v_conversation_id IS NULL THEN
+        INSERT INTO "Conversation" (
+            "id", "playerId", "npcId", "season", "dayOfMonth", "dayOfWeek",
+            "timeOfDay", "year", "weather", "playerLocation", "friendshipHearts"
+        )
+        VALUES (
+            gen_random_uuid()::text, v_player_id, v_npc_id,
+            p_conversation->>'season',
+            (p_conversation->>'day_of_month')::int,
+            (p_conversation->>'day_of_week')::int,
+            (p_conversation->>'time_of_day')::int,
+            (p_conversation->>'year')::int,
+            p_conversation->>'weather',
+            p_conversation->>'player_location',
+            (p_conversation->>'friendship_hearts')::int
+        )
+        RETURNING "id", "startTime" INTO v_conversation_id, v_conversation_start;
+        v_created := TRUE;
+    END IF;
+
+    RETURN QUERY
+    SELECT
+        v_player_id,
+        v_npc_id,
+        (SELECT to_jsonb(pp) FROM "PlayerPersonalityProfile" pp
+         WHERE pp."playerId" = v_player_id AND pp."npcId" = v_npc_id),
+        (SELECT to_jsonb(es) FROM "EmotionalState" es
+         WHERE es."npcId" = v_npc_id AND es."playerId" = v_player_id),
+        v_conversation_id,
+        v_conversation_start,
+        v_created;
+END;
+$$;
@@ -0,0 +1,180 @@
+import pytest
+from unittest.mock import patch, AsyncMock
+from app.config import settings
+from app.services.memory.analysis_batcher import AnalysisBatcher
+from app.services.memory.analysis_service import analysis_service
+
+
+def _analysis_data(conversation_id: str) -> dict:
+    return {
+        "conversation_id": conversation_id,
+        "player_id": "player-1",
+        "npc_id": f"npc-{conversation_id}",
+        "player_name": "Farmer",
+        "npc_name": "Abigail",
+        "transcript": "Player: Hi!\nAbigail: Oh, hey.",
+        "context": {"season": "Spring", "location": "Town", "friendship_hearts": 2},
+        "current_personality": {
+            "summary": "A friendly farmer.",
+            "trust": 5.0,
+            "affection": 5.0,
+            "annoyance": 1.0,
+        },
+        "current_emotional_state": {"current_mood": "NEUTRAL", "mood_intensity": 5.0},
+        "long_term_memories": [],
+    }
+
+
+def _llm_response(content: str):
+    response = AsyncMock()
+    response.choices = [AsyncMock()]
+    response.choices[0].message.content = content
+    return response
+
+
+class TestAnalysisBatcher:
+    """Test suite for batched post-conversation analysis."""
+
+    @pytest.fixture(autouse=True)
+    def batching_enabled(self):
+        with (
+            patch.object(settings, "analysis_batching_enabled", True),
+            patch.object(settings, "analysis_batch_window_seconds", 60.0),
+            patch.object(settings, "analysis_batch_max_conversations", 8),
+            patch.object(settings, "analysis_batch_max_prompt_tokens", 100000),
+        ):
+            yield
+
+    @pytest.fixture
+    def gather_data(self):
+        async def fake_gather(conversation_id):
+            return _analysis_data(conversation_id)
+
+        with patch.object(
+            analysis_service, "_get_data_for_analysis", side_effect=fake_gather
+        ):
+            yield
+
+    @pytest.mark.asyncio
+    async def test_disabled_runs_single_analysis(self):
+        """With batching off, submit analyzes the conversation right away."""
+        batcher = AnalysisBatcher()
+        with (
+            patch.object(settings, "analysis_batching_enabled", False),
+            patch.object(
+                analysis_service,
+                "analyze_conversation_and_update_memory",
+                new_callable=AsyncMock,
+            ) as single,
+        ):
+            await batcher.submit("conv-1")
+
+        single.assert_awaited_once_with("conv-1")
+        assert batcher.get_stats()["single_calls"] == 1
+
+    @pytest.mark.asyncio
+    async def test_batch_shares_one_llm_call(self, gather_data):
+        """Conversations queued in the window go out as one request."""
+        batcher = AnalysisBatcher()
+        with (
+            patch(
+                "app.services.memory.analysis_service.llm_service.acompletion",
+                new_callable=AsyncMock,
+                return_value=_llm_response(
+                    '[{"conversation_id": "conv-1"}, {"conversation_id": "conv-2"}]'
+                ),
+            ) as completion,
+            patch.object(
+                analysis_service, "_process_analysis_results", new_callable=AsyncMock
+            ) as process,
+        ):
+            await batcher.submit("conv-1")
+            await batcher.submit("conv-2")
+            await batcher.flush()
+
+        completion.assert_awaited_once()
+        assert completion.await_args.kwargs["call_site"] == "analysis_batch"
+        assert process.await_count == 2
+
+        stats = batcher.get_stats()
+        assert stats["batches"] == 1
+        assert stats["avg_batch_size"] == 2
+        assert stats["prompt_tokens_saved"] > 0
+
+    @pytest.mark.asyncio
+    async def test_unparseable_response_falls_back(self, gather_data):
+        """A batch answer that is not JSON falls back to single calls."""
+        batcher = AnalysisBatcher()
+        with (
+            patch(
+                "app.services.memory.analysis_service.llm_service.acompletion",
+                new_callable=AsyncMock,
+                return_value=_llm_response("Sorry, I can't do that."),
+            ),
+            patch.object(
+                analysis_service,
+                "analyze_conversation_and_update_memory",
+                new_callable=AsyncMock,
+            ) as single,
+        ):
+            await batcher.submit("conv-1")
+            await batcher.submit("conv-2")
+            await batcher.flush()
+
+        assert single.await_count == 2
+        assert batcher.get_stats()["fallbacks"] == 2
+
+    @pytest.mark.asyncio
+    async def test_partially_applied_result_is_not_retried(self, gather_data):
+        """Only conversations missing from the answer fall back to single calls."""
+        batcher = AnalysisBatcher()
+
+        async def process(data, results):
+            if data["conversation_id"] == "conv-1":
+                raise RuntimeError("emotional state update failed")
+
+        with (
+            patch(
+                "app.services.memory.analysis_service.llm_service.acompletion",
+                new_callable=AsyncMock,
+                return_value=_llm_response(
+                    '[{"conversation_id": "conv-1"}, {"conversation_id": "conv-2"}]'
+                ),
+            ),
+            patch.object(
+                analysis_service, "_process_analysis_results", side_effect=process
+            ),
+            patch.object(
+                analysis_service,
+                "analyze_conversation_and_update_memory",
+                new_callable=AsyncMock,
+            ) as single,
+        ):
+            await batcher.submit("conv-1")
+            await batcher.submit("conv-2")
+            await batcher.submit("conv-3")
+            await batcher.flush()
+
+        single.assert_awaited_once()
+        assert single.await_args.args[0] == "conv-3"
+        assert batcher.get_stats()["fallbacks"] == 1
+
+    def test_pack_respects_token_budget(self):
+        """Batches are split when the next conversation would exceed the budget."""
+        batcher = AnalysisBatcher()
+        data = [_analysis_data(f"conv-{i}") for i in range(4)]
+        overhead = len(analysis_service._build_batched_analysis_prompt([])) // 4
+        block = len(analysis_service._build_conversation_block(data[0])) // 4
+
+        with (
+            patch(
+                "app.services.memory.analysis_batcher.llm_service.count_tokens",
+                side_effect=lambda model, text: len(text) // 4,
+            ),
+            patch.object(
+                settings, "analysis_batch_max_prompt_tokens", overhead + 2 * block
+            ),
+        ):
+            batches = batcher._pack(data)
+
+        assert [len(b) for b in batches] == [2, 2]
@@ -0,0 +1,33 @@
+import asyncio
+import pytest
+from app.services.background_work import BackgroundWork
+
+
+class TestBackgroundWork:
+    """Test suite for work that outlives its request."""
+
+    @pytest.mark.asyncio
+    async def test_drain_waits_then_cancels_leftovers(self):
+        """Shutdown waits for running work and cancels what misses the timeout."""
+        work = BackgroundWork()
+        finished = []
+
+        async def job(seconds: float):
+            await asyncio.sleep(seconds)
+            finished.append(seconds)
+
+        async def broken():
+            raise RuntimeError("database gone")
+
+        work.run(job(0.01), label="quick")
+        work.run(job(10), label="slow")
+        work.run(broken(), label="broken")
+        await work.drain(timeout=0.1)
+
+        assert finished == [0.01]
+        assert work.get_stats() == {
+            "running": 0,
+            "started": 3,
+            "failed": 1,
+            "cancelled_on_shutdown": 1,
+        }
@@ -0,0 +1,65 @@
+import asyncio
+import pytest
+from app.services.conversation_pipeline import ConversationPipeline
+
+
+class TestConversationPipeline:
+    """Test suite for ordered background dialogue side effects."""
+
+    @pytest.mark.asyncio
+    async def test_jobs_run_in_order_per_key(self):
+        """Later jobs for a conversation start only after earlier ones finish."""
+        pipeline = ConversationPipeline()
+        order = []
+
+        def job(name, delay):
+            async def run():
+                await asyncio.sleep(delay)
+                order.append(name)
+
+            return run
+
+        key = ("Farmer", "Abigail")
+        pipeline.submit(key, job("turn-1", 0.03))
+        pipeline.submit(key, job("turn-2", 0.0))
+        pipeline.submit(("Farmer", "Sam"), job("other", 0.0))
+
+        await pipeline.drain()
+
+        assert order.index("turn-1") < order.index("turn-2")
+        assert order[0] == "other"  # Other conversations are not held up
+        assert pipeline.get_stats()["completed"] == 3
+
+    @pytest.mark.asyncio
+    async def test_wait_for_sees_earlier_writes(self):
+        pipeline = ConversationPipeline()
+        written = []
+
+        async def write():
+            await asyncio.sleep(0.02)
+            written.append("line")
+
+        pipeline.submit("conv", write)
+        assert await pipeline.wait_for("conv", timeout=1.0)
+        assert written == ["line"]
+        assert await pipeline.wait_for("idle-conv", timeout=1.0)
+
+    @pytest.mark.asyncio
+    async def test_failure_does_not_block_later_jobs(self):
+        pipeline = ConversationPipeline()
+        ran = []
+
+        async def fail():
+            raise RuntimeError("insert failed")
+
+        async def succeed():
+            ran.append(True)
+
+        pipeline.submit("conv", fail)
+        pipeline.submit("conv", succeed)
+        await pipeline.drain()
+
+        assert ran == [True]
+        stats = pipeline.get_stats()
+        assert stats["failed"] == 1
+        assert stats["pending"] == 0
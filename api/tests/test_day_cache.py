@@ -0,0 +1,196 @@
+import pytest
+from unittest.mock import patch, AsyncMock
+from fastapi import HTTPException
+from app.config import settings
+from app.models.request import DialogueRequest, PrepareDayRequest
+from app.routers import dialogue
+from app.services.day_cache import (
+    DayPrecomputeCache,
+    PreparedOpening,
+    is_opening_turn,
+)
+from app.services.prompt_templates import prompt_templates
+from app.services.rate_limiter import PlayerRateLimiter
+
+
+def make_request(**overrides) -> DialogueRequest:
+    fields = dict(
+        npc_name="Abigail",
+        npc_location="Town",
+        player_name="Farmer",
+        friendship_hearts=3,
+        season="Spring",
+        day_of_month=5,
+        day_of_week=5,
+        time_of_day=600,
+        year=1,
+        weather="Sun",
+        player_location="Town",
+    )
+    fields.update(overrides)
+    return DialogueRequest(**fields)
+
+
+def make_opening(request: DialogueRequest, player_id="player-day", npc_id="npc-day"):
+    return PreparedOpening(
+        request,
+        player_id,
+        npc_id,
+        prompt_templates.version(player_id, npc_id),
+        "Morning! Off to the mines later.",
+        ["a", "b", "c"],
+    )
+
+
+class TestDayPrecomputeCache:
+    """Test suite for opening lines prepared at the start of the day."""
+
+    def test_opening_turn_detection(self):
+        assert is_opening_turn(make_request())
+        assert not is_opening_turn(make_request(player_response="Hi"))
+        assert not is_opening_turn(make_request(conversation_handle="conv-1"))
+
+    def test_prepared_line_is_served_once(self):
+        cache = DayPrecomputeCache()
+        cache.store("Farmer", "Abigail", make_opening(make_request()))
+
+        opening = cache.take(make_request(time_of_day=1000))
+        assert opening.npc_message == "Morning! Off to the mines later."
+        assert cache.take(make_request(time_of_day=1000)) is None
+        assert cache.get_stats()["served"] == 1
+
+    @pytest.mark.parametrize(
+        "overrides",
+        [
+            {"day_of_month": 6},
+            {"weather": "Rain"},
+            {"player_location": "Saloon"},
+            {"friendship_hearts": 4},
+            {"time_of_day": 2200},
+        ],
+    )
+    def test_line_that_no_longer_fits_is_dropped(self, overrides):
+        cache = DayPrecomputeCache()
+        cache.store("Farmer", "Abigail", make_opening(make_request()))
+
+        assert cache.take(make_request(**overrides)) is None
+        stats = cache.get_stats()
+        assert stats["stale"] == 1 and stats["ready"] == 0
+
+    def test_profile_update_makes_line_stale(self):
+        """Analysis after a conversation bumps the relationship version."""
+        cache = DayPrecomputeCache()
+        cache.store("Farmer", "Abigail", make_opening(make_request(), npc_id="npc-upd"))
+        prompt_templates.invalidate("player-day", "npc-upd")
+
+        assert cache.take(make_request()) is None
+
+
+class TestPrepareDay:
+    """Test suite for /prepare_day."""
+
+    def test_prepared_turn_is_where_the_npc_is(self):
+        day = PrepareDayRequest(
+            player_name="Farmer",
+            season="Spring",
+            day_of_month=5,
+            day_of_week=5,
+            time_of_day=600,
+            year=1,
+            weather="Sun",
+            player_location="FarmHouse",
+            npcs=[{"npc_name": "Gus", "npc_location": "Saloon", "friendship_hearts": 2}],
+        )
+        request = day.dialogue_request(day.npcs[0])
+        assert request.player_location == "Saloon"
+        assert request.friendship_hearts == 2
+
+    def test_npcs_with_a_ready_line_are_not_planned(self):
+        cache = DayPrecomputeCache()
+        cache.store("Farmer", "Abigail", make_opening(make_request()))
+        day = PrepareDayRequest(
+            player_name="Farmer",
+            season="Spring",
+            day_of_month=5,
+            day_of_week=5,
+            time_of_day=600,
+            year=1,
+            weather="Sun",
+            player_location="FarmHouse",
+            npcs=[
+                {"npc_name": "Abigail", "npc_location": "Town", "friendship_hearts": 3},
+                {"npc_name": "Gus", "npc_location": "Saloon", "friendship_hearts": 2},
+            ],
+        )
+
+        with (
+            patch.object(dialogue, "day_cache", cache),
+            patch.object(settings, "player_rate_limit_enabled", False),
+        ):
+            requests = dialogue.plan_day(day)
+
+        assert [request.npc_name for request in requests] == ["Gus"]
+
+    def test_prepare_day_is_rate_limited(self):
+        day = PrepareDayRequest(
+            player_name="Farmer",
+            season="Spring",
+            day_of_month=5,
+            day_of_week=5,
+            time_of_day=600,
+            year=1,
+            weather="Sun",
+            player_location="FarmHouse",
+            npcs=[],
+        )
+
+        with (
+            patch.object(dialogue, "player_rate_limiter", PlayerRateLimiter()),
+            patch.object(settings, "player_rate_limit_enabled", True),
+            patch.object(settings, "player_rate_limits", {"prepare_day": 0.05}),
+            patch.object(settings, "player_rate_limit_burst", {"prepare_day": 2.0}),
+        ):
+            dialogue.plan_day(day)
+            dialogue.plan_day(day)
+            with pytest.raises(HTTPException) as exc_info:
+                dialogue.plan_day(day)
+
+        assert exc_info.value.status_code == 429
+
+    @pytest.mark.asyncio
+    async def test_prepare_opening_stores_generated_line(self):
+        cache = DayPrecomputeCache()
+        memory = AsyncMock()
+        memory.get_or_create_player.return_value = "player-1"
+        memory.get_or_create_npc.return_value = "npc-1"
+        memory.get_personality_profile.return_value = {"summary": "Seems nice."}
+        memory.get_emotional_state.return_value = None
+        compose = AsyncMock(return_value=("Hello there!", ["a", "b", "c"]))
+
+        with (
+            patch.object(dialogue, "day_cache", cache),
+            patch.object(dialogue, "memory_service", memory),
+            patch.object(dialogue, "compose_npc_turn", compose),
+            patch.object(settings, "degradation_forced_level", None),
+        ):
+            await dialogue.prepare_openings([make_request()])
+
+        context = compose.await_args.args[1]
+        assert context["personality_profile"] == {"summary": "Seems nice."}
+        assert context["conversation_history"] == []
+        assert compose.await_args.kwargs["priority"] == "background"
+        assert cache.take(make_request()).npc_message == "Hello there!"
+
+    @pytest.mark.asyncio
+    async def test_failures_are_counted_not_raised(self):
+        cache = DayPrecomputeCache()
+        memory = AsyncMock()
+        memory.get_or_create_player.side_effect = Exception("db down")
+
+        with (
+            patch.object(dialogue, "day_cache", cache),
+            patch.object(dialogue, "memory_service", memory),
+        ):
+            await dialogue.prepare_openings([make_request(), make_request(npc_name="Gus")])
+
+        assert cache.get_stats()["failed"] == 2
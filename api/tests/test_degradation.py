@@ -0,0 +1,106 @@
+import pytest
+from unittest.mock import patch
+from app.config import settings
+from app.services.degradation import DegradationController, DegradationLevel
+from app.data.canned_lines import get_canned_line, CANNED_LINES
+
+
+class TestDegradationController:
+    """Test suite for the load-shedding ladder."""
+
+    @pytest.fixture(autouse=True)
+    def thresholds(self):
+        with (
+            patch.object(settings, "degradation_enabled", True),
+            patch.object(settings, "degradation_forced_level", None),
+            patch.object(settings, "degradation_eval_interval_seconds", 0.0),
+            patch.object(settings, "degradation_hold_seconds", 0.0),
+            patch.object(settings, "degradation_queue_depth_high", 10),
+            patch.object(settings, "degradation_queue_depth_low", 2),
+            patch.object(settings, "degradation_latency_slo_ms", 5000.0),
+            patch.object(settings, "degradation_min_samples", 3),
+        ):
+            yield
+
+    def signals(self, queue_depth=0, latencies=()):
+        return (
+            patch(
+                "app.services.degradation.llm_service.scheduler.queue_depth",
+                return_value=queue_depth,
+            ),
+            patch(
+                "app.services.degradation.llm_metrics.recent_wall_times_ms",
+                return_value=list(latencies),
+            ),
+        )
+
+    def test_steps_down_one_rung_per_evaluation_under_pressure(self):
+        controller = DegradationController()
+        queue, latency = self.signals(queue_depth=25)
+
+        with queue, latency:
+            levels = [controller.evaluate() for _ in range(6)]
+
+        assert levels == [
+            DegradationLevel.NO_MEMORY_SEARCH,
+            DegradationLevel.REDUCED_CONTEXT,
+            DegradationLevel.FAST_MODEL,
+            DegradationLevel.CANNED,
+            DegradationLevel.CANNED,
+            DegradationLevel.CANNED,
+        ]
+
+    def test_latency_slo_breach_counts_as_pressure(self):
+        controller = DegradationController()
+        queue, latency = self.signals(latencies=[9000, 9500, 8000])
+
+        with queue, latency:
+            assert controller.evaluate() == DegradationLevel.NO_MEMORY_SEARCH
+
+    def test_steps_back_up_when_load_recedes(self):
+        """Recovery needs both a short queue and latency well under the SLO."""
+        controller = DegradationController()
+        controller.level = DegradationLevel.FAST_MODEL
+
+        queue, latency = self.signals(queue_depth=5)
+        with queue, latency:
+            assert controller.evaluate() == DegradationLevel.FAST_MODEL
+
+        queue, latency = self.signals(queue_depth=1, latencies=[1000, 1200, 900])
+        with queue, latency:
+            assert controller.evaluate() == DegradationLevel.REDUCED_CONTEXT
+            assert controller.evaluate() == DegradationLevel.NO_MEMORY_SEARCH
+        assert [t["to"] for t in controller.transitions] == [
+            "reduced_context",
+            "no_memory_search",
+        ]
+
+    def test_level_is_held_between_steps(self):
+        controller = DegradationController()
+        queue, latency = self.signals(queue_depth=25)
+
+        with queue, latency, patch.object(settings, "degradation_hold_seconds", 60.0):
+            controller._changed_at = 0.0
+            assert controller.evaluate() == DegradationLevel.NO_MEMORY_SEARCH
+            assert controller.evaluate() == DegradationLevel.NO_MEMORY_SEARCH
+
+    def test_fast_model_and_budget_follow_level(self):
+        controller = DegradationController()
+
+        with patch.object(settings, "degradation_fast_model", "small-model"):
+            assert controller.dialogue_model(DegradationLevel.NORMAL) == (
+                settings.dialogue_model
+            )
+            assert controller.dialogue_model(DegradationLevel.FAST_MODEL) == "small-model"
+        assert controller.budget_scale(DegradationLevel.NO_MEMORY_SEARCH) == 1.0
+        assert controller.budget_scale(DegradationLevel.REDUCED_CONTEXT) == (
+            settings.degradation_budget_scale
+        )
+
+
+class TestCannedLines:
+    def test_npc_line_in_requested_language(self):
+        assert get_canned_line("Shane", "es") in CANNED_LINES["Shane"]["es"]
+
+    def test_unknown_npc_and_language_fall_back(self):
+        assert get_canned_line("Krobus", "ja") in CANNED_LINES["default"]["en"]
@@ -359,13 +359,11 @@ OPTION_3: It was just lying around."""
         assert response.status_code == 200
 
         # Verify memory service calls
-        mock_memory.add_dialogue_entry.assert_called()
-        calls = mock_memory.add_dialogue_entry.call_args_list
+        mock_memory.add_dialogue_entries.assert_called()
+        args, kwargs = mock_memory.add_dialogue_entries.call_args
 
-        # Should be called twice (NPC message and player response)
-        assert len(calls) >= 2
+        # Both lines of the turn (player response, then NPC message)
+        assert len(args[1]) >= 2
 
         # Check that embeddings are enabled
-        for call in calls:
-            args, kwargs = call
-            assert kwargs.get("generate_embedding", True) == True
+        assert kwargs.get("generate_embedding", True) == True
@@ -0,0 +1,78 @@
+import asyncio
+import pytest
+from app.services.dialogue_context import StageGraph, DialogueStageMetrics
+
+
+class TestStageGraph:
+    """Test suite for the dialogue context dependency graph."""
+
+    @pytest.mark.asyncio
+    async def test_independent_stages_run_concurrently(self):
+        """Stages sharing only a dependency overlap instead of running in series."""
+        graph = StageGraph()
+
+        async def ids():
+            return "player-1"
+
+        async def lookup(player_id):
+            await asyncio.sleep(0.05)
+            return player_id
+
+        graph.add("player_id", ids)
+        graph.add("profile", lookup, ["player_id"])
+        graph.add("memories", lookup, ["player_id"])
+        graph.add("state", lookup, ["player_id"])
+
+        results = await graph.run()
+
+        assert results["memories"] == "player-1"
+        total = max(t["start_ms"] + t["duration_ms"] for t in graph.timings.values())
+        assert total < 140  # Three 50ms lookups in series would take 150ms+
+
+    @pytest.mark.asyncio
+    async def test_critical_path_follows_slowest_chain(self):
+        """The critical path walks back through the slowest dependency."""
+        graph = StageGraph()
+
+        async def wait(delay, *_):
+            await asyncio.sleep(delay)
+
+        graph.add("player_id", lambda: wait(0.0))
+        graph.add("npc_id", lambda: wait(0.03))
+        graph.add("profile", lambda *a: wait(0.0, *a), ["player_id", "npc_id"])
+        graph.add("insight", lambda *a: wait(0.03, *a), ["profile"])
+        graph.add("memories", lambda *a: wait(0.0, *a), ["player_id"])
+
+        await graph.run()
+
+        assert graph.critical_path() == ["npc_id", "profile", "insight"]
+
+        metrics = DialogueStageMetrics()
+        metrics.record(graph)
+        snapshot = metrics.snapshot()
+        assert snapshot["stages"]["insight"]["on_critical_path"] == 1
+        assert snapshot["stages"]["memories"]["on_critical_path"] == 0
+
+    @pytest.mark.asyncio
+    async def test_failure_cancels_remaining_stages(self):
+        """A failing stage is raised and its dependents never run."""
+        graph = StageGraph()
+        ran = []
+
+        async def fail():
+            raise RuntimeError("db down")
+
+        async def dependent(_):
+            ran.append("dependent")
+
+        graph.add("player_id", fail)
+        graph.add("profile", dependent, ["player_id"])
+
+        with pytest.raises(RuntimeError):
+            await graph.run()
+        assert ran == []
+
+    def test_unknown_dependency_rejected(self):
+        graph = StageGraph()
+        with pytest.raises(ValueError):
+            graph.add("profile", lambda: None, ["player_id"])
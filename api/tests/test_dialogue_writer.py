@@ -0,0 +1,145 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import patch, AsyncMock
+from app.config import settings
+from app.services.memory.dialogue_writer import DialogueWriteBuffer
+
+
+class TestDialogueWriteBuffer:
+    """Test suite for the write-behind DialogueEntry buffer."""
+
+    @pytest.fixture(autouse=True)
+    def journal(self, tmp_path):
+        path = tmp_path / "dialogue_journal.jsonl"
+        with (
+            patch.object(settings, "dialogue_journal_path", str(path)),
+            patch.object(settings, "dialogue_write_flush_interval_ms", 20.0),
+            patch.object(settings, "dialogue_write_max_batch_rows", 50),
+        ):
+            yield path
+
+    @pytest.mark.asyncio
+    async def test_concurrent_lines_share_one_insert(self, journal):
+        """Lines written within the flush interval go out as one multi-row INSERT."""
+        writer = DialogueWriteBuffer()
+        with patch(
+            "app.services.memory.dialogue_writer.db.execute_raw",
+            new_callable=AsyncMock,
+        ) as execute:
+            await asyncio.gather(
+                writer.write("conv-1", "Abigail", "Hey there."),
+                writer.write("conv-1", "player", "Hi!", [0.1, 0.2]),
+                writer.write("conv-2", "Sam", "Yo."),
+            )
+
+        execute.assert_awaited_once()
+        sql, *params = execute.await_args.args
+        assert "ON CONFLICT (id) DO NOTHING" in sql
+        assert len(params) == 3 * 6
+        assert "[0.1,0.2]" in params
+        assert journal.read_text() == ""  # Flushed lines leave the journal
+        assert writer.get_stats()["rows_written"] == 3
+
+    @pytest.mark.asyncio
+    async def test_journal_is_replayed_on_startup(self, journal):
+        """Lines left in the journal by a crash are inserted on the next start."""
+        entry = {
+            "id": "entry-1",
+            "conversation_id": "conv-1",
+            "speaker": "Abigail",
+            "message": "Where was I?",
+            "embedding": None,
+            "timestamp": "2026-10-19T08:00:00",
+        }
+        journal.write_text(json.dumps(entry) + "\n" + '{"id": "torn')
+
+        writer = DialogueWriteBuffer()
+        with patch(
+            "app.services.memory.dialogue_writer.db.execute_raw",
+            new_callable=AsyncMock,
+        ) as execute:
+            await writer.replay_journal()
+
+        params = execute.await_args.args[1:]
+        assert params[0] == "entry-1"
+        assert writer.get_stats()["replayed"] == 1
+        assert journal.read_text() == ""
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_keeps_lines(self, journal):
+        """A failed INSERT keeps the lines buffered and journaled for a retry."""
+        writer = DialogueWriteBuffer()
+        execute = AsyncMock(side_effect=[Exception("connection reset"), None])
+        with patch("app.services.memory.dialogue_writer.db.execute_raw", execute):
+            await asyncio.wait_for(writer.write("conv-1", "Abigail", "Hello?"), 2.0)
+
+        assert execute.await_count == 2
+        stats = writer.get_stats()
+        assert stats["failed_flushes"] == 1
+        assert stats["rows_written"] == 1
+
+    @pytest.mark.asyncio
+    async def test_turn_lines_share_a_flush_in_order(self, journal):
+        """A turn's lines are buffered together and keep their order."""
+        writer = DialogueWriteBuffer()
+        with patch(
+            "app.services.memory.dialogue_writer.db.execute_raw",
+            new_callable=AsyncMock,
+        ) as execute:
+            await writer.write_lines(
+                "conv-1", [("player", "Hi!", None), ("Abigail", "Oh, hey.", None)]
+            )
+
+        execute.assert_awaited_once()
+        params = execute.await_args.args[1:]
+        speakers, timestamps = params[2::6], params[5::6]
+        assert list(speakers) == ["player", "Abigail"]
+        assert timestamps[0] < timestamps[1]
+
+    @pytest.mark.asyncio
+    async def test_wait_for_flush_is_bounded(self, journal):
+        """A database that keeps failing does not hold writers forever."""
+        writer = DialogueWriteBuffer()
+        execute = AsyncMock(side_effect=Exception("connection refused"))
+        with (
+            patch.object(settings, "dialogue_write_wait_timeout_seconds", 0.05),
+            patch("app.services.memory.dialogue_writer.db.execute_raw", execute),
+        ):
+            await asyncio.wait_for(writer.write("conv-1", "Abigail", "Hello?"), 2.0)
+
+        stats = writer.get_stats()
+        assert stats["timed_out_waits"] == 1
+        assert stats["buffered"] == 1
+        assert "Hello?" in journal.read_text()
+
+    @pytest.mark.asyncio
+    async def test_full_buffer_spills_to_the_journal(self, journal):
+        """While the database is down, lines past the memory bound are only journaled."""
+        writer = DialogueWriteBuffer()
+        database_down = True
+
+        async def execute(*args):
+            if database_down:
+                raise Exception("connection refused")
+
+        with (
+            patch.object(settings, "dialogue_write_wait_timeout_seconds", 0.05),
+            patch.object(settings, "dialogue_write_buffer_max_lines", 2),
+            patch("app.services.memory.dialogue_writer.db.execute_raw", execute),
+        ):
+            await writer.write("conv-1", "Abigail", "One.")
+            await writer.write("conv-1", "Abigail", "Two.")
+            await asyncio.wait_for(writer.write("conv-1", "Abigail", "Three."), 0.05)
+
+            stats = writer.get_stats()
+            assert stats["buffered"] == 2 and stats["spilled"] == 1
+            assert "Three." in journal.read_text()
+
+            database_down = False
+            await writer.flush()
+
+        stats = writer.get_stats()
+        assert stats["rows_written"] == 3
+        assert stats["buffered"] == 0 and stats["spilled"] == 0
+        assert journal.read_text() == ""
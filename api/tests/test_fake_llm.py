@@ -0,0 +1,85 @@
+import json
+import pytest
+from unittest.mock import patch
+from app.config import settings
+from app.services.fake_llm import FakeLLMProvider, FakeLLMError
+
+
+class TestFakeLLMProvider:
+    """Test suite for the deterministic fake LLM provider."""
+
+    @pytest.fixture(autouse=True)
+    def no_latency(self):
+        with (
+            patch.object(settings, "fake_llm_latency_distribution", "fixed"),
+            patch.object(settings, "fake_llm_latency_ms_mean", 0.0),
+            patch.object(settings, "fake_llm_tokens_per_second", 0.0),
+        ):
+            yield
+
+    @pytest.mark.asyncio
+    async def test_dialogue_format_is_deterministic(self):
+        """Dialogue prompts get parseable, repeatable NPC_MESSAGE/OPTION_n text."""
+        prompt = "Player: Farmer\nNPC: Abigail\nWeather: Sunny\nNPC_MESSAGE: [...]"
+        messages = [{"role": "user", "content": prompt}]
+
+        first = await FakeLLMProvider().acompletion("fake/m", messages)
+        second = await FakeLLMProvider().acompletion("fake/m", messages)
+
+        text = first.choices[0].message.content
+        assert text == second.choices[0].message.content
+        assert text.startswith("NPC_MESSAGE: ")
+        assert all(f"OPTION_{i}:" in text for i in (1, 2, 3))
+        assert first.usage.completion_tokens > 0
+
+    @pytest.mark.asyncio
+    async def test_analysis_prompt_returns_json(self):
+        """Analysis prompts get JSON with every section the analysis expects."""
+        messages = [{"role": "user", "content": "... JSON OUTPUT FORMAT ..."}]
+        response = await FakeLLMProvider().acompletion("fake/m", messages)
+
+        result = json.loads(response.choices[0].message.content)
+        assert {
+            "final_player_sentiment",
+            "memory_consolidation",
+            "emotional_state_update",
+            "personality_profile_update",
+        } <= set(result)
+
+    @pytest.mark.asyncio
+    async def test_error_injection(self):
+        """An error rate of 1.0 always fails."""
+        with patch.object(settings, "fake_llm_error_rate", 1.0):
+            with pytest.raises(FakeLLMError):
+                await FakeLLMProvider().acompletion("fake/m", [{"content": "hi"}])
+
+    @pytest.mark.asyncio
+    async def test_batched_analysis_prompt_returns_array(self):
+        """Batched analysis prompts get one result per conversation id."""
+        prompt = (
+            "### CONVERSATION_ID: conv-a\n...\n---\n"
+            "### CONVERSATION_ID: conv-b\n...\n"
+            "**JSON ARRAY OUTPUT FORMAT (Strictly Adhere to this):**"
+        )
+        response = await FakeLLMProvider().acompletion(
+            "fake/m", [{"role": "user", "content": prompt}]
+        )
+
+        results = json.loads(response.choices[0].message.content)
+        assert [r["conversation_id"] for r in results] == ["conv-a", "conv-b"]
+        assert all("emotional_state_update" in r for r in results)
+
+    @pytest.mark.asyncio
+    async def test_stream_yields_the_same_text(self):
+        """Streamed chunks add up to the non-streamed reply; the last carries usage."""
+        prompt = "Player: Farmer\nNPC: Abigail\nWeather: Sunny\nNPC_MESSAGE: [...]"
+        messages = [{"role": "user", "content": prompt}]
+
+        response = await FakeLLMProvider().acompletion("fake/m", messages)
+        stream = await FakeLLMProvider().acompletion("fake/m", messages, stream=True)
+        chunks = [chunk async for chunk in stream]
+
+        text = "".join(chunk.choices[0].delta.content or "" for chunk in chunks)
+        assert text == response.choices[0].message.content
+        assert len(chunks) > 2
+        assert chunks[-1].usage.completion_tokens == response.usage.completion_tokens
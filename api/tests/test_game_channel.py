@@ -0,0 +1,161 @@
+import asyncio
+import pytest
+from unittest.mock import patch, AsyncMock
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from app.config import settings
+from app.models.request import DialogueResponse
+from app.routers import websocket_router
+from app.websockets.game_channel import GameChannel
+
+
+def dialogue_payload(npc_name: str, player_name: str = "Farmer"):
+    return {
+        "npc_name": npc_name,
+        "npc_location": "Town",
+        "player_name": player_name,
+        "friendship_hearts": 2,
+        "season": "Spring",
+        "day_of_month": 5,
+        "day_of_week": 5,
+        "time_of_day": 900,
+        "year": 1,
+        "weather": "sunny",
+        "player_location": "Town",
+        "player_response": "Hi!",
+    }
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(websocket_router.router)
+    with patch.object(settings, "player_rate_limit_enabled", False):
+        yield TestClient(app)
+
+
+def receive_until_done(websocket, count: int):
+    """Reply frames, in arrival order, until `count` requests are done."""
+    frames = []
+    while count:
+        frame = websocket.receive_json()
+        frames.append(frame)
+        if frame.get("done"):
+            count -= 1
+    return frames
+
+
+class TestGameChannelEndpoint:
+    """Test suite for the /ws/game channel."""
+
+    def test_dialogue_requests_are_multiplexed(self, client):
+        """A slow turn does not hold back a later one; replies carry their ids."""
+
+        async def answer(request, idempotency_key=None):
+            if request.npc_name == "Abigail":
+                await asyncio.sleep(0.2)
+            return DialogueResponse(
+                npc_message=f"Hi from {request.npc_name}",
+                response_options=["a", "b", "c"],
+            )
+
+        with (
+            patch.object(
+                websocket_router.dialogue, "answer_dialogue", side_effect=answer
+            ),
+            client.websocket_connect("/ws/game?player_name=Farmer") as websocket,
+        ):
+            assert websocket.receive_json()["type"] == "connection_confirmed"
+            websocket.send_json(
+                {"id": 1, "type": "dialogue", "payload": dialogue_payload("Abigail")}
+            )
+            websocket.send_json(
+                {"id": 2, "type": "dialogue", "payload": dialogue_payload("Shane")}
+            )
+            frames = receive_until_done(websocket, 2)
+
+        assert [frame["id"] for frame in frames] == [2, 1]
+        assert frames[1]["result"]["npc_message"] == "Hi from Abigail"
+
+    def test_errors_are_reported_per_request(self, client):
+        async def rate_limited(request, idempotency_key=None):
+            raise HTTPException(status_code=429, detail="Too many dialogue requests")
+
+        with (
+            patch.object(
+                websocket_router.dialogue, "answer_dialogue", side_effect=rate_limited
+            ),
+            client.websocket_connect("/ws/game?player_name=Farmer") as websocket,
+        ):
+            websocket.receive_json()
+            websocket.send_json({"id": "a", "type": "dance", "payload": {}})
+            websocket.send_json({"id": "b", "type": "dialogue", "payload": {}})
+            websocket.send_json(
+                {
+                    "id": "c",
+                    "type": "dialogue",
+                    "payload": dialogue_payload("Abigail", player_name="Someone"),
+                }
+            )
+            websocket.send_json(
+                {"id": "d", "type": "dialogue", "payload": dialogue_payload("Abigail")}
+            )
+            websocket.send_text("not json")
+            frames = receive_until_done(websocket, 5)
+
+        statuses = {frame["id"]: frame["error"]["status"] for frame in frames}
+        assert statuses == {"a": 400, "b": 422, "c": 403, "d": 429, None: 400}
+
+    def test_end_conversation_is_acknowledged(self, client):
+        with (
+            patch.object(
+                websocket_router.dialogue,
+                "close_conversation",
+                new_callable=AsyncMock,
+                return_value="conv-1",
+            ),
+            patch.object(
+                websocket_router.analysis_batcher, "submit", new_callable=AsyncMock
+            ) as submit,
+            client.websocket_connect("/ws/game?player_name=Farmer") as websocket,
+        ):
+            websocket.receive_json()
+            websocket.send_json(
+                {
+                    "id": 7,
+                    "type": "end_conversation",
+                    "payload": {"player_name": "Farmer", "npc_name": "Abigail"},
+                }
+            )
+            frame = websocket.receive_json()
+            websocket.send_text("ping")
+            assert websocket.receive_text() == "pong"
+
+        assert frame == {
+            "id": 7,
+            "type": "end_conversation",
+            "result": {"conversation_id": "conv-1"},
+            "done": True,
+        }
+        submit.assert_awaited_once_with("conv-1")
+
+
+class TestGameChannel:
+    """Test suite for the game connection registry."""
+
+    @pytest.mark.asyncio
+    async def test_push_reaches_only_the_players_connections(self):
+        channel = GameChannel()
+        farmer_socket, other_socket = AsyncMock(), AsyncMock()
+        farmer = await channel.connect(farmer_socket, "Farmer")
+        await channel.connect(other_socket, "Other")
+
+        delivered = await channel.push("Farmer", {"type": "opening_ready"})
+
+        assert delivered == 1
+        assert farmer_socket.send_text.await_count == 2  # confirmation + push
+        assert other_socket.send_text.await_count == 1
+
+        await channel.disconnect(farmer)
+        assert await channel.push("Farmer", {"type": "opening_ready"}) == 0
+        assert channel.get_stats()["players"] == 1
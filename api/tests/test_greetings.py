@@ -0,0 +1,125 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import patch, AsyncMock
+from fastapi import HTTPException
+from app.config import settings
+from app.models.request import DialogueResponse, GreetingBatchRequest
+from app.routers import dialogue
+from app.services.dialogue_context import prefetch_relationship_contexts
+
+
+def make_batch(*npc_names: str) -> GreetingBatchRequest:
+    return GreetingBatchRequest(
+        player_name="Farmer",
+        season="Spring",
+        day_of_month=5,
+        day_of_week=5,
+        time_of_day=1900,
+        year=1,
+        weather="sunny",
+        player_location="Saloon",
+        npcs=[
+            {"npc_name": name, "npc_location": "Saloon", "friendship_hearts": i}
+            for i, name in enumerate(npc_names)
+        ],
+    )
+
+
+def relationship_row(npc_id: str):
+    return {
+        "player_id": "player-1",
+        "npc_id": npc_id,
+        "personality_profile": {"summary": "Seems nice."},
+        "emotional_state": None,
+        "conversation_id": f"conv-{npc_id}",
+        "templates_version": 0,
+    }
+
+
+async def read_stream(response):
+    return [json.loads(line) async for line in response.body_iterator]
+
+
+class TestGreetingBatch:
+    """Test suite for /generate_greetings."""
+
+    @pytest.fixture(autouse=True)
+    def no_rate_limit(self):
+        with patch.object(settings, "player_rate_limit_enabled", False):
+            yield
+
+    @pytest.mark.asyncio
+    async def test_prefetch_primes_each_context_from_one_lookup(self):
+        batch = make_batch("Abigail", "Shane")
+        requests = [batch.dialogue_request(target) for target in batch.npcs]
+
+        with (
+            patch(
+                "app.services.dialogue_context.memory_service.get_relationship_contexts",
+                new_callable=AsyncMock,
+                return_value={"Abigail": relationship_row("npc-1")},
+            ) as bulk,
+            patch(
+                "app.services.dialogue_context.memory_service.get_or_create_player",
+                new_callable=AsyncMock,
+                return_value="player-1",
+            ) as player,
+        ):
+            contexts = await prefetch_relationship_contexts(requests)
+
+        bulk.assert_awaited_once()
+        assert [t[2]["friendship_hearts"] for t in bulk.await_args.args[1]] == [0, 1]
+        player.assert_awaited_once()
+        abigail, shane = contexts
+        assert await abigail.get_or_load(("npc", "Abigail"), AsyncMock()) == "npc-1"
+        assert await shane.get_or_load(("player", "Farmer"), AsyncMock()) == "player-1"
+        assert shane.get_stats()["keys"] == 1
+
+    @pytest.mark.asyncio
+    async def test_streams_results_as_they_complete(self):
+        """Slow NPCs do not hold back the others; failures become error lines."""
+        batch = make_batch("Abigail", "Shane", "Emily", "Abigail")
+        running = 0
+        peak = 0
+
+        async def pipeline(request, ctx):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.05 if request.npc_name == "Abigail" else 0.01)
+            running -= 1
+            if request.npc_name == "Emily":
+                raise HTTPException(status_code=500, detail="boom")
+            return DialogueResponse(
+                npc_message=f"Hi from {request.npc_name}",
+                response_options=["a", "b", "c"],
+            )
+
+        with (
+            patch.object(settings, "greeting_batch_concurrency", 2),
+            patch.object(
+                dialogue,
+                "prefetch_relationship_contexts",
+                new_callable=AsyncMock,
+                side_effect=lambda requests: [None] * len(requests),
+            ),
+            patch.object(dialogue, "run_dialogue_pipeline", side_effect=pipeline),
+        ):
+            response = await dialogue.generate_greetings(batch)
+            lines = await read_stream(response)
+
+        assert response.media_type == "application/x-ndjson"
+        assert peak == 2
+        assert [line["npc_name"] for line in lines][-1] == "Abigail"
+        assert len(lines) == 3
+        by_npc = {line["npc_name"]: line for line in lines}
+        assert by_npc["Emily"] == {"npc_name": "Emily", "error": "boom"}
+        assert by_npc["Shane"]["response"]["npc_message"] == "Hi from Shane"
+
+    @pytest.mark.asyncio
+    async def test_rejects_oversized_batches(self):
+        with patch.object(settings, "greeting_batch_max_npcs", 1):
+            with pytest.raises(HTTPException) as error:
+                await dialogue.generate_greetings(make_batch("Abigail", "Shane"))
+        assert error.value.status_code == 400
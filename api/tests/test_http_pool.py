@@ -0,0 +1,74 @@
+import asyncio
+import httpx
+import pytest
+from unittest.mock import patch
+from app.config import settings
+from app.services.http_pool import HostLimitedTransport
+from app.services.llm_service import LLMService
+
+
+class TestHTTPPool:
+    """Test suite for the shared LLM HTTP transport."""
+
+    @pytest.mark.asyncio
+    async def test_per_host_limit_and_stats(self):
+        """Concurrent requests to one host never exceed the per-host limit."""
+
+        class SlowStream(httpx.AsyncByteStream):
+            async def __aiter__(self):
+                await asyncio.sleep(0.01)
+                yield b"ok"
+
+        transport = HostLimitedTransport(per_host_limit=2)
+        transport._transport = httpx.MockTransport(
+            lambda request: httpx.Response(200, stream=SlowStream())
+        )
+
+        async with httpx.AsyncClient(transport=transport) as client:
+            responses = await asyncio.gather(
+                *(client.get("http://ollama:11434/api/chat") for _ in range(5))
+            )
+
+        assert all(r.text == "ok" for r in responses)
+        host = transport.get_stats()["hosts"]["http://ollama:11434"]
+        assert host["requests"] == 5
+        assert host["peak_in_flight"] == 2
+        assert host["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_ollama_calls_go_through_the_pool(self):
+        """Non-OpenAI providers get the pooled client as their LiteLLM handler."""
+        service = LLMService()
+        await service.startup()
+        seen = []
+
+        def ollama(request):
+            seen.append(request.url.path)
+            return httpx.Response(
+                200,
+                json={
+                    "model": "llama3",
+                    "response": "Hello there!",
+                    "done": True,
+                    "prompt_eval_count": 3,
+                    "eval_count": 2,
+                },
+            )
+
+        service.http_client._transport._transport = httpx.MockTransport(ollama)
+        try:
+            with (
+                patch.object(settings, "LLM_PROVIDER", "ollama"),
+                patch.object(settings, "ollama_api_base_url", "http://ollama:11434"),
+                patch.object(settings, "llm_call_site_routes", {}),
+            ):
+                response = await service.acompletion(
+                    "llama3", [{"role": "user", "content": "Hi"}]
+                )
+            stats = service.get_http_pool_stats()
+        finally:
+            await service.shutdown()
+
+        assert response.choices[0].message.content == "Hello there!"
+        assert seen == ["/api/generate"]
+        assert stats["hosts"]["http://ollama:11434"]["requests"] == 1
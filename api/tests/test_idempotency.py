@@ -0,0 +1,124 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from app.config import settings
+from app.models.request import DialogueRequest
+from app.services.idempotency import (
+    ReplayCache,
+    request_hash,
+    dialogue_idempotency_key,
+)
+
+
+def make_request(**overrides):
+    fields = {
+        "npc_name": "Abigail",
+        "npc_location": "Town",
+        "player_name": "Farmer",
+        "friendship_hearts": 4,
+        "season": "Spring",
+        "day_of_month": 3,
+        "day_of_week": 2,
+        "time_of_day": 900,
+        "year": 1,
+        "weather": "sunny",
+        "player_location": "Town",
+        "language": "en",
+    }
+    fields.update(overrides)
+    return DialogueRequest(**fields)
+
+
+class TestReplayCache:
+    """Test suite for the duplicate-request replay cache."""
+
+    @pytest.mark.asyncio
+    async def test_in_flight_duplicate_awaits_first_call(self):
+        """A duplicate arriving mid-flight shares the running call's result."""
+        cache = ReplayCache()
+        calls = []
+
+        async def handler():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"npc_message": "Hi!"}
+
+        first, second = await asyncio.gather(
+            cache.run("k", handler), cache.run("k", handler)
+        )
+
+        assert first is second
+        assert len(calls) == 1
+        assert cache.get_stats()["joined_in_flight"] == 1
+
+    @pytest.mark.asyncio
+    async def test_completed_result_replayed_until_ttl(self):
+        cache = ReplayCache()
+        calls = []
+
+        async def handler():
+            calls.append(1)
+            return len(calls)
+
+        assert await cache.run("k", handler) == 1
+        assert await cache.run("k", handler) == 1
+        assert cache.get_stats()["replayed"] == 1
+
+        with patch.object(settings, "idempotency_ttl_seconds", 0.0):
+            assert await cache.run("expiring", handler) == 2
+            assert await cache.run("expiring", handler) == 3
+
+    @pytest.mark.asyncio
+    async def test_failures_are_not_stored(self):
+        """A retry after an error runs the handler again."""
+        cache = ReplayCache()
+        outcomes = [RuntimeError("LLM timeout"), "recovered"]
+
+        async def handler():
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        with pytest.raises(RuntimeError):
+            await cache.run("k", handler)
+        assert await cache.run("k", handler) == "recovered"
+
+    @pytest.mark.asyncio
+    async def test_forget_drops_only_the_scope(self):
+        """Ending a conversation stops its replies from being replayed."""
+        cache = ReplayCache()
+        calls = []
+
+        async def handler():
+            calls.append(1)
+            return len(calls)
+
+        await cache.run("abigail-turn", handler, scope=("Farmer", "Abigail"))
+        await cache.run("shane-turn", handler, scope=("Farmer", "Shane"))
+
+        assert cache.forget(("Farmer", "Abigail")) == 1
+        assert await cache.run("abigail-turn", handler) == 3
+        assert await cache.run("shane-turn", handler) == 2
+
+
+class TestDialogueIdempotencyKey:
+    def test_identical_bodies_share_a_hash(self):
+        assert request_hash(make_request()) == request_hash(make_request())
+        assert request_hash(make_request()) != request_hash(
+            make_request(player_response="Hello!")
+        )
+
+    def test_client_key_is_scoped_to_the_player(self):
+        """The same client key from two players does not collide."""
+        first = dialogue_idempotency_key(make_request(), "retry-1")
+        second = dialogue_idempotency_key(make_request(player_name="Other"), "retry-1")
+
+        assert first != second
+        assert dialogue_idempotency_key(make_request(), "retry-1")[0] == "key"
+
+    def test_opening_turns_are_not_hash_keyed(self):
+        """Reopening an NPC sends the same body, so openings need a client key."""
+        assert dialogue_idempotency_key(make_request(), None) is None
+        reply = make_request(player_response="Hello!")
+        assert dialogue_idempotency_key(reply, None)[0] == "hash"
@@ -0,0 +1,155 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+import litellm
+from app.config import settings
+from app.services.llm_circuit import CircuitBreaker, CircuitOpenError
+from app.services.llm_service import LLMService
+
+
+def _response(content: str) -> litellm.ModelResponse:
+    return litellm.ModelResponse(
+        choices=[{"index": 0, "message": {"role": "assistant", "content": content}}]
+    )
+
+
+class TestCircuitBreaker:
+    """Test suite for the per provider/model circuit breaker."""
+
+    @pytest.fixture(autouse=True)
+    def thresholds(self):
+        with (
+            patch.object(settings, "llm_circuit_min_calls", 4),
+            patch.object(settings, "llm_circuit_failure_rate", 0.5),
+            patch.object(settings, "llm_circuit_consecutive_timeouts", 2),
+            patch.object(settings, "llm_circuit_open_seconds", 30.0),
+            patch.object(settings, "llm_circuit_half_open_max_calls", 1),
+        ):
+            yield
+
+    def test_opens_on_failure_rate(self):
+        breaker = CircuitBreaker("openai", "gpt")
+        for failed in (False, True, False, True):
+            breaker.before_call()
+            if failed:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+
+        assert breaker.state == "open"
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        assert breaker.rejected == 1
+
+    def test_opens_on_consecutive_timeouts(self):
+        breaker = CircuitBreaker("openai", "gpt")
+        breaker.before_call()
+        breaker.record_failure(timeout=True)
+        assert breaker.state == "closed"
+        breaker.before_call()
+        breaker.record_failure(timeout=True)
+        assert breaker.state == "open"
+
+    def test_half_open_probe_closes_or_reopens(self):
+        breaker = CircuitBreaker("openai", "gpt")
+        breaker.before_call()
+        breaker.record_failure(timeout=True)
+        breaker.before_call()
+        breaker.record_failure(timeout=True)
+
+        with patch.object(settings, "llm_circuit_open_seconds", 0.0):
+            probe = breaker.before_call()
+            assert probe and breaker.state == "half_open"
+            # Only one trial at a time
+            with pytest.raises(CircuitOpenError):
+                breaker.before_call()
+            breaker.record_failure(probe=probe)
+            assert breaker.state == "open"
+
+            probe = breaker.before_call()
+            breaker.record_success(probe)
+        assert breaker.state == "closed"
+        assert breaker.before_call() is False
+
+
+class TestLLMServiceCircuit:
+    """Test suite for circuit breaking in LLMService calls."""
+
+    @pytest.fixture(autouse=True)
+    def thresholds(self):
+        # Calls must reach litellm.acompletion, which the fake provider bypasses
+        with (
+            patch.object(settings, "LLM_PROVIDER", "openai"),
+            patch.object(settings, "llm_circuit_enabled", True),
+            patch.object(settings, "llm_call_site_routes", {}),
+            patch.object(settings, "llm_circuit_consecutive_timeouts", 2),
+            patch.object(settings, "llm_call_timeout_seconds", 0.05),
+        ):
+            yield
+
+    @pytest.mark.asyncio
+    async def test_hanging_provider_fails_fast_once_open(self):
+        """Timeouts open the breaker; later calls do not reach the provider."""
+        service = LLMService()
+        calls = []
+
+        async def hanging_acompletion(model, messages, **kwargs):
+            calls.append(model)
+            await asyncio.sleep(10)
+
+        with patch(
+            "app.services.llm_service.litellm.acompletion",
+            side_effect=hanging_acompletion,
+        ):
+            for _ in range(2):
+                with pytest.raises(TimeoutError):
+                    await service.acompletion(model="gpt", messages=[])
+            assert service.is_unavailable("dialogue", "gpt")
+
+            with pytest.raises(CircuitOpenError):
+                await service.acompletion(model="gpt", messages=[])
+
+        assert len(calls) == 2
+        stats = service.circuits.get_stats()["breakers"][
+            f"{settings.LLM_PROVIDER}/gpt"
+        ]
+        assert stats["timeouts"] == 2 and stats["rejected"] == 1
+
+    @pytest.mark.asyncio
+    async def test_bad_requests_do_not_trip_the_breaker(self):
+        service = LLMService()
+        error = litellm.BadRequestError(
+            message="bad", model="gpt", llm_provider="openai"
+        )
+
+        with patch(
+            "app.services.llm_service.litellm.acompletion", side_effect=error
+        ):
+            for _ in range(settings.llm_circuit_min_calls + 1):
+                with pytest.raises(litellm.BadRequestError):
+                    await service.acompletion(model="gpt", messages=[])
+
+        assert not service.is_unavailable("dialogue", "gpt")
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_skips_to_next_tier(self):
+        """A routed call site falls back to a tier whose circuit is closed."""
+        service = LLMService()
+        tiers = {"small": {"provider": "ollama", "model": "tiny"}}
+        service.circuits.breaker("ollama", "tiny")._open()
+
+        with (
+            patch.object(settings, "llm_model_tiers", tiers),
+            patch.object(settings, "llm_call_site_routes", {"dialogue": ["small"]}),
+            patch(
+                "app.services.llm_service.litellm.acompletion",
+                return_value=_response("hi"),
+            ) as acompletion,
+        ):
+            assert not service.is_unavailable("dialogue", "gpt")
+            response = await service.acompletion(
+                model="gpt", messages=[], call_site="dialogue"
+            )
+
+        assert response.choices[0].message.content == "hi"
+        assert acompletion.call_count == 1
@@ -0,0 +1,67 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from app.config import settings
+from app.services.llm_service import LLMService
+
+
+class TestLLMHedging:
+    """Test suite for hedged LLM completions."""
+
+    @pytest.fixture(autouse=True)
+    def provider(self):
+        # Calls must reach litellm.acompletion, which the fake provider bypasses
+        with (
+            patch.object(settings, "LLM_PROVIDER", "openai"),
+            patch.object(settings, "llm_call_site_routes", {}),
+        ):
+            yield
+
+    @pytest.mark.asyncio
+    async def test_slow_primary_is_hedged(self):
+        """A hedge to the secondary model wins when the primary is slow."""
+        service = LLMService()
+
+        async def fake_acompletion(model, messages, **kwargs):
+            await asyncio.sleep(0.5 if model.endswith("slow-model") else 0.01)
+            return model
+
+        with (
+            patch.object(settings, "llm_hedging_enabled", True),
+            patch.object(settings, "llm_hedge_model", "fast-model"),
+            patch.object(settings, "llm_hedge_default_delay_seconds", 0.02),
+            patch(
+                "app.services.llm_service.litellm.acompletion",
+                side_effect=fake_acompletion,
+            ),
+        ):
+            result = await service.acompletion(
+                model="slow-model", messages=[], latency_budget=2.0
+            )
+
+        assert result.endswith("fast-model")
+        await asyncio.sleep(0.01)  # Let the cancelled primary unwind
+        stats = service.hedge_tracker.get_stats()["slow-model"]
+        assert stats["hedged"] == 1
+        assert stats["win_rate"] == 1.0
+        # The cancelled primary still counts as a (lower bound) latency sample
+        assert stats["p50_latency_ms"] >= 20
+
+    @pytest.mark.asyncio
+    async def test_fast_primary_is_not_hedged(self):
+        """No hedge is sent when the primary answers within the delay."""
+        service = LLMService()
+
+        async def fake_acompletion(model, messages, **kwargs):
+            return model
+
+        with (
+            patch.object(settings, "llm_hedging_enabled", True),
+            patch(
+                "app.services.llm_service.litellm.acompletion",
+                side_effect=fake_acompletion,
+            ),
+        ):
+            await service.acompletion(model="m", messages=[], latency_budget=2.0)
+
+        assert service.hedge_tracker.get_stats()["m"]["hedged"] == 0
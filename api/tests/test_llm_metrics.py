@@ -0,0 +1,90 @@
+import pytest
+from unittest.mock import Mock, patch
+from app.config import settings
+from app.services.llm_metrics import LLMMetrics, RollingHistogram
+from app.services.llm_service import LLMService
+
+
+class TestLLMMetrics:
+    """Test suite for per-call-site LLM metrics."""
+
+    def test_record_aggregates_by_call_site(self):
+        """Usage and wall time are aggregated per call-site label."""
+        metrics = LLMMetrics()
+        response = Mock()
+        response.usage.prompt_tokens = 120
+        response.usage.completion_tokens = 30
+
+        metrics.record("dialogue", "gemini-pro", 0.8, response=response)
+        metrics.record("dialogue", "gemini-pro", 1.2, response=response)
+        metrics.record("analysis", "gemini-pro", 3.0, error=True)
+
+        snapshot = metrics.snapshot()["call_sites"]
+        assert snapshot["dialogue"]["calls"] == 2
+        assert snapshot["dialogue"]["total_prompt_tokens"] == 240
+        assert snapshot["dialogue"]["wall_time_ms"]["count"] == 2
+        assert snapshot["analysis"]["errors"] == 1
+
+    def test_histogram_buckets(self):
+        """Values fall into the first bucket that contains them."""
+        histogram = RollingHistogram(60, [100, 1000])
+        for value in (50, 500, 5000):
+            histogram.observe(value)
+
+        snapshot = histogram.snapshot()
+        assert snapshot["buckets"] == {"le_100": 1, "le_1000": 1, "le_inf": 1}
+        assert snapshot["count"] == 3
+
+    @pytest.mark.asyncio
+    async def test_stream_holds_its_scheduler_slot_until_closed(self):
+        """A streaming call counts against the provider limit until it is read."""
+        service = LLMService()
+        prompt = "Player: Farmer\nNPC: Abigail\nNPC_MESSAGE:"
+        messages = [{"role": "user", "content": prompt}]
+
+        with (
+            patch.object(settings, "LLM_PROVIDER", "fake"),
+            patch.object(settings, "llm_call_site_routes", {}),
+            patch.object(settings, "fake_llm_latency_distribution", "fixed"),
+            patch.object(settings, "fake_llm_latency_ms_mean", 0.0),
+            patch.object(settings, "fake_llm_tokens_per_second", 0.0),
+        ):
+            stream = await service.acompletion("m", messages, stream=True)
+            provider = service.scheduler.for_provider("fake")
+            assert provider.active == 1
+
+            chunks = [chunk async for chunk in stream]
+            text = "".join(chunk.choices[0].delta.content or "" for chunk in chunks)
+            assert text.startswith("NPC_MESSAGE:")
+            assert provider.active == 0
+
+            # Leaving the stream early releases the slot as well
+            stream = await service.acompletion("m", messages, stream=True)
+            async for _ in stream:
+                break
+            await stream.aclose()
+            assert provider.active == 0
+
+    @pytest.mark.asyncio
+    async def test_embedding_calls_are_recorded(self):
+        """Embeddings show up under their own call site, errors included."""
+        service = LLMService()
+        metrics = LLMMetrics()
+
+        with (
+            patch("app.services.llm_service.llm_metrics", metrics),
+            patch.object(settings, "LLM_PROVIDER", "fake"),
+            patch.object(settings, "fake_llm_latency_distribution", "fixed"),
+            patch.object(settings, "fake_llm_latency_ms_mean", 0.0),
+        ):
+            await service.aembedding("embed", ["Hello there."])
+            with patch.object(
+                service, "_guarded_call", side_effect=RuntimeError("timeout")
+            ):
+                with pytest.raises(RuntimeError):
+                    await service.aembedding("embed", ["Hello again."])
+
+        site = metrics.snapshot()["call_sites"]["embedding"]
+        assert site["calls"] == 2
+        assert site["errors"] == 1
+        assert site["wall_time_ms"]["count"] == 2
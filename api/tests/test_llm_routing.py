@@ -0,0 +1,99 @@
+import pytest
+from unittest.mock import patch
+import litellm
+from app.config import settings
+from app.services.llm_service import LLMService
+
+
+TIERS = {
+    "small": {"provider": "ollama", "model": "tiny", "concurrency": 1},
+    "medium": {"provider": "openai", "model": "mid"},
+}
+
+
+def _response(content: str) -> litellm.ModelResponse:
+    return litellm.ModelResponse(
+        choices=[{"index": 0, "message": {"role": "assistant", "content": content}}]
+    )
+
+
+class TestLLMRouting:
+    """Test suite for call-site routing to model tiers."""
+
+    @pytest.fixture(autouse=True)
+    def routes(self):
+        # Calls must reach litellm.acompletion, which the fake provider bypasses
+        with (
+            patch.object(settings, "LLM_PROVIDER", "openai"),
+            patch.object(settings, "llm_model_tiers", TIERS),
+            patch.object(
+                settings, "llm_call_site_routes", {"classify": ["small", "medium"]}
+            ),
+        ):
+            yield
+
+    @pytest.mark.asyncio
+    async def test_routed_call_uses_first_tier(self):
+        """A routed call site goes to its first tier's provider and model."""
+        service = LLMService()
+        calls = []
+
+        async def fake_acompletion(model, messages, **kwargs):
+            calls.append(model)
+            return _response("loved")
+
+        with patch(
+            "app.services.llm_service.litellm.acompletion",
+            side_effect=fake_acompletion,
+        ):
+            response = await service.acompletion(
+                model="big", messages=[], call_site="classify"
+            )
+
+        assert calls == ["ollama/tiny"]
+        assert response.choices[0].message.content == "loved"
+        assert "ollama/small" in service.scheduler.get_stats()
+
+    @pytest.mark.asyncio
+    async def test_invalid_output_falls_back(self):
+        """Errors and rejected output move on to the next tier, then the caller's model."""
+        service = LLMService()
+        calls = []
+
+        async def fake_acompletion(model, messages, **kwargs):
+            calls.append(model)
+            if model == "ollama/tiny":
+                raise RuntimeError("model not loaded")
+            return _response("I think they'd like it!" if model == "openai/mid" else "liked")
+
+        with patch(
+            "app.services.llm_service.litellm.acompletion",
+            side_effect=fake_acompletion,
+        ):
+            response = await service.acompletion(
+                model="big",
+                messages=[],
+                call_site="classify",
+                validator=lambda text: text.strip() in ("loved", "liked"),
+            )
+
+        assert calls == ["ollama/tiny", "openai/mid", service._get_model_string("big")]
+        assert response.choices[0].message.content == "liked"
+
+    @pytest.mark.asyncio
+    async def test_unrouted_call_site_uses_model(self):
+        """Call sites without a route keep using the caller's model."""
+        service = LLMService()
+
+        async def fake_acompletion(model, messages, **kwargs):
+            return _response(model)
+
+        with patch(
+            "app.services.llm_service.litellm.acompletion",
+            side_effect=fake_acompletion,
+        ):
+            response = await service.acompletion(
+                model="big", messages=[], call_site="dialogue"
+            )
+
+        assert response.choices[0].message.content == service._get_model_string("big")
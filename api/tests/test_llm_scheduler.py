@@ -0,0 +1,83 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from app.config import settings
+from app.services.llm_scheduler import (
+    LLMScheduler,
+    ProviderScheduler,
+    LLMPriority,
+    TokenBucket,
+)
+
+
+class TestLLMScheduler:
+    """Test suite for the priority-aware LLM scheduler."""
+
+    @pytest.mark.asyncio
+    async def test_interactive_jumps_queued_background(self):
+        """Interactive calls are granted before background calls queued earlier."""
+        scheduler = ProviderScheduler("test", max_concurrency=1, rate=0, burst=1)
+        order = []
+
+        async def call(name, priority):
+            await scheduler.acquire(priority)
+            order.append(name)
+            await asyncio.sleep(0)
+            scheduler.release()
+
+        await scheduler.acquire(LLMPriority.BACKGROUND)  # Occupy the only slot
+        tasks = [
+            asyncio.create_task(call("bg-1", LLMPriority.BACKGROUND)),
+            asyncio.create_task(call("bg-2", LLMPriority.BACKGROUND)),
+        ]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(call("live", LLMPriority.INTERACTIVE)))
+        await asyncio.sleep(0)
+
+        stats = scheduler.get_stats()["classes"]
+        assert stats["background"]["queue_depth"] == 2
+        assert stats["interactive"]["queue_depth"] == 1
+
+        scheduler.release()
+        await asyncio.gather(*tasks)
+
+        assert order == ["live", "bg-1", "bg-2"]
+        assert scheduler.active == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_leaves_queue(self):
+        """A cancelled waiter does not hold a slot or count as queued."""
+        scheduler = ProviderScheduler("test", max_concurrency=1, rate=0, burst=1)
+        await scheduler.acquire(LLMPriority.INTERACTIVE)
+
+        waiter = asyncio.create_task(scheduler.acquire(LLMPriority.BACKGROUND))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        scheduler.release()
+        assert scheduler.active == 0
+        assert scheduler.get_stats()["classes"]["background"]["queue_depth"] == 0
+
+    def test_token_bucket_reports_wait(self):
+        """An empty bucket reports how long until the next token."""
+        bucket = TokenBucket(rate=2.0, capacity=1.0)
+        assert bucket.try_acquire() == 0.0
+        wait = bucket.try_acquire()
+        assert 0.0 < wait <= 0.5
+
+    def test_tiers_share_the_provider_rate_limit(self):
+        """Each tier has its own concurrency but draws from one token bucket."""
+        with (
+            patch.object(settings, "llm_provider_rate_limits", {"openai": 1.0}),
+            patch.object(settings, "llm_rate_limit_burst", 1.0),
+        ):
+            scheduler = LLMScheduler()
+            fast = scheduler.for_provider("openai", "fast", max_concurrency=2)
+            smart = scheduler.for_provider("openai", "smart", max_concurrency=1)
+
+        assert fast.bucket is smart.bucket is scheduler.for_provider("openai").bucket
+        assert fast.max_concurrency == 2
+        assert fast.bucket.try_acquire() == 0.0
+        assert smart.bucket.try_acquire() > 0.0
@@ -0,0 +1,127 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from app.config import settings
+from app.models.request import DialogueRequest
+from app.services.opening_pool import (
+    OpeningPool,
+    PLAYER_PLACEHOLDER,
+    friendship_band,
+    mood_bucket,
+)
+
+
+def make_request(**overrides) -> DialogueRequest:
+    fields = dict(
+        npc_name="Abigail",
+        npc_location="Town",
+        player_name="Farmer",
+        friendship_hearts=3,
+        season="Spring",
+        day_of_month=5,
+        day_of_week=5,
+        time_of_day=900,
+        year=1,
+        weather="Sun",
+        player_location="Town",
+    )
+    fields.update(overrides)
+    return DialogueRequest(**fields)
+
+
+HAPPY = {"current_mood": "HAPPY"}
+
+
+class TestOpeningPool:
+    """Test suite for the shared pool of opening lines."""
+
+    @pytest.fixture(autouse=True)
+    def pool_settings(self):
+        with (
+            patch.object(settings, "opening_pool_enabled", True),
+            patch.object(settings, "opening_pool_target_size", 2),
+            patch.object(settings, "opening_pool_max_uses", 2),
+            patch.object(settings, "opening_pool_max_age_seconds", 3600.0),
+        ):
+            yield
+
+    def test_bands_and_buckets(self):
+        assert friendship_band(0) == "stranger"
+        assert friendship_band(4) == "acquaintance"
+        assert friendship_band(10) == "close"
+        assert mood_bucket({"current_mood": "STRESSED"}) == "low"
+        assert mood_bucket(None) == "calm"
+
+    async def filled_pool(self):
+        pool = OpeningPool()
+        templates = []
+        lines = iter(range(100))
+
+        async def generate(template, emotional_state):
+            templates.append((template, emotional_state))
+            n = next(lines)
+            return (f"Hi {PLAYER_PLACEHOLDER}! ({n})", ["a", "b", f"Bye {PLAYER_PLACEHOLDER}"])
+
+        pool.start(generate)
+        assert pool.take(make_request(), HAPPY) is None
+        await asyncio.gather(*pool._tasks)
+        return pool, templates
+
+    @pytest.mark.asyncio
+    async def test_miss_refills_bucket_from_template(self):
+        pool, templates = await self.filled_pool()
+
+        template, emotional_state = templates[0]
+        assert len(templates) == 2
+        assert template.player_name == PLAYER_PLACEHOLDER
+        assert template.friendship_hearts == 3
+        assert emotional_state["current_mood"] == "HAPPY"
+        assert pool.get_stats()["lines"] == 2
+
+    @pytest.mark.asyncio
+    async def test_hit_substitutes_player_name(self):
+        pool, _ = await self.filled_pool()
+
+        opening = pool.take(make_request(player_name="Sam"), {"current_mood": "EXCITED"})
+
+        assert opening.npc_message == "Hi Sam! (0)"
+        assert opening.response_options[2] == "Bye Sam"
+        # The pooled copy keeps the placeholder for the next player
+        opening = pool.take(make_request(player_name="Max"), HAPPY)
+        assert opening.npc_message == "Hi Max! (0)"
+
+    @pytest.mark.asyncio
+    async def test_no_repeat_per_player_and_max_uses(self):
+        pool, _ = await self.filled_pool()
+
+        first = pool.take(make_request(), HAPPY)
+        second = pool.take(make_request(), HAPPY)
+        assert first.npc_message != second.npc_message
+
+        # Line 0 reached max uses on another player and is gone
+        pool.take(make_request(player_name="Sam"), HAPPY)
+        await asyncio.gather(*pool._tasks)
+        messages = [o.npc_message for o in pool._buckets[next(iter(pool._buckets))]]
+        assert "Hi [PLAYER]! (0)" not in messages
+
+    @pytest.mark.asyncio
+    async def test_other_bucket_and_expired_lines_miss(self):
+        pool, _ = await self.filled_pool()
+
+        assert pool.take(make_request(weather="Rain"), HAPPY) is None
+        assert pool.take(make_request(friendship_hearts=9), HAPPY) is None
+        with patch.object(settings, "opening_pool_max_age_seconds", 0.0):
+            assert pool.take(make_request(), HAPPY) is None
+
+    @pytest.mark.asyncio
+    async def test_generator_can_skip_refills(self):
+        pool = OpeningPool()
+
+        async def generate(template, emotional_state):
+            return None
+
+        pool.start(generate)
+        pool.take(make_request(), HAPPY)
+        await asyncio.gather(*pool._tasks)
+        assert pool.get_stats()["lines"] == 0
+        assert pool.get_stats()["refilling"] == 0
@@ -0,0 +1,53 @@
+import pytest
+from unittest.mock import patch
+from app.config import settings
+from app.services.prompt_context import ContextBuilder
+
+
+def word_count(model, text):
+    return len(text.split())
+
+
+class TestContextBuilder:
+    """Test suite for the token-budgeted dialogue context builder."""
+
+    @pytest.fixture(autouse=True)
+    def word_tokens(self):
+        with patch(
+            "app.services.prompt_context.llm_service.count_tokens",
+            side_effect=word_count,
+        ):
+            yield
+
+    def test_history_keeps_newest_turns(self):
+        """Older turns are recapped once the history budget is exhausted."""
+        with patch.object(settings, "prompt_budget_history_tokens", 30):
+            builder = ContextBuilder("model")
+            turns = [("Player", f"message number {i} with some padding words") for i in range(10)]
+            history = builder.fit_history(turns, header="")
+
+        assert history.endswith("Player: message number 9 with some padding words\n")
+        assert "message number 0 with some padding words\n" not in history
+        assert history.startswith("(Earlier, ")
+        assert builder.dropped["history_turns"] > 0
+
+    def test_memories_drop_lowest_relevance_first(self):
+        """The least relevant memory is dropped when memories exceed the budget."""
+        with patch.object(settings, "prompt_budget_memories_tokens", 14):
+            builder = ContextBuilder("model")
+            memories = [
+                (9.0, "- You once said: 'high relevance'"),
+                (1.0, "- You once said: 'low relevance'"),
+                (5.0, "- You once said: 'mid relevance'"),
+            ]
+            result = builder.fit_memories(memories, header="Memories:\n")
+
+        assert "high relevance" in result
+        assert "mid relevance" in result
+        assert "low relevance" not in result
+
+    def test_report_counts_prompt(self):
+        """The report includes the final prompt token count."""
+        builder = ContextBuilder("model")
+        report = builder.report("one two three")
+        assert report["prompt_tokens"] == 3
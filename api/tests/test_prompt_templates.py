@@ -0,0 +1,99 @@
+from unittest.mock import patch
+from app.config import settings
+from app.services.prompt_templates import (
+    PromptTemplate,
+    PromptTemplateCache,
+    PERSONALITY_TEMPLATE,
+)
+from app.services.memory.personality_service import PROFILE_METRICS
+
+
+class TestPromptTemplate:
+    """Test suite for compiled prompt templates."""
+
+    def test_render_matches_str_format(self):
+        """Rendering a compiled template gives the same text as str.format."""
+        text = "Hi {name}, trust {trust:.1f}/10. Bye {name}."
+        values = {"name": "Alex", "trust": 7.25}
+
+        assert PromptTemplate(text).render(**values) == text.format(**values)
+
+    def test_bind_prerenders_static_fields(self):
+        """Bound fields are folded into the literal text; the rest stay fields."""
+        template = PromptTemplate("You are {npc}. {instruction} Talk to {player}.")
+        bound = template.bind(npc="Leah", instruction="Respond in Spanish.")
+
+        assert bound.fields == {"player"}
+        assert bound.render(player="Sam") == (
+            "You are Leah. Respond in Spanish. Talk to Sam."
+        )
+
+    def test_personality_template_renders_every_metric(self):
+        profile = {"summary": "A kind farmer.", **{m: 5.0 for m in PROFILE_METRICS}}
+
+        rendered = PERSONALITY_TEMPLATE.render(player_name="Sam", **profile)
+
+        assert "**Your current perception of Sam:**\nA kind farmer." in rendered
+        assert rendered.count("5.0/10") == len(PROFILE_METRICS)
+
+
+class TestPromptTemplateCache:
+    """Test suite for per-NPC templates and versioned prompt fragments."""
+
+    def test_dialogue_template_compiled_once_per_npc_and_language(self):
+        cache = PromptTemplateCache()
+
+        first = cache.dialogue_template("Abigail", "es")
+        assert cache.dialogue_template("Abigail", "es") is first
+        assert cache.dialogue_template("Abigail", "en") is not first
+        assert "npc_name" not in first.fields
+        assert "language_instruction" not in first.fields
+
+        stats = cache.get_stats()
+        assert stats["template_hits"] == 1
+        assert stats["template_misses"] == 2
+
+    def test_fragment_rendered_once_until_invalidated(self):
+        """Fragments are reused until analysis invalidates the relationship."""
+        cache = PromptTemplateCache()
+        renders = []
+
+        def render():
+            renders.append(1)
+            return f"mood v{len(renders)}"
+
+        loaded = cache.current_version()
+        assert cache.fragment("mood", "player-1", "npc-1", render, loaded) == "mood v1"
+        assert cache.fragment("mood", "player-1", "npc-1", render, loaded) == "mood v1"
+        assert len(renders) == 1
+
+        cache.invalidate("player-1", "npc-1")
+        loaded = cache.current_version()
+
+        assert cache.fragment("mood", "player-1", "npc-1", render, loaded) == "mood v2"
+        assert cache.get_stats()["fragment_hits"] == 1
+
+    def test_fragment_rendered_from_stale_data_is_not_cached(self):
+        """An update between loading the state and rendering it is not masked."""
+        cache = PromptTemplateCache()
+        loaded = cache.current_version()
+        cache.invalidate("player-1", "npc-1")  # Analysis lands mid-turn
+
+        assert cache.fragment("mood", "player-1", "npc-1", lambda: "old", loaded) == "old"
+        fresh = cache.current_version()
+        assert cache.fragment("mood", "player-1", "npc-1", lambda: "new", fresh) == "new"
+        assert cache.get_stats()["stale_renders"] == 1
+
+    def test_versions_are_bounded(self):
+        """Dropped relationships still never look older than their fragments."""
+        cache = PromptTemplateCache()
+        with patch.object(settings, "prompt_version_max_relationships", 2):
+            cache.fragment("mood", "player-1", "npc-1", lambda: "v0", 0)
+            cache.invalidate("player-1", "npc-1")
+            cache.invalidate("player-1", "npc-2")
+            cache.invalidate("player-1", "npc-3")
+
+        assert cache.get_stats()["versioned_relationships"] == 2
+        assert cache.version("player-1", "npc-1") > 0
+        loaded = cache.current_version()
+        assert cache.fragment("mood", "player-1", "npc-1", lambda: "v1", loaded) == "v1"
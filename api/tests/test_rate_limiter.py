@@ -0,0 +1,99 @@
+import pytest
+from unittest.mock import patch
+from fastapi import HTTPException
+from app.config import settings
+from app.services.rate_limiter import PlayerRateLimiter
+
+
+LIMITS = {"dialogue": 1.0, "gift": 0.5, "end_conversation": 0.0}
+BURST = {"dialogue": 2.0, "gift": 1.0}
+
+
+class TestPlayerRateLimiter:
+    """Test suite for per-player token buckets."""
+
+    @pytest.fixture(autouse=True)
+    def limits(self):
+        with (
+            patch.object(settings, "player_rate_limit_enabled", True),
+            patch.object(settings, "player_rate_limits", LIMITS),
+            patch.object(settings, "player_rate_limit_burst", BURST),
+        ):
+            yield
+
+    def test_burst_then_retry_after(self):
+        """After the burst is spent the limiter reports how long to wait."""
+        limiter = PlayerRateLimiter()
+
+        assert limiter.check("Flooder", "dialogue") == 0.0
+        assert limiter.check("Flooder", "dialogue") == 0.0
+        retry_after = limiter.check("Flooder", "dialogue")
+
+        assert 0.0 < retry_after <= 1.0
+        counters = limiter.get_stats()["players"]["Flooder"]
+        assert counters == {"allowed": {"dialogue": 2}, "rejected": {"dialogue": 1}}
+
+    def test_players_and_kinds_have_separate_buckets(self):
+        limiter = PlayerRateLimiter()
+        limiter.check("Flooder", "gift")
+
+        assert limiter.check("Flooder", "gift") > 0
+        assert limiter.check("Flooder", "dialogue") == 0.0
+        assert limiter.check("Polite", "gift") == 0.0
+
+    def test_zero_rate_is_unlimited(self):
+        limiter = PlayerRateLimiter()
+
+        for _ in range(50):
+            assert limiter.check("Farmer", "end_conversation") == 0.0
+
+    def test_exhausted_bucket_raises_429(self):
+        """The endpoint helper answers 429 with a whole-second Retry-After."""
+        from app.routers.dialogue import enforce_rate_limit
+
+        with patch(
+            "app.routers.dialogue.player_rate_limiter", PlayerRateLimiter()
+        ):
+            enforce_rate_limit("Flooder", "gift")
+            with pytest.raises(HTTPException) as exc_info:
+                enforce_rate_limit("Flooder", "gift")
+
+        assert exc_info.value.status_code == 429
+        assert exc_info.value.headers["Retry-After"] == "2"
+
+    @pytest.mark.asyncio
+    async def test_replayed_duplicates_are_not_charged(self):
+        """A retried turn is answered from the replay cache, not rate limited."""
+        from app.models.request import DialogueRequest, DialogueResponse
+        from app.routers import dialogue
+        from app.services.idempotency import ReplayCache
+
+        request = DialogueRequest(
+            npc_name="Abigail",
+            npc_location="Town",
+            player_name="Flooder",
+            friendship_hearts=4,
+            season="Spring",
+            day_of_month=3,
+            day_of_week=2,
+            time_of_day=900,
+            year=1,
+            weather="sunny",
+            player_location="Town",
+            player_response="Hi!",
+        )
+        response = DialogueResponse(npc_message="Hey.", response_options=["a", "b", "c"])
+
+        with (
+            patch.object(settings, "idempotency_enabled", True),
+            patch.object(dialogue, "player_rate_limiter", PlayerRateLimiter()),
+            patch.object(dialogue, "dialogue_replay_cache", ReplayCache()),
+            patch.object(dialogue, "run_dialogue_pipeline", return_value=response),
+        ):
+            for _ in range(5):
+                assert await dialogue.answer_dialogue(request, "retry-1") == response
+            await dialogue.answer_dialogue(request, "turn-2")
+            with pytest.raises(HTTPException) as exc_info:
+                await dialogue.answer_dialogue(request, "turn-3")
+
+        assert exc_info.value.status_code == 429
@@ -0,0 +1,136 @@
+import json
+import pytest
+from unittest.mock import patch, AsyncMock
+from app.config import settings
+from app.services.memory import relationship_context_service
+from app.services.memory.relationship_context_service import (
+    get_relationship_context,
+    get_relationship_contexts,
+)
+
+
+PROFILE_ROW = {
+    "id": "profile-1",
+    "playerId": "player-1",
+    "npcId": "npc-1",
+    "summary": "Seems nice.",
+    "friendliness": 6,
+    "extroversion": 5,
+    "sincerity": 5,
+    "curiosity": 5,
+    "trust": 5.5,
+    "respect": 5,
+    "affection": 3,
+    "annoyance": 2,
+    "admiration": 3,
+    "romantic_interest": 1,
+    "humor_compatibility": 5,
+}
+
+STATE_ROW = {
+    "id": "state-1",
+    "npcId": "npc-1",
+    "playerId": "player-1",
+    "currentMood": "HAPPY",
+    "moodIntensity": 7.0,
+    "recentJoy": 1.0,
+    "recentSadness": 0.0,
+    "recentAnger": 0.0,
+    "recentAnxiety": 0.0,
+    "recentExcitement": 0.5,
+    "lastInteractionEffect": None,
+    "externalFactors": "",
+    "lastUpdated": "2026-10-19T08:30:00",
+}
+
+
+class TestRelationshipContext:
+    """Test suite for the single-round-trip relationship context query."""
+
+    @pytest.fixture(autouse=True)
+    def function_available(self):
+        with patch.object(relationship_context_service, "_function_available", True):
+            yield
+
+    @pytest.mark.asyncio
+    async def test_row_is_hydrated_into_service_dicts(self):
+        """Profile and emotional state come back in the services' usual shape."""
+        row = {
+            "player_id": "player-1",
+            "npc_id": "npc-1",
+            "profile": PROFILE_ROW,
+            "emotional_state": json.dumps(STATE_ROW),
+            "conversation_id": "conv-1",
+            "conversation_start": "2026-10-19T08:30:00",
+            "conversation_created": False,
+        }
+        with patch(
+            "app.services.memory.relationship_context_service.db.query_raw",
+            new_callable=AsyncMock,
+            return_value=[row],
+        ) as query:
+            context = await get_relationship_context(
+                "Farmer", "Abigail", "Town", {"season": "Fall"}
+            )
+
+        query.assert_awaited_once()
+        assert context["player_id"] == "player-1"
+        assert context["conversation_id"] == "conv-1"
+        assert context["personality_profile"]["summary"] == "Seems nice."
+        assert context["personality_profile"]["trust"] == 5.5
+        assert context["emotional_state"]["current_mood"] == "HAPPY"
+        assert context["emotional_state"]["last_interaction_effect"] == ""
+        assert context["emotional_state"]["last_updated"].day == 19
+
+    @pytest.mark.asyncio
+    async def test_missing_function_disables_sql_path(self):
+        """Without the migration the caller falls back and the function is not retried."""
+        with patch(
+            "app.services.memory.relationship_context_service.db.query_raw",
+            new_callable=AsyncMock,
+            side_effect=Exception('function relationship_context(...) does not exist'),
+        ) as query:
+            assert await get_relationship_context("Farmer", "Abigail", None, {}) is None
+            assert await get_relationship_context("Farmer", "Abigail", None, {}) is None
+
+        assert query.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_disabled_by_setting(self):
+        with patch.object(settings, "relationship_context_sql_enabled", False):
+            assert await get_relationship_context("Farmer", "Abigail", None, {}) is None
+
+    @pytest.mark.asyncio
+    async def test_bulk_lookup_is_one_query_keyed_by_npc(self):
+        """Several NPCs share one round trip, each with its own game context."""
+        rows = [
+            {
+                "npc_name": npc_name,
+                "player_id": "player-1",
+                "npc_id": npc_id,
+                "profile": PROFILE_ROW,
+                "emotional_state": STATE_ROW,
+                "conversation_id": f"conv-{npc_id}",
+                "conversation_start": "2026-10-19T08:30:00",
+                "conversation_created": False,
+            }
+            for npc_name, npc_id in (("Abigail", "npc-1"), ("Shane", "npc-2"))
+        ]
+        with patch(
+            "app.services.memory.relationship_context_service.db.query_raw",
+            new_callable=AsyncMock,
+            return_value=rows,
+        ) as query:
+            contexts = await get_relationship_contexts(
+                "Farmer",
+                [
+                    ("Abigail", "Saloon", {"friendship_hearts": 4}),
+                    ("Shane", "Saloon", {"friendship_hearts": 0}),
+                ],
+            )
+
+        query.assert_awaited_once()
+        targets = json.loads(query.await_args.args[2])
+        assert [t["context"]["friendship_hearts"] for t in targets] == [4, 0]
+        assert contexts["Shane"]["npc_id"] == "npc-2"
+        assert contexts["Abigail"]["conversation_id"] == "conv-npc-1"
@@ -0,0 +1,51 @@
+import asyncio
+import pytest
+from app.services.request_context import RequestContext
+
+
+class TestRequestContext:
+    """Test suite for the request-scoped read memoizer."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_reads_share_one_load(self):
+        """Concurrent callers for the same key trigger a single load."""
+        ctx = RequestContext()
+        loads = []
+
+        async def load():
+            loads.append(1)
+            await asyncio.sleep(0.01)
+            return {"current_mood": "HAPPY"}
+
+        key = ("emotional_state", "npc-1", "player-1")
+        first, second = await asyncio.gather(
+            ctx.get_or_load(key, load), ctx.get_or_load(key, load)
+        )
+
+        assert first is second
+        assert len(loads) == 1
+        assert ctx.get_stats() == {"hits": 1, "misses": 1, "keys": 1}
+
+    @pytest.mark.asyncio
+    async def test_primed_value_skips_load(self):
+        ctx = RequestContext()
+        ctx.put(("player", "Farmer"), "player-1")
+
+        async def load():
+            raise AssertionError("should not load")
+
+        assert await ctx.get_or_load(("player", "Farmer"), load) == "player-1"
+
+    @pytest.mark.asyncio
+    async def test_failed_load_is_not_cached(self):
+        ctx = RequestContext()
+
+        async def fail():
+            raise RuntimeError("db down")
+
+        async def load():
+            return "ok"
+
+        with pytest.raises(RuntimeError):
+            await ctx.get_or_load("key", fail)
+        assert await ctx.get_or_load("key", load) == "ok"
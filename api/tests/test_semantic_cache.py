@@ -0,0 +1,131 @@
+import pytest
+from unittest.mock import patch
+from app.config import settings
+from app.models.request import ConversationEntry, DialogueRequest, GiftInfo
+from app.services.semantic_cache import SemanticResponseCache, time_band
+
+
+def make_request(**overrides) -> DialogueRequest:
+    fields = dict(
+        npc_name="Abigail",
+        npc_location="Town",
+        player_name="Farmer",
+        friendship_hearts=3,
+        season="Spring",
+        day_of_month=5,
+        day_of_week=5,
+        time_of_day=900,
+        year=1,
+        weather="Sun",
+        player_location="Town",
+        player_response="How are you?",
+    )
+    fields.update(overrides)
+    return DialogueRequest(**fields)
+
+
+CALM = {"current_mood": "NEUTRAL"}
+HOW_ARE_YOU = [1.0, 0.0, 0.0]
+HOW_ARE_YOU_TODAY = [0.98, 0.2, 0.0]  # cosine ~0.98
+NICE_WEATHER = [0.0, 1.0, 0.0]
+
+
+class TestSemanticResponseCache:
+    """Test suite for the semantic response cache."""
+
+    @pytest.fixture(autouse=True)
+    def cache_settings(self):
+        with (
+            patch.object(settings, "semantic_cache_enabled", True),
+            patch.object(settings, "semantic_cache_similarity_threshold", 0.9),
+            patch.object(settings, "semantic_cache_max_history_lines", 2),
+            patch.object(settings, "semantic_cache_max_uses", 2),
+            patch.object(settings, "semantic_cache_no_repeat_window", 20),
+            patch.object(settings, "semantic_cache_max_age_seconds", 1800.0),
+        ):
+            yield
+
+    def cache_with_reply(self) -> SemanticResponseCache:
+        cache = SemanticResponseCache()
+        cache.store(
+            make_request(player_name="Alex"),
+            CALM,
+            HOW_ARE_YOU,
+            "I'm fine, Alex. Thanks for asking.",
+            ["Good", "Bye Alex", "Really?"],
+        )
+        return cache
+
+    def test_accepts_only_early_plain_turns(self):
+        cache = SemanticResponseCache()
+        history = [ConversationEntry(speaker="npc", message="Hi")] * 3
+        gift = GiftInfo(item_name="Amethyst", item_category="Mineral")
+
+        assert cache.accepts(make_request(), [])
+        assert not cache.accepts(make_request(player_response=None), [])
+        assert not cache.accepts(make_request(gift_given=gift), [])
+        assert not cache.accepts(make_request(), history)
+        with patch.object(settings, "semantic_cache_enabled", False):
+            assert not cache.accepts(make_request(), [])
+
+    def test_similar_line_hits_with_player_name_filled_in(self):
+        cache = self.cache_with_reply()
+
+        reply = cache.find(make_request(), CALM, HOW_ARE_YOU_TODAY)
+
+        assert reply is not None
+        assert reply.npc_message == "I'm fine, Farmer. Thanks for asking."
+        assert reply.response_options[1] == "Bye Farmer"
+        assert reply.similarity == pytest.approx(0.98, abs=0.01)
+        stats = cache.get_stats()
+        assert stats["hits"] == 1 and stats["hit_rate"] == 1.0
+
+    def test_only_whole_word_names_become_the_placeholder(self):
+        """A short player name inside other words or names is left alone."""
+        cache = SemanticResponseCache()
+        cache.store(
+            make_request(player_name="Al"),
+            CALM,
+            HOW_ARE_YOU,
+            "Al! Also, Alex and Samantha said hi, Al.",
+            ["Thanks", "Hi Alex", "Al who?"],
+        )
+
+        reply = cache.find(make_request(player_name="Jo"), CALM, HOW_ARE_YOU)
+
+        assert reply.npc_message == "Jo! Also, Alex and Samantha said hi, Jo."
+        assert reply.response_options == ["Thanks", "Hi Alex", "Jo who?"]
+
+    def test_dissimilar_line_or_other_context_misses(self):
+        cache = self.cache_with_reply()
+
+        assert cache.find(make_request(), CALM, NICE_WEATHER) is None
+        assert cache.find(make_request(weather="Rain"), CALM, HOW_ARE_YOU) is None
+        assert cache.find(make_request(), {"current_mood": "ANGRY"}, HOW_ARE_YOU) is None
+        assert cache.find(make_request(time_of_day=1900), CALM, HOW_ARE_YOU) is None
+        assert cache.get_stats()["misses"] == 4
+
+    def test_not_repeated_to_a_player_and_bounded_uses(self):
+        cache = self.cache_with_reply()
+
+        # The player it was generated for has already seen it
+        assert cache.find(make_request(player_name="Alex"), CALM, HOW_ARE_YOU) is None
+
+        assert cache.find(make_request(), CALM, HOW_ARE_YOU) is not None
+        assert cache.find(make_request(), CALM, HOW_ARE_YOU) is None
+
+        assert cache.find(make_request(player_name="Sam"), CALM, HOW_ARE_YOU) is not None
+        # Used up after semantic_cache_max_uses players
+        assert cache.find(make_request(player_name="Kim"), CALM, HOW_ARE_YOU) is None
+        assert cache.get_stats()["replies"] == 0
+
+    def test_expired_replies_are_dropped(self):
+        cache = self.cache_with_reply()
+        with patch.object(settings, "semantic_cache_max_age_seconds", -1.0):
+            assert cache.find(make_request(), CALM, HOW_ARE_YOU) is None
+        assert cache.get_stats()["replies"] == 0
+
+    def test_time_bands(self):
+        assert time_band(600) == "morning"
+        assert time_band(1430) == "afternoon"
+        assert time_band(2400) == "evening"
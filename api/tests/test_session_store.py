@@ -0,0 +1,238 @@
+import pytest
+from unittest.mock import patch, AsyncMock
+from app.config import settings
+from app.services.session_store import SessionStore
+from app.services.memory_service import memory_service
+from app.services.request_context import RequestContext
+from app.services.dialogue_context import build_context_graph
+from app.models.request import DialogueRequest, ConversationEntry
+from app.routers import dialogue
+
+
+CONTEXT = {
+    "player_id": "player-1",
+    "npc_id": "npc-1",
+    "conversation_id": "conv-1",
+    "personality_profile": {"summary": "Seems nice.", "trust": 5.0},
+    "emotional_state": {"current_mood": "HAPPY", "mood_intensity": 7.0},
+    "templates_version": 0,
+}
+
+
+def make_request(**overrides):
+    fields = {
+        "npc_name": "Abigail",
+        "npc_location": "Town",
+        "player_name": "Farmer",
+        "friendship_hearts": 4,
+        "season": "Spring",
+        "day_of_month": 3,
+        "day_of_week": 2,
+        "time_of_day": 900,
+        "year": 1,
+        "weather": "sunny",
+        "player_location": "Town",
+    }
+    fields.update(overrides)
+    return DialogueRequest(**fields)
+
+
+class TestSessionStore:
+    """Test suite for the in-process registry of active conversations."""
+
+    def test_turn_opens_session_and_end_removes_it(self):
+        store = SessionStore()
+        assert store.get("Farmer", "Abigail") is None
+
+        store.record_turn("Farmer", "Abigail", CONTEXT)
+        store.record_turn("Farmer", "Abigail", CONTEXT)
+
+        session = store.get("Farmer", "Abigail")
+        assert session.conversation_id == "conv-1"
+        assert session.turns == 2
+        assert store.end("Farmer", "Abigail") is session
+        assert store.get("Farmer", "Abigail") is None
+
+    def test_idle_session_expires(self):
+        """A session without turns for the conversation timeout is dropped."""
+        store = SessionStore()
+        store.record_turn("Farmer", "Abigail", CONTEXT)
+
+        with patch.object(settings, "conversation_timeout_minutes", -1):
+            assert store.get("Farmer", "Abigail") is None
+        assert store.get_stats()["expired"] == 1
+
+    def test_analysis_evicts_relationship(self):
+        """Sessions holding a profile that analysis just updated are dropped."""
+        store = SessionStore()
+        store.record_turn("Farmer", "Abigail", CONTEXT)
+
+        store.evict_relationship("player-1", "npc-1")
+
+        assert store.get("Farmer", "Abigail") is None
+
+    @pytest.mark.asyncio
+    async def test_database_lookup_uses_last_activity(self):
+        """A conversation started long ago but still in use is found after a restart."""
+        from app.services.memory import conversation_service
+
+        with patch.object(conversation_service, "db") as db:
+            db.conversation.find_first = AsyncMock(return_value=None)
+            await conversation_service.find_active_conversation("player-1", "npc-1")
+
+        where = db.conversation.find_first.await_args.kwargs["where"]
+        cutoff = where["OR"][0]["startTime"]["gte"]
+        assert where["endTime"] is None
+        assert where["OR"][1] == {
+            "dialogueEntries": {"some": {"timestamp": {"gte": cutoff}}}
+        }
+
+    @pytest.mark.asyncio
+    async def test_active_session_skips_relationship_query(self):
+        """A turn with an active session needs no database lookup."""
+        store = SessionStore()
+        store.record_turn("Farmer", "Abigail", CONTEXT)
+        ctx = RequestContext()
+
+        with (
+            patch("app.services.memory_service.session_store", store),
+            patch(
+                "app.services.memory_service.get_relationship_context",
+                new_callable=AsyncMock,
+            ) as query,
+        ):
+            row = await memory_service.get_relationship_context(
+                "Farmer", "Abigail", "Town", {}, ctx=ctx
+            )
+            player_id = await memory_service.get_or_create_player("Farmer", ctx=ctx)
+
+        query.assert_not_awaited()
+        assert row["conversation_id"] == "conv-1"
+        assert player_id == "player-1"
+
+
+class TestConversationHandle:
+    """Test suite for rebuilding history from a conversation handle."""
+
+    async def run_history_stage(self, store, request, row=None):
+        with (
+            patch("app.services.memory_service.session_store", store),
+            patch("app.services.dialogue_context.session_store", store),
+            patch(
+                "app.services.memory_service.get_relationship_context",
+                new=AsyncMock(return_value=row),
+            ),
+            patch.object(
+                memory_service, "search_relevant_memories", new=AsyncMock(return_value=[])
+            ),
+            patch.object(
+                memory_service,
+                "get_recent_dialogue",
+                new=AsyncMock(
+                    return_value=[
+                        {"speaker": "Abigail", "message": "Hey."},
+                        {"speaker": "player", "message": "Hi!"},
+                    ]
+                ),
+            ) as recent,
+        ):
+            context = await build_context_graph(request, RequestContext()).run()
+        return context["conversation_history"], recent
+
+    @pytest.mark.asyncio
+    async def test_history_comes_from_the_session(self):
+        store = SessionStore()
+        session = store.record_turn("Farmer", "Abigail", CONTEXT)
+        session.add_lines(None, "Oh, it's you.")
+        session.add_lines("Nice weather!", "I guess.")
+
+        history, recent = await self.run_history_stage(
+            store, make_request(conversation_handle="conv-1", player_response="Bye")
+        )
+
+        assert [entry.message for entry in history] == [
+            "Oh, it's you.",
+            "Nice weather!",
+            "I guess.",
+        ]
+        recent.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_history_rebuilt_from_database_without_session(self):
+        """After a restart the stored lines of the handle's conversation are used."""
+        row = dict(CONTEXT)
+
+        history, recent = await self.run_history_stage(
+            SessionStore(), make_request(conversation_handle="conv-1"), row
+        )
+
+        recent.assert_awaited_once()
+        assert [entry.speaker for entry in history] == ["npc", "player"]
+
+    @pytest.mark.asyncio
+    async def test_rebuilt_history_keeps_turn_order(self):
+        """Lines persisted for two turns come back as they were spoken."""
+        rows = []
+
+        async def add_entries(conversation_id, lines, generate_embedding=True):
+            for speaker, message in lines:
+                rows.append(
+                    {"timestamp": len(rows), "speaker": speaker, "message": message}
+                )
+
+        async def recent_dialogue(conversation_id, limit):
+            return sorted(rows, key=lambda row: row["timestamp"])[-limit:]
+
+        with (
+            patch.object(memory_service, "add_dialogue_entries", new=add_entries),
+            patch.object(
+                dialogue.realtime_monitor, "notify_new_dialogue", new=AsyncMock()
+            ),
+        ):
+            await dialogue.persist_dialogue_turn(make_request(), "conv-1", "Hey.", 0)
+            await dialogue.persist_dialogue_turn(
+                make_request(player_response="Hi!"), "conv-1", "Oh, hi.", 1
+            )
+
+        store = SessionStore()
+        with (
+            patch("app.services.memory_service.session_store", store),
+            patch("app.services.dialogue_context.session_store", store),
+            patch(
+                "app.services.memory_service.get_relationship_context",
+                new=AsyncMock(return_value=dict(CONTEXT)),
+            ),
+            patch.object(
+                memory_service, "search_relevant_memories", new=AsyncMock(return_value=[])
+            ),
+            patch.object(memory_service, "get_recent_dialogue", new=recent_dialogue),
+        ):
+            context = await build_context_graph(
+                make_request(conversation_handle="conv-1", player_response="Bye"),
+                RequestContext(),
+            ).run()
+
+        assert [
+            (entry.speaker, entry.message) for entry in context["conversation_history"]
+        ] == [("npc", "Hey."), ("player", "Hi!"), ("npc", "Oh, hi.")]
+
+    @pytest.mark.asyncio
+    async def test_stale_handle_starts_fresh(self):
+        """A handle for a conversation that already ended gives no history."""
+        history, _ = await self.run_history_stage(
+            SessionStore(), make_request(conversation_handle="old-conv"), dict(CONTEXT)
+        )
+
+        assert history == []
+
+    @pytest.mark.asyncio
+    async def test_sent_history_still_wins(self):
+        sent = [ConversationEntry(speaker="npc", message="Hello there.")]
+
+        history, _ = await self.run_history_stage(
+            SessionStore(),
+            make_request(conversation_handle="conv-1", conversation_history=sent),
+            dict(CONTEXT),
+        )
+
+        assert history == sent